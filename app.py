@@ -1,48 +1,13 @@
 import streamlit as st
-import firebase_admin
-from firebase_admin import credentials
-from utils.cookies_manager import initialize_cookies_manager, set_auth_cookies, clear_auth_cookies
-from firebase import authenticate_user
-from utils.expenses_utils import display_expenses_page
-from utils.location_utils import display_map_page
-from utils.trip_progress import show_trip_progress
-import json
+from utils.cookies_manager import initialize_cookies_manager, get_authenticated_user, set_auth_cookies, clear_auth_cookies
+from firebase import authenticate_user, issue_session
 
-credentials_path = "firebase/service_account.json"
-
-database_url = "https://bikepacking-tracker-3fa9f-default-rtdb.firebaseio.com/"  
-
-def initialize_firebase(cred_dict, database_url):
-    """
-    Inicializa o Firebase com as credenciais fornecidas.
-
-    Parâmetros:
-        cred_dict (dict): Dicionário contendo as credenciais do Firebase.
-        database_url (str): URL do banco de dados do Firebase.
-
-    Levanta:
-        RuntimeError: Caso ocorra algum problema ao inicializar o Firebase.
-    """
-    try:
-        cred = credentials.Certificate(cred_dict)
-        if not firebase_admin._apps:  
-            firebase_admin.initialize_app(cred, {"databaseURL": database_url})
-    except Exception as e:
-        raise RuntimeError(f"Erro ao inicializar o Firebase: {e}")
-
-try:
-    with open(credentials_path, "r") as f:
-        cred_dict = json.load(f)  
-    initialize_firebase(cred_dict, database_url)
-except FileNotFoundError:
-    st.error(f"Arquivo de credenciais não encontrado: {credentials_path}")
-except Exception as e:
-    st.error(f"Erro ao carregar credenciais: {e}")
+# O Firebase é inicializado sob demanda, na primeira leitura ou escrita (ver `firebase.client`)
 
 cookies = initialize_cookies_manager()
 
-if "authenticated" not in st.session_state:
-    st.session_state.authenticated = cookies.get("authenticated") == "true"
+# A sessão é conferida a cada execução pelo token assinado no cookie, sem consultar o Firebase
+st.session_state.authenticated = get_authenticated_user(cookies) is not None
 
 def display_login():
     """
@@ -58,7 +23,7 @@ def display_login():
             user = authenticate_user(email, password)
             if user:
                 st.session_state.authenticated = True
-                set_auth_cookies(cookies, authenticated=True, user_email=user["email"])
+                set_auth_cookies(cookies, issue_session(user), user_email=user["email"])
                 st.success(f"Bem-vindo(a), {user['email']}!")
             else:
                 st.error("Credenciais inválidas. Tente novamente.")
@@ -84,11 +49,15 @@ def main():
         menu_options = ["Progresso da Viagem", "Despesas", "Localização"]
         page = st.sidebar.selectbox("Escolha a página", menu_options)  
 
+        # Cada página é importada só quando escolhida: o login não carrega mapas nem gráficos
         if page == "Progresso da Viagem":
+            from utils.trip_progress import show_trip_progress
             show_trip_progress()  
         elif page == "Despesas":
+            from utils.expenses_utils import display_expenses_page
             display_expenses_page()  
         elif page == "Localização":
+            from utils.location_utils import display_map_page
             display_map_page() 
 
         if st.sidebar.button("Logout"):
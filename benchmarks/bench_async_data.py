@@ -0,0 +1,62 @@
+"""
+Benchmark da leitura de vários caminhos: em sequência (`get_data`) e ao mesmo tempo
+(`async_data.get_many`), contra o backend local com latência de rede simulada.
+
+Uso:
+    python -m benchmarks.bench_async_data [latência em ms]
+"""
+import statistics
+import sys
+import time
+
+from firebase import async_data, firebase_utils
+from firebase.fake_db import FakeDatabase
+
+PATHS = ["locations", "gastos", "progresso_viagem", "rollups/progresso_viagem", "rollups/gastos"]
+
+
+def _sample_database(latency: float):
+    return FakeDatabase({
+        "locations": {f"-L{i:05}": {"cidade": "Cidade", "latitude": -22.9, "longitude": -45.5} for i in range(2000)},
+        "gastos": {f"-G{i:05}": {"categoria": "Alimentação", "valor": 25.0} for i in range(500)},
+        "progresso_viagem": {f"-P{i:05}": {"distancia": 80, "altimetria": 900, "tempo": "05:30"} for i in range(60)},
+        "rollups": {
+            "progresso_viagem": {"total": {"distancia": 4800, "altimetria": 54000}},
+            "gastos": {"total": {"valor": 12500.0}},
+        },
+    }, latency=latency)
+
+
+def _timed(function, repeat: int):
+    timings = []
+    for _ in range(repeat):
+        # Sem cache local: cada carga faz as idas e voltas ao backend, como na primeira visita à página
+        firebase_utils.reset_sync()
+        start = time.perf_counter()
+        function()
+        timings.append(time.perf_counter() - start)
+    return statistics.median(timings) * 1000
+
+
+def main(latency_ms: float = 150.0, repeat: int = 5):
+    firebase_utils.configure_local_cache(":memory:")
+    firebase_utils.use_backend(_sample_database(latency_ms / 1000))
+
+    serial = _timed(lambda: [firebase_utils.get_data(path) for path in PATHS], repeat)
+    concurrent = _timed(lambda: async_data.get_many(PATHS), repeat)
+    print(f"{len(PATHS)} caminhos, latência simulada de {latency_ms:.0f} ms por requisição")
+    print(f"em sequência:     {serial:8.1f} ms")
+    print(f"ao mesmo tempo:   {concurrent:8.1f} ms ({serial / concurrent:.1f}x mais rápido)")
+
+    # Um caminho lento não atrasa os demais além do tempo máximo
+    firebase_utils.use_backend(_sample_database(1.0))
+    firebase_utils.reset_sync()
+    start = time.perf_counter()
+    results = async_data.get_many(PATHS, timeout=0.3, return_exceptions=True)
+    failures = sum(isinstance(result, Exception) for result in results.values())
+    print(f"com tempo máximo de 300 ms e backend de 1 s: {failures} leituras canceladas "
+          f"em {(time.perf_counter() - start) * 1000:.0f} ms")
+
+
+if __name__ == "__main__":
+    main(float(sys.argv[1]) if len(sys.argv) > 1 else 150.0)
@@ -0,0 +1,96 @@
+"""
+Benchmark de memória do armazenamento colunar: registros de `locations` como chegam do
+Firebase (dicionário de dicionários), o caminho anterior (lista de dicionários e DataFrame)
+e o armazenamento colunar.
+
+Uso:
+    python -m benchmarks.bench_columnar_store [quantidade de pontos]
+"""
+import json
+import sys
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+
+import pandas as pd
+
+from benchmarks.bench_track_simplify import generate_track
+from firebase.push_keys import generate_push_keys
+from utils.columnar_store import LOCATION_SCHEMA, ColumnarStore
+
+CITIES = ["Cunha", "Lorena", "Guaratinguetá", "Aparecida", "Campos do Jordão", "Paraty"]
+# Registros por bloco de JSON, para não manter o texto completo em memória ao gerar os dados
+JSON_CHUNK = 100_000
+
+
+def generate_payload(count: int):
+    """
+    Gera registros de `locations` decodificados de JSON, como retornados pelo SDK do Firebase.
+    """
+    latitudes, longitudes = generate_track(count)
+    keys = generate_push_keys(count)
+    start = datetime(2024, 1, 1, 6, 0, 0)
+    payload = {}
+    for offset in range(0, count, JSON_CHUNK):
+        chunk = {
+            keys[i]: {
+                "cidade": CITIES[i * len(CITIES) // count],
+                "latitude": float(latitudes[i]),
+                "longitude": float(longitudes[i]),
+                "altitude": 600 + i % 400,
+                "timestamp": (start + timedelta(seconds=5 * i)).strftime("%Y-%m-%d %H:%M:%S"),
+            }
+            for i in range(offset, min(offset + JSON_CHUNK, count))
+        }
+        # Decodificar o JSON cria objetos próprios para cada registro, como na resposta do Firebase
+        payload.update(json.loads(json.dumps(chunk)))
+    return payload
+
+
+def _measure(function, timed: bool = True):
+    # Memória medida com tracemalloc; o tempo é medido à parte, sem o custo do rastreamento
+    tracemalloc.start()
+    result = function()
+    size, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    if not timed:
+        return result, size, peak, None
+    start = time.perf_counter()
+    function()
+    return result, size, peak, time.perf_counter() - start
+
+
+def legacy_frame(payload):
+    """
+    Caminho anterior: lista de dicionários copiada para um DataFrame.
+    """
+    records = [
+        {"cidade": entry.get("cidade", "Desconhecida"), "latitude": entry.get("latitude"),
+         "longitude": entry.get("longitude"), "hora": entry.get("timestamp", "Sem horário")}
+        for entry in payload.values()
+    ]
+    return records, pd.DataFrame(records)
+
+
+def main(count: int = 1_000_000):
+    payload, payload_bytes, _, _ = _measure(lambda: generate_payload(count), timed=False)
+    legacy, legacy_bytes, legacy_peak, legacy_s = _measure(lambda: legacy_frame(payload))
+    del legacy
+    store, store_bytes, store_peak, store_s = _measure(lambda: ColumnarStore.from_payload(payload, LOCATION_SCHEMA))
+    _, frame_bytes, _, frame_s = _measure(store.to_frame)
+
+    mib = 2 ** 20
+    print(f"{count} localizações")
+    print(f"payload do Firebase (dict de dicts): {payload_bytes / mib:8.1f} MiB")
+    print(f"lista + DataFrame (anterior):        {legacy_bytes / mib:8.1f} MiB "
+          f"(pico {legacy_peak / mib:.1f} MiB, {legacy_s:.2f}s)")
+    print(f"armazenamento colunar:               {store_bytes / mib:8.1f} MiB "
+          f"(pico {store_peak / mib:.1f} MiB, {store_s:.2f}s; {store.nbytes / count:.0f} bytes por ponto)")
+    print(f"DataFrame sobre o armazenamento:     {frame_bytes / mib:8.1f} MiB ({frame_s * 1000:.1f} ms)")
+    print(f"redução em relação ao payload:       {payload_bytes / store_bytes:8.1f}x")
+    print(f"redução em relação ao caminho anterior (payload + lista + DataFrame): "
+          f"{(payload_bytes + legacy_bytes) / (store_bytes + frame_bytes):.1f}x")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000)
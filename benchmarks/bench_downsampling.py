@@ -0,0 +1,38 @@
+"""
+Benchmark da redução de pontos dos gráficos de progresso: tempo de cada resolução e tamanho
+do JSON da figura enviado ao navegador, com e sem redução.
+
+Uso:
+    python -m benchmarks.bench_downsampling [quantidade de registros]
+"""
+import sys
+import time
+
+import plotly.graph_objects as go
+
+from benchmarks.bench_trip_stats import generate_progress_records
+from utils.trip_stats import process_trip_data, progress_chart_data
+
+
+def _figure_size(df):
+    figure = go.Figure()
+    for column in ("Altimetria (m)", "Distância (km)"):
+        figure.add_trace(go.Scatter(x=df["Hora"], y=df[column], mode="lines+markers"))
+    return len(figure.to_json())
+
+
+def main(count: int = 100_000):
+    trip_df = process_trip_data(generate_progress_records(count))
+    print(f"{count} registros; figura completa: {_figure_size(trip_df) / 1024:.0f} KiB")
+
+    for mode in ("registros", "hora", "dia"):
+        for method in ("lttb", "minmax"):
+            start = time.perf_counter()
+            chart_df = progress_chart_data(trip_df, mode, method=method)
+            elapsed = (time.perf_counter() - start) * 1000
+            print(f"{mode:>9} / {method:<6}: {elapsed:7.1f} ms, {len(chart_df):5} pontos, "
+                  f"figura de {_figure_size(chart_df) / 1024:.0f} KiB")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 100_000)
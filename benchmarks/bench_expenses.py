@@ -0,0 +1,73 @@
+"""
+Benchmark da tabela de gastos: carregamento do histórico completo (como antes) contra uma
+página consultada no servidor, e formatação dos valores em reais, com e sem vetorização.
+
+Uso:
+    python -m benchmarks.bench_expenses [quantidade de gastos]
+"""
+import random
+import sys
+import time
+
+import pandas as pd
+
+from firebase import firebase_utils
+from firebase.fake_db import FakeDatabase
+from firebase.rollups import compute_rollups
+from utils.expenses_utils import PAGE_SIZE, expense_total, format_currency, load_expense_page
+
+CATEGORIES = ["Alimentação", "Hospedagem", "Transporte", "Outros"]
+
+
+def generate_expenses(count: int, seed: int = 0):
+    rng = random.Random(seed)
+    return {
+        f"-G{i:07d}": {
+            "categoria": rng.choice(CATEGORIES),
+            "descricao": f"gasto {i}",
+            "valor": round(rng.uniform(1, 500), 2),
+            "data": f"2024-{1 + i * 12 // count:02d}-{1 + i % 28:02d}",
+            "timestamp": f"2024-{1 + i * 12 // count:02d}-{1 + i % 28:02d} 12:00:00",
+        }
+        for i in range(count)
+    }
+
+
+def _full_history(backend):
+    data = backend.reference("gastos").get()
+    df = pd.DataFrame(list(data.values()))
+    df["valor_formatado"] = df["valor"].apply(
+        lambda x: f"R$ {x:,.2f}".replace(",", "X").replace(".", ",").replace("X", ".")
+    )
+    return df["valor"].sum()
+
+
+def _timed(function):
+    start = time.perf_counter()
+    function()
+    return (time.perf_counter() - start) * 1000
+
+
+def main(count: int = 100_000):
+    expenses = generate_expenses(count)
+    backend = FakeDatabase({"gastos": expenses, "rollups": {"gastos": compute_rollups("gastos", expenses)}})
+    firebase_utils.configure_local_cache(":memory:")
+    firebase_utils.use_backend(backend)
+    print(f"{count} gastos, páginas de {PAGE_SIZE}")
+
+    print(f"histórico completo + soma:       {_timed(lambda: _full_history(backend)):8.1f} ms")
+    page = lambda: (load_expense_page("data", "2024-06-01", "2024-06-30"), expense_total("data", "2024-06-01", "2024-06-30"))
+    print(f"página filtrada + total (1ª):    {_timed(page):8.1f} ms")
+    print(f"página filtrada + total (cache): {_timed(page):8.1f} ms")
+    # O emulador não tem índices e percorre todos os filhos; no Firebase (com `.indexOn`), só a janela é lida
+    records = firebase_utils.query_data("gastos", "data", "2024-06-01", "2024-06-30", PAGE_SIZE + 1)
+    print(f"registros transferidos: {len(records)} de {count}")
+
+    values = pd.Series([expense["valor"] for expense in expenses.values()])
+    slow = _timed(lambda: values.apply(lambda x: f"R$ {x:,.2f}".replace(",", "X").replace(".", ",").replace("X", ".")))
+    print(f"formatação valor a valor:        {slow:8.1f} ms")
+    print(f"formatação vetorizada:           {_timed(lambda: format_currency(values)):8.1f} ms")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 100_000)
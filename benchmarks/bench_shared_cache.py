@@ -0,0 +1,53 @@
+"""
+Benchmark do cache de leituras compartilhado: várias sessões lendo os mesmos caminhos ao
+mesmo tempo, com e sem o cache, contra o backend local com latência de rede simulada.
+
+Uso:
+    python -m benchmarks.bench_shared_cache [quantidade de sessões]
+"""
+import sys
+import threading
+import time
+
+from benchmarks.bench_async_data import PATHS, _sample_database
+from firebase import firebase_utils
+
+# Caminhos que não são espelhados localmente: sem o cache, cada leitura vai ao backend
+REMOTE_PATHS = [path for path in PATHS if path not in firebase_utils.CACHED_PATHS]
+
+
+def _run_sessions(sessions: int, reads: int):
+    def _session():
+        for _ in range(reads):
+            for path in REMOTE_PATHS:
+                firebase_utils.get_data(path)
+
+    threads = [threading.Thread(target=_session) for _ in range(sessions)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return (time.perf_counter() - start) * 1000
+
+
+def main(sessions: int = 10, reads: int = 5, latency_ms: float = 50.0):
+    firebase_utils.configure_local_cache(":memory:")
+    firebase_utils.use_backend(_sample_database(latency_ms / 1000))
+    print(f"{sessions} sessões x {reads} cliques, {len(REMOTE_PATHS)} caminhos, latência de {latency_ms:.0f} ms")
+
+    # Orçamento zero: nenhuma cópia é guardada, como antes do cache
+    firebase_utils.configure_shared_cache(max_bytes=0)
+    print(f"sem cache: {_run_sessions(sessions, reads):8.0f} ms")
+
+    firebase_utils.configure_shared_cache(max_bytes=firebase_utils.SHARED_CACHE_MAX_BYTES)
+    before = firebase_utils.get_cache_stats()
+    elapsed = _run_sessions(sessions, reads)
+    stats = firebase_utils.get_cache_stats()
+    hits, misses = stats["hits"] - before["hits"], stats["misses"] - before["misses"]
+    print(f"com cache: {elapsed:8.0f} ms ({hits} acertos, {misses} faltas, "
+          f"{stats['bytes'] / 1024:.1f} KiB)")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 10)
@@ -0,0 +1,61 @@
+"""
+Benchmark do índice espacial: construção, inclusão incremental e consultas (vizinho mais
+próximo, raio e retângulo) comparadas com a busca exaustiva em NumPy.
+
+Uso:
+    python -m benchmarks.bench_spatial_index [quantidade de pontos]
+"""
+import sys
+import time
+
+import numpy as np
+
+from benchmarks.bench_track_simplify import generate_track
+from utils.geodesy import haversine
+from utils.spatial_index import SpatialIndex
+
+
+def _per_query_us(function, queries):
+    start = time.perf_counter()
+    for query in queries:
+        function(*query)
+    return (time.perf_counter() - start) / len(queries) * 1e6
+
+
+def main(count: int = 1_000_000, queries: int = 200):
+    latitudes, longitudes = generate_track(count)
+    rng = np.random.default_rng(7)
+
+    start = time.perf_counter()
+    index = SpatialIndex()
+    index.add(latitudes[:-1000], longitudes[:-1000])
+    print(f"construção: {time.perf_counter() - start:.2f}s ({count - 1000} pontos, {len(index._cells)} células)")
+
+    start = time.perf_counter()
+    for offset in range(count - 1000, count, 10):
+        index.add(latitudes[offset:offset + 10], longitudes[offset:offset + 10])
+    print(f"inclusão incremental: {(time.perf_counter() - start) / 100 * 1e6:.0f} µs por lote de 10 pontos")
+
+    # Consultas sobre o percurso (posição atual) e em volta dele (paradas planejadas próximas)
+    along = rng.integers(0, count, queries)
+    points = [
+        (latitudes[i] + rng.normal(0, 0.01), longitudes[i] + rng.normal(0, 0.01)) for i in along
+    ]
+    boxes = [(lat - 0.02, lon - 0.03, lat + 0.02, lon + 0.03) for lat, lon in points]
+
+    def brute_nearest(lat, lon):
+        return np.argmin(haversine(lat, lon, latitudes, longitudes))
+
+    def brute_bbox(south, west, north, east):
+        return np.flatnonzero((latitudes >= south) & (latitudes <= north) & (longitudes >= west) & (longitudes <= east))
+
+    print(f"vizinho mais próximo: {_per_query_us(index.nearest, points):8.0f} µs "
+          f"(exaustivo: {_per_query_us(brute_nearest, points[:20]):8.0f} µs)")
+    print(f"raio de 1 km:         {_per_query_us(lambda lat, lon: index.radius(lat, lon, 1000), points):8.0f} µs")
+    print(f"retângulo da tela:    {_per_query_us(index.bbox, boxes):8.0f} µs "
+          f"(exaustivo: {_per_query_us(brute_bbox, boxes[:20]):8.0f} µs)")
+    print(f"ponto distante:       {_per_query_us(index.nearest, [(-10.0, -40.0)] * 20):8.0f} µs")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000)
@@ -0,0 +1,174 @@
+"""
+Benchmark do tempo de importação de cada página (e do login em `app.py`), com `python -X importtime`.
+
+Para cada arquivo, as importações de nível de módulo são executadas em um processo novo, com o
+Streamlit já carregado (como no servidor). Importações dentro de funções (carregadas só quando
+usadas) não entram na conta.
+
+Tempos absolutos dependem da máquina, por isso a referência é medida na mesma máquina e na
+mesma execução: por padrão, a versão do commit anterior (`--against`), extraída em um
+`git worktree` temporário, com as medições das duas versões intercaladas. Também é possível
+comparar com um arquivo medido antes nesta máquina (`--baseline`). O arquivo
+`benchmarks/startup_baseline.json` do repositório é apenas informativo (ordem de grandeza dos
+tempos em uma máquina de desenvolvimento) e não é usado na comparação.
+
+Uso:
+    python -m benchmarks.bench_startup                        # compara com o commit anterior
+    python -m benchmarks.bench_startup --against origin/main  # compara com outra versão
+    python -m benchmarks.bench_startup --update local.json    # grava os tempos atuais
+    python -m benchmarks.bench_startup --baseline local.json  # compara com um arquivo desta máquina
+"""
+import argparse
+import ast
+import json
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BASELINE_PATH = os.path.join(ROOT, "benchmarks", "startup_baseline.json")
+# Aumento tolerado em relação à referência: proporcional e absoluto (ruído de medição)
+TOLERANCE = 0.25
+TOLERANCE_MS = 30.0
+_MARKER = "--inicio--"
+
+
+def entry_points(root: str = ROOT):
+    """
+    Retorna os arquivos medidos de uma cópia do projeto: `app.py` e as páginas.
+    """
+    return ["app.py"] + sorted(
+        os.path.join("pages", name) for name in os.listdir(os.path.join(root, "pages")) if name.endswith(".py")
+    )
+
+
+def import_statements(path: str, root: str = ROOT):
+    """
+    Retorna as importações de nível de módulo de um arquivo, como código Python.
+
+    Cada importação fica em um bloco try/except, para que uma dependência ausente não
+    impeça a medição das demais.
+    """
+    with open(os.path.join(root, path), "r", encoding="utf-8") as f:
+        tree = ast.parse(f.read())
+    statements = []
+    for node in tree.body:
+        if isinstance(node, (ast.Import, ast.ImportFrom)):
+            statements.append(
+                f"try:\n    {ast.unparse(node)}\n"
+                f"except Exception as e:\n    sys.stderr.write('--erro-- ' + repr(e) + '\\n')"
+            )
+    return "\n".join(statements)
+
+
+def measure(path: str, root: str = ROOT):
+    """
+    Mede, em um processo novo, o tempo das importações de um arquivo de uma cópia do projeto.
+
+    Retorna:
+        tuple: Tempo total em ms, os módulos mais lentos [(módulo, ms)] e os erros de importação.
+    """
+    code = f"import sys\nimport streamlit\nsys.stderr.write({_MARKER!r} + '\\n')\n{import_statements(path, root)}"
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code], cwd=root, capture_output=True, text=True,
+    )
+    lines = result.stderr.split(f"{_MARKER}\n", 1)[-1].splitlines()
+    modules, errors = [], []
+    for line in lines:
+        if line.startswith("--erro--"):
+            errors.append(line[len("--erro-- "):])
+        elif line.startswith("import time:") and "|" in line:
+            _, cumulative, name = line.split("|")
+            # Só os módulos importados diretamente (sem recuo); os internos já estão no acumulado
+            if cumulative.strip().isdigit() and not name[1:].startswith(" "):
+                modules.append((name.strip(), int(cumulative) / 1000))
+    modules.sort(key=lambda item: item[1], reverse=True)
+    return sum(ms for _, ms in modules), modules[:3], errors
+
+
+def checkout(ref: str):
+    """
+    Extrai uma versão do projeto em um `git worktree` temporário.
+
+    Retorna:
+        str: A pasta da cópia (remover com `remove_checkout`).
+
+    Levanta:
+        RuntimeError: Se a versão não puder ser extraída.
+    """
+    path = tempfile.mkdtemp(prefix="bench_startup_")
+    result = subprocess.run(
+        ["git", "worktree", "add", "--detach", path, ref], cwd=ROOT, capture_output=True, text=True,
+    )
+    if result.returncode != 0:
+        shutil.rmtree(path, ignore_errors=True)
+        raise RuntimeError(f"Erro ao extrair {ref}: {result.stderr.strip()}")
+    return path
+
+
+def remove_checkout(path: str):
+    subprocess.run(["git", "worktree", "remove", "--force", path], cwd=ROOT, capture_output=True)
+    shutil.rmtree(path, ignore_errors=True)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Mede o tempo de importação de cada página.")
+    parser.add_argument("--against", default="HEAD~1", help="Versão (git) de referência, medida nesta máquina.")
+    parser.add_argument("--baseline", help="Arquivo JSON de referência, medido antes nesta máquina (em vez de --against).")
+    parser.add_argument(
+        "--update", nargs="?", const=BASELINE_PATH,
+        help="Grava os tempos atuais em um arquivo JSON (padrão: o arquivo informativo do repositório).",
+    )
+    parser.add_argument("--repeat", type=int, default=3, help="Medições por arquivo (usa a mediana).")
+    args = parser.parse_args(argv)
+
+    baseline, reference_root = {}, None
+    if args.baseline:
+        with open(args.baseline, "r") as f:
+            baseline = json.load(f)
+    elif not args.update:
+        reference_root = checkout(args.against)
+
+    try:
+        current, regressions = {}, []
+        for path in entry_points():
+            runs, reference_runs = [], []
+            for _ in range(args.repeat):
+                # Intercaladas, para que variações da máquina afetem as duas versões
+                runs.append(measure(path))
+                if reference_root is not None and os.path.exists(os.path.join(reference_root, path)):
+                    reference_runs.append(measure(path, reference_root)[0])
+            total = statistics.median(run[0] for run in runs)
+            _, slowest, errors = runs[-1]
+            current[path] = round(total, 1)
+
+            reference = statistics.median(reference_runs) if reference_runs else baseline.get(path)
+            status = ""
+            if reference is not None:
+                limit = reference * (1 + TOLERANCE) + TOLERANCE_MS
+                status = f"(referência {reference:.0f} ms)"
+                if total > limit:
+                    regressions.append(path)
+                    status += " REGRESSÃO"
+            top = ", ".join(f"{name} {ms:.0f}" for name, ms in slowest)
+            print(f"{path:<34} {total:7.0f} ms {status}  [{top}]")
+            for error in errors:
+                print(f"    erro de importação: {error}")
+    finally:
+        if reference_root is not None:
+            remove_checkout(reference_root)
+
+    if args.update:
+        with open(args.update, "w") as f:
+            json.dump(current, f, indent=2, ensure_ascii=False)
+            f.write("\n")
+        print(f"tempos gravados em {os.path.relpath(args.update)}")
+        return 0
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,103 @@
+"""
+Benchmark da importação de percursos: gera um GPX sintético grande (~50 MB) e um FIT
+equivalente, e mede a vazão (pontos/s) e o pico de memória da leitura e da gravação em lotes.
+
+Uso:
+    python -m benchmarks.bench_track_import [quantidade de pontos]
+"""
+import os
+import struct
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timedelta, timezone
+
+from benchmarks.bench_track_simplify import generate_track
+from firebase import firebase_utils
+from firebase.fake_db import FakeDatabase
+from utils.track_import import FIT_EPOCH, import_track_file, iter_points
+
+
+def write_gpx(path: str, count: int):
+    """
+    Grava um GPX sintético com `count` pontos (~170 bytes por ponto).
+    """
+    latitudes, longitudes = generate_track(count)
+    start = datetime(2024, 1, 1, 6, 0, 0)
+    with open(path, "w", encoding="utf-8") as f:
+        f.write('<?xml version="1.0" encoding="UTF-8"?>\n')
+        f.write('<gpx version="1.1" creator="benchmark" xmlns="http://www.topografix.com/GPX/1/1">\n')
+        f.write("<trk><name>Sintético</name><trkseg>\n")
+        for i in range(count):
+            moment = (start + timedelta(seconds=i)).strftime("%Y-%m-%dT%H:%M:%SZ")
+            f.write(
+                f'<trkpt lat="{latitudes[i]:.7f}" lon="{longitudes[i]:.7f}">'
+                f"<ele>{800 + (i % 500) * 0.2:.1f}</ele><time>{moment}</time>"
+                f"<extensions><speed>5.2</speed></extensions></trkpt>\n"
+            )
+        f.write("</trkseg></trk>\n</gpx>\n")
+
+
+def write_fit(path: str, count: int):
+    """
+    Grava um FIT sintético mínimo com `count` mensagens "record" (horário, posição e altitude).
+    """
+    latitudes, longitudes = generate_track(count)
+    definition = struct.pack("<BBBHB", 0x40, 0, 0, 20, 4) + bytes([253, 4, 0x86, 0, 4, 0x85, 1, 4, 0x85, 2, 2, 0x84])
+    start = int(datetime(2024, 1, 1, 6, tzinfo=timezone.utc).timestamp()) - FIT_EPOCH
+    records = bytearray(definition)
+    for i in range(count):
+        records += struct.pack(
+            "<BIiiH", 0x00, start + i,
+            int(latitudes[i] / 180 * 2 ** 31), int(longitudes[i] / 180 * 2 ** 31),
+            int((800 + (i % 500) * 0.2 + 500) * 5),
+        )
+    header = struct.pack("<BBHI4sH", 14, 0x20, 2132, len(records), b".FIT", 0)
+    with open(path, "wb") as f:
+        f.write(header + records + b"\x00\x00")
+
+
+def _measure(path: str):
+    start = time.perf_counter()
+    with open(path, "rb") as f:
+        stats = import_track_file(f, filename=path)
+    elapsed = time.perf_counter() - start
+
+    tracemalloc.start()
+    with open(path, "rb") as f:
+        parsed = sum(1 for _ in iter_points(f, filename=path))
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return stats, elapsed, parsed, peak
+
+
+def main(count: int = 300_000):
+    with tempfile.TemporaryDirectory() as tmp:
+        firebase_utils.configure_local_cache(":memory:")
+
+        for name, writer in (("percurso.gpx", write_gpx), ("percurso.fit", write_fit)):
+            path = os.path.join(tmp, name)
+            writer(path, count)
+            size_mb = os.path.getsize(path) / 2 ** 20
+
+            # Cada arquivo é importado em um backend vazio, para que nenhum ponto seja descartado como duplicado
+            firebase_utils.use_backend(FakeDatabase())
+            firebase_utils.configure_outbox(os.path.join(tmp, f"{name}.outbox.jsonl"))
+            firebase_utils.reset_sync("locations")
+            stats, elapsed, parsed, peak = _measure(path)
+            print(
+                f"{name}: {size_mb:.1f} MB, {stats['importados']} pontos importados em {elapsed:.1f}s "
+                f"({stats['lidos'] / elapsed:,.0f} pontos/s) | leitura de {parsed} pontos com pico de "
+                f"{peak / 2 ** 20:.1f} MB"
+            )
+
+            outbox = firebase_utils.get_outbox()
+            start = time.perf_counter()
+            while outbox.flush():
+                pass
+            print(f"  envio dos lotes ao backend local: {time.perf_counter() - start:.1f}s, {outbox.stats()}")
+            outbox.close()
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 300_000)
@@ -0,0 +1,53 @@
+"""
+Benchmark da simplificação do percurso (Douglas–Peucker) em um percurso sintético.
+
+Uso:
+    python -m benchmarks.bench_track_simplify [quantidade de pontos]
+"""
+import sys
+import time
+
+import numpy as np
+
+from utils.track_simplify import LOD_LEVELS, project_to_meters, douglas_peucker, track_levels
+
+
+def generate_track(count: int, seed: int = 42, step_m: float = 10.0):
+    """
+    Gera um percurso sintético de bicicleta: passos de ~10 m com mudanças suaves de direção.
+    """
+    rng = np.random.default_rng(seed)
+    heading = np.cumsum(rng.normal(0, 0.08, count))
+    steps = rng.normal(step_m, 1.5, count)
+    north = np.cumsum(steps * np.cos(heading))
+    east = np.cumsum(steps * np.sin(heading))
+    lat0, lon0 = -22.9, -45.5
+    latitudes = lat0 + np.degrees(north / 6371008.8)
+    longitudes = lon0 + np.degrees(east / (6371008.8 * np.cos(np.radians(lat0))))
+    return latitudes, longitudes
+
+
+def main(count: int = 100_000):
+    latitudes, longitudes = generate_track(count)
+
+    start = time.perf_counter()
+    points = project_to_meters(latitudes, longitudes)
+    print(f"projeção: {(time.perf_counter() - start) * 1000:.1f} ms ({count} pontos)")
+
+    for min_zoom, tolerance in LOD_LEVELS:
+        start = time.perf_counter()
+        indices = douglas_peucker(points, tolerance)
+        elapsed = time.perf_counter() - start
+        print(f"zoom >= {min_zoom:2}: tolerância {tolerance:7.1f} m -> {len(indices):7} vértices em {elapsed * 1000:8.1f} ms")
+
+    start = time.perf_counter()
+    track_levels("bench", latitudes, longitudes)
+    cold = time.perf_counter() - start
+    start = time.perf_counter()
+    track_levels("bench", latitudes, longitudes)
+    warm = time.perf_counter() - start
+    print(f"todos os níveis: {cold * 1000:.1f} ms sem cache, {warm * 1000:.3f} ms com cache")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 100_000)
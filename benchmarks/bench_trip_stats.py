@@ -0,0 +1,87 @@
+"""
+Benchmark de `process_trip_data` com registros sintéticos de progresso da viagem.
+
+Uso:
+    python -m benchmarks.bench_trip_stats [quantidade de registros]
+"""
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+
+import pandas as pd
+
+from firebase.push_keys import generate_push_key
+from utils.trip_stats import process_trip_data
+
+
+def generate_progress_records(count: int, seed: int = 42):
+    """
+    Gera registros de `progresso_viagem` no formato gravado pelo app, em ordem de chave embaralhada.
+    """
+    rng = random.Random(seed)
+    start = datetime(2024, 1, 1, 6, 0, 0)
+    records = {}
+    for i in range(count):
+        records[generate_push_key()] = {
+            "distancia": round(rng.uniform(5, 40), 2),
+            "altimetria": rng.randint(0, 600),
+            "tempo": f"{rng.randint(0, 3):02}:{rng.randint(0, 59):02}",
+            "timestamp": (start + timedelta(minutes=30 * i)).strftime("%Y-%m-%d %H:%M:%S"),
+        }
+    items = list(records.items())
+    rng.shuffle(items)
+    return dict(items)
+
+
+def legacy_process_trip_data(data):
+    """
+    Implementação anterior (laço por registro), mantida apenas para comparação.
+    """
+    records = []
+    total_distancia = 0
+    total_altimetria = 0
+    total_minutes = 0
+    for key, values in data.items():
+        if isinstance(values, dict):
+            timestamp = values.get("timestamp", "Sem Data")
+            tempo = values.get("tempo", "0:00")
+            try:
+                date = datetime.strptime(timestamp, "%Y-%m-%d %H:%M:%S").strftime("%d/%m/%Y")
+            except ValueError:
+                date = "Sem Data"
+            try:
+                h, m = map(int, tempo.split(":"))
+                minutes = h * 60 + m
+            except ValueError:
+                minutes = 0
+            total_distancia += values.get("distancia", 0)
+            total_altimetria += values.get("altimetria", 0)
+            total_minutes += minutes
+            records.append({
+                "Hora": f"{total_minutes // 60:02}:{total_minutes % 60:02}",
+                "Distância (km)": total_distancia,
+                "Altimetria (m)": total_altimetria,
+                "Data": date,
+            })
+    return pd.DataFrame(records)
+
+
+def _best_of(func, data, repeat: int = 3):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(data)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main(count: int = 100_000):
+    data = generate_progress_records(count)
+    for name, func in (("vetorizado", process_trip_data), ("laço (anterior)", legacy_process_trip_data)):
+        elapsed = _best_of(func, data)
+        print(f"{name:>16}: {elapsed * 1000:9.1f} ms total | {elapsed / count * 1e6:6.2f} µs/registro ({count} registros)")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 100_000)
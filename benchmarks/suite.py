@@ -0,0 +1,211 @@
+"""
+Conjunto de benchmarks das etapas das páginas (leitura, processamento e montagem de mapas e
+gráficos) com viagens sintéticas de vários tamanhos, contra o emulador em memória do banco.
+
+Para cada tamanho, uma viagem é gerada (ver `synthetic_trip`), carregada no `FakeDatabase` e
+cada etapa é medida sem os caches das execuções anteriores (o melhor de algumas repetições).
+O resultado é gravado em um relatório JSON, que pode ser comparado com o de outro commit.
+
+Uso:
+    python -m benchmarks.suite                                  # 1k, 10k, 100k e 1M registros
+    python -m benchmarks.suite --sizes 1000 10000 --repeat 5
+    python -m benchmarks.suite --compare benchmarks/reports/<commit>.json
+"""
+import argparse
+import gc
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+from datetime import datetime
+
+from benchmarks.synthetic_trip import generate_trip
+from firebase import firebase_utils
+from firebase.fake_db import FakeDatabase
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+REPORTS_DIR = os.path.join(ROOT, "benchmarks", "reports")
+DEFAULT_SIZES = [1_000, 10_000, 100_000, 1_000_000]
+# Aumento tolerado em relação ao relatório comparado: proporcional e absoluto (ruído de medição)
+TOLERANCE = 0.25
+TOLERANCE_MS = 5.0
+
+
+def _commit():
+    try:
+        result = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True, text=True)
+        return result.stdout.strip() or "desconhecido"
+    except OSError:
+        return "desconhecido"
+
+
+def _best_of(function, repeat: int, setup=None):
+    """
+    Executa `function` `repeat` vezes (chamando `setup` antes de cada uma, fora da medição).
+
+    Retorna:
+        tuple: O menor tempo, em ms, e o resultado da última execução.
+    """
+    best, result = None, None
+    for run in range(repeat):
+        argument = setup(run) if setup else None
+        gc.collect()
+        start = time.perf_counter()
+        result = function(argument) if setup else function()
+        elapsed = (time.perf_counter() - start) * 1000
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+
+def _forget(name: str):
+    # Descarta os conjuntos dos caches incrementais, para que a próxima medição parta do zero
+    from utils import columnar_store, geodesy, spatial_index, timeline
+
+    for module in (columnar_store, geodesy, spatial_index, timeline):
+        with module._cache_lock:
+            module._cache.pop(name, None)
+
+
+def run_size(records: int, days: int, repeat: int):
+    """
+    Mede todas as etapas com uma viagem sintética de `records` registros por caminho.
+
+    Retorna:
+        dict: Tempo de cada etapa, em ms.
+    """
+    from utils.expenses_utils import PAGE_SIZE, expense_total, format_currency, load_expense_page
+    from firebase.push_keys import dataset_version
+    from utils.map_builder import build_marker_layer, build_route_map, visible_points
+    from utils.columnar_store import location_store_for
+    from utils.geodesy import track_metrics_for
+    from utils.spatial_index import location_index_for
+    from utils.timeline import ROWS_PER_PAGE, timeline_index_for, timeline_markdown
+    from utils.trip_stats import process_trip_data, progress_chart_data
+
+    trip = generate_trip(records, days)
+    firebase_utils.configure_local_cache(":memory:")
+    firebase_utils.use_backend(FakeDatabase(trip))
+    del trip
+    results = {}
+
+    # Leitura: primeira visita (download completo e cache em disco) e visitas seguintes
+    for path in ("locations", "progresso_viagem", "gastos"):
+        results[f"get_data.{path}"], _ = _best_of(
+            lambda _: firebase_utils.get_data(path), repeat, setup=lambda _: firebase_utils.reset_sync(path),
+        )
+    locations = firebase_utils.get_data("locations")
+    results["get_data.locations.cache"], _ = _best_of(lambda: firebase_utils.get_data("locations"), repeat)
+
+    # Página de progresso: tabela processada e dados do gráfico
+    progress = firebase_utils.get_data("progresso_viagem")
+    results["progresso.process_trip_data"], trip_df = _best_of(lambda: process_trip_data(progress), repeat)
+    results["progresso.grafico"], _ = _best_of(lambda: progress_chart_data(trip_df, "registros"), repeat)
+
+    # Página do mapa: armazenamento colunar, métricas e índice espacial (`fetch_map_data`)
+    def fetch_map_data(_):
+        store = location_store_for(locations, name="benchmark")
+        map_data = store.to_frame(["cidade", "latitude", "longitude", "timestamp"]).rename(columns={"timestamp": "hora"})
+        return map_data, track_metrics_for(locations, name="benchmark"), location_index_for(locations, name="benchmark")
+
+    results["mapa.dados"], (map_data, _, index) = _best_of(
+        fetch_map_data, repeat, setup=lambda _: _forget("benchmark"),
+    )
+    version = dataset_version(locations)
+
+    # Mapa folium com a linha simplificada e os marcadores da área visível, até o HTML final
+    def render_map(run):
+        m = build_route_map(map_data, route=True, version=f"{version}-{run}", markers=False)
+        build_marker_layer(map_data.iloc[visible_points(index)]).add_to(m)
+        return len(m.get_root().render())
+
+    results["mapa.folium"], _ = _best_of(render_map, repeat, setup=lambda run: run)
+
+    # Linha do tempo: índice dos grupos e uma janela do meio da viagem
+    store = location_store_for(locations, name="benchmark")
+
+    def render_timeline(_):
+        index = timeline_index_for(store, name="benchmark")
+        middle = len(store) // 2
+        return timeline_markdown(store, index, middle, middle + ROWS_PER_PAGE)
+
+    results["mapa.linha_do_tempo"], _ = _best_of(render_timeline, repeat, setup=lambda _: _forget("benchmark"))
+    _forget("benchmark")
+
+    # Página de gastos: uma página filtrada, o total do filtro e a formatação dos valores
+    expenses = firebase_utils.get_data("gastos")
+    results["gastos.pagina"], _ = _best_of(
+        lambda day: (load_expense_page("data", day, None, PAGE_SIZE), expense_total("data", day, None)),
+        repeat, setup=lambda run: f"2024-01-{2 + run:02d}",
+    )
+    values = [expense["valor"] for expense in expenses.values()]
+    results["gastos.format_currency"], _ = _best_of(lambda: format_currency(values), repeat)
+    return {stage: round(ms, 2) for stage, ms in results.items()}
+
+
+def compare(current: dict, reference: dict):
+    """
+    Compara dois relatórios e imprime a razão de cada etapa em comum.
+
+    Retorna:
+        list: As etapas que ficaram mais lentas que a tolerância, no formato "tamanho/etapa".
+    """
+    regressions = []
+    print(f"comparação com {reference.get('commit')} ({reference.get('data')})")
+    for size, stages in current["resultados"].items():
+        for stage, ms in stages.items():
+            previous = reference.get("resultados", {}).get(size, {}).get(stage)
+            if previous is None:
+                continue
+            status = ""
+            if ms > previous * (1 + TOLERANCE) + TOLERANCE_MS:
+                regressions.append(f"{size}/{stage}")
+                status = " REGRESSÃO"
+            print(f"{size:>8} {stage:<30} {previous:10.1f} -> {ms:10.1f} ms ({ms / max(previous, 1e-3):.2f}x){status}")
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Mede as etapas das páginas com viagens sintéticas.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES, help="Registros por caminho.")
+    parser.add_argument("--days", type=int, default=21, help="Duração da viagem sintética, em dias.")
+    parser.add_argument("--repeat", type=int, default=3, help="Repetições por etapa (usa o menor tempo).")
+    parser.add_argument("--output", help="Relatório JSON (padrão: benchmarks/reports/<commit>.json).")
+    parser.add_argument("--compare", help="Relatório de outro commit para comparação.")
+    args = parser.parse_args(argv)
+
+    report = {
+        "commit": _commit(),
+        "data": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "plataforma": platform.platform(),
+        "dias": args.days,
+        "repeticoes": args.repeat,
+        "resultados": {},
+    }
+    for size in args.sizes:
+        # Com 1M registros, uma repetição já leva vários segundos
+        repeat = 1 if size >= 1_000_000 else args.repeat
+        report["resultados"][str(size)] = results = run_size(size, args.days, repeat)
+        print(f"{size} registros")
+        for stage, ms in results.items():
+            print(f"    {stage:<30} {ms:10.1f} ms")
+        gc.collect()
+
+    output = args.output or os.path.join(REPORTS_DIR, f"{report['commit']}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2, ensure_ascii=False)
+        f.write("\n")
+    print(f"relatório gravado em {os.path.relpath(output, ROOT)}")
+
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            regressions = compare(report, json.load(f))
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
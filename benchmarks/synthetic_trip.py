@@ -0,0 +1,147 @@
+"""
+Gerador de viagens sintéticas de vários dias, no formato gravado pelo app no Realtime Database.
+
+Os dados gerados (`locations`, `progresso_viagem`, `gastos` e os agregados em `rollups`) podem
+ser usados diretamente no emulador em memória (`fake_db.FakeDatabase`) ou gravados em um
+arquivo JSON e carregados com `BIKEPACKING_BACKEND=memory` e `BIKEPACKING_EMULATOR_DATA`.
+
+Uso:
+    python -m benchmarks.synthetic_trip data/viagem_sintetica.json --records 100000 --days 21
+    BIKEPACKING_BACKEND=memory BIKEPACKING_EMULATOR_DATA=data/viagem_sintetica.json streamlit run app.py
+"""
+import argparse
+import json
+import sys
+from datetime import datetime, timedelta
+
+import numpy as np
+
+from benchmarks.bench_track_simplify import generate_track
+from firebase.push_keys import generate_push_keys
+from firebase.rollups import ROLLUP_PATHS, ROLLUP_ROOT, compute_rollups
+
+CITIES = [
+    "Cunha", "Lorena", "Guaratinguetá", "Aparecida", "Campos do Jordão", "Paraty",
+    "São Luiz do Paraitinga", "Ubatuba", "Taubaté", "Pindamonhangaba", "Resende", "Bananal",
+]
+CATEGORIES = ["Alimentação", "Hospedagem", "Transporte", "Outros"]
+TRIP_START = datetime(2024, 1, 1)
+# Pedalada diária: das 7h às 17h, cerca de 80 km
+RIDE_START_H = 7
+RIDE_HOURS = 10
+DAILY_DISTANCE_M = 80_000
+
+
+def _timestamps(count: int, days: int):
+    """
+    Horários dos registros, distribuídos uniformemente pelas horas de pedalada de cada dia.
+    """
+    position = np.arange(count) * days / max(count, 1)
+    day = np.floor(position).astype(np.int64)
+    seconds = RIDE_START_H * 3600 + (position - day) * RIDE_HOURS * 3600
+    return [
+        (TRIP_START + timedelta(days=int(d), seconds=int(s))).strftime("%Y-%m-%d %H:%M:%S")
+        for d, s in zip(day.tolist(), seconds.tolist())
+    ], day
+
+
+def generate_locations(count: int, days: int, seed: int = 42):
+    """
+    Gera registros de `locations`: um percurso contínuo, com a cidade do dia em cada ponto.
+    """
+    latitudes, longitudes = generate_track(count, seed=seed, step_m=DAILY_DISTANCE_M * days / max(count, 1))
+    altitudes = 600 + 400 * np.sin(np.linspace(0, 6 * np.pi, count))
+    timestamps, day = _timestamps(count, days)
+    keys = generate_push_keys(count)
+    return {
+        keys[i]: {
+            "cidade": CITIES[day[i] % len(CITIES)],
+            "latitude": round(float(latitudes[i]), 6),
+            "longitude": round(float(longitudes[i]), 6),
+            "altitude": round(float(altitudes[i]), 1),
+            "timestamp": timestamps[i],
+        }
+        for i in range(count)
+    }
+
+
+def generate_progress(count: int, days: int, seed: int = 42):
+    """
+    Gera registros de `progresso_viagem`, como enviados pelo formulário de progresso.
+    """
+    rng = np.random.default_rng(seed)
+    distances = rng.uniform(5, 40, count).round(2)
+    elevations = rng.integers(0, 600, count)
+    hours, minutes = rng.integers(0, 4, count), rng.integers(0, 60, count)
+    timestamps, _ = _timestamps(count, days)
+    keys = generate_push_keys(count)
+    return {
+        keys[i]: {
+            "distancia": float(distances[i]),
+            "altimetria": int(elevations[i]),
+            "tempo": f"{hours[i]:02}:{minutes[i]:02}",
+            "timestamp": timestamps[i],
+        }
+        for i in range(count)
+    }
+
+
+def generate_expenses(count: int, days: int, seed: int = 42):
+    """
+    Gera registros de `gastos`, como enviados pelo formulário de gastos.
+    """
+    rng = np.random.default_rng(seed)
+    categories = rng.integers(0, len(CATEGORIES), count)
+    values = rng.gamma(2.0, 40.0, count).round(2)
+    timestamps, _ = _timestamps(count, days)
+    keys = generate_push_keys(count)
+    return {
+        keys[i]: {
+            "categoria": CATEGORIES[categories[i]],
+            "descricao": f"Gasto {i}",
+            "valor": float(values[i]),
+            "data": timestamps[i][:10],
+            "timestamp": timestamps[i],
+        }
+        for i in range(count)
+    }
+
+
+def generate_trip(records: int, days: int = 21, seed: int = 42):
+    """
+    Gera uma viagem completa, com `records` registros em cada caminho e os agregados correspondentes.
+
+    Parâmetros:
+        records (int): Quantidade de registros de cada caminho.
+        days (int): Duração da viagem, em dias.
+        seed (int): Semente dos valores aleatórios.
+
+    Retorna:
+        dict: A árvore do banco de dados, no formato aceito por `FakeDatabase`.
+    """
+    trip = {
+        "locations": generate_locations(records, days, seed),
+        "progresso_viagem": generate_progress(records, days, seed),
+        "gastos": generate_expenses(records, days, seed),
+    }
+    trip[ROLLUP_ROOT] = {path: compute_rollups(path, trip[path]) for path in ROLLUP_PATHS}
+    return trip
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Gera uma viagem sintética em um arquivo JSON.")
+    parser.add_argument("output", help="Arquivo JSON de saída (ver BIKEPACKING_EMULATOR_DATA).")
+    parser.add_argument("--records", type=int, default=10_000, help="Registros de cada caminho.")
+    parser.add_argument("--days", type=int, default=21, help="Duração da viagem, em dias.")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args(argv)
+
+    trip = generate_trip(args.records, args.days, args.seed)
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(trip, f, ensure_ascii=False)
+    print(f"{args.records} registros por caminho, {args.days} dias, gravados em {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
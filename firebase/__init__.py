@@ -1 +1,3 @@
-from .firebase_utils import authenticate_user, initialize_firebase, set_data, get_data
+from .firebase_utils import authenticate_user, initialize_firebase, set_data, set_data_batch, update_data, data_revision, get_data, get_rollups, query_data, sync_data, reset_sync, use_backend, use_auth_backend, configure_local_cache, configure_outbox, outbox_path_for, get_outbox, configure_shared_cache, get_cache_stats, watch_path, generate_push_key
+from .sessions import issue_session, verify_session, revoke_session
+from .instrumentation import span, timed, begin_run, end_run, export_jsonl, prometheus_text
@@ -0,0 +1,135 @@
+import asyncio
+import contextvars
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from . import firebase_utils
+from .rollups import ROLLUP_ROOT
+
+# Tempo máximo padrão de cada leitura, em segundos
+DEFAULT_TIMEOUT = 15.0
+MAX_WORKERS = 8
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def _get_executor():
+    """
+    Retorna o pool de threads das leituras, criando-o na primeira chamada.
+    """
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=MAX_WORKERS, thread_name_prefix="firebase-leitura")
+        return _executor
+
+
+async def get_data_async(reference_path: str, timeout: float = DEFAULT_TIMEOUT):
+    """
+    Obtém dados de um caminho sem bloquear o loop de eventos.
+
+    A chamada bloqueante de `firebase_utils.get_data` roda em um pool de threads. Se o tempo
+    esgotar ou a tarefa for cancelada, o resultado é descartado; a requisição já enviada ao
+    Firebase não é interrompida, mas a página deixa de esperar por ela.
+
+    Parâmetros:
+        reference_path (str): O caminho de referência no banco de dados Firebase.
+        timeout (float, opcional): Tempo máximo de espera, em segundos (None para esperar indefinidamente).
+
+    Retorna:
+        dict: Os dados obtidos, como em `get_data`.
+
+    Levanta:
+        RuntimeError: Se a leitura falhar ou o tempo esgotar.
+    """
+    return await _read_async(firebase_utils.get_data, reference_path, timeout)
+
+
+async def get_rollups_async(reference_path: str, timeout: float = DEFAULT_TIMEOUT):
+    """
+    Obtém os agregados de um caminho sem bloquear o loop de eventos, como em `firebase_utils.get_rollups`.
+
+    Parâmetros:
+        reference_path (str): "progresso_viagem" ou "gastos".
+        timeout (float, opcional): Tempo máximo de espera, em segundos (None para esperar indefinidamente).
+
+    Retorna:
+        dict: Os agregados, ou None se o caminho estiver vazio.
+
+    Levanta:
+        RuntimeError: Se a leitura falhar ou o tempo esgotar.
+    """
+    return await _read_async(firebase_utils.get_rollups, reference_path, timeout)
+
+
+async def _read_async(read, reference_path, timeout):
+    loop = asyncio.get_running_loop()
+    try:
+        return await asyncio.wait_for(
+            # O contexto é copiado para que a leitura entre na medição da página (ver `instrumentation`)
+            loop.run_in_executor(_get_executor(), contextvars.copy_context().run, read, reference_path),
+            timeout,
+        )
+    except asyncio.TimeoutError:
+        raise RuntimeError(f"Tempo esgotado ao obter dados de '{reference_path}' ({timeout:.1f}s)")
+    except RuntimeError:
+        raise
+    except Exception as e:
+        raise RuntimeError(f"Erro ao obter dados: {e}")
+
+
+async def get_many_async(reference_paths, timeout: float = DEFAULT_TIMEOUT, return_exceptions: bool = False):
+    """
+    Obtém dados de vários caminhos ao mesmo tempo.
+
+    O tempo total fica próximo ao da leitura mais lenta, em vez da soma de todas. Caminhos de
+    agregados ("rollups/gastos") são lidos com `get_rollups_async`, que os calcula a partir dos
+    dados brutos enquanto não existirem no banco.
+
+    Parâmetros:
+        reference_paths (list): Os caminhos de referência no banco de dados Firebase.
+        timeout (float, opcional): Tempo máximo de cada leitura, em segundos.
+        return_exceptions (bool): Se True, uma leitura que falhar devolve o erro no lugar dos dados
+            e as demais continuam; se False, a primeira falha cancela as leituras restantes.
+
+    Retorna:
+        dict: Mapeia cada caminho para os dados obtidos (ou para o erro, com `return_exceptions`).
+
+    Levanta:
+        RuntimeError: Se alguma leitura falhar ou o tempo esgotar (quando `return_exceptions` é False).
+    """
+    reference_paths = list(dict.fromkeys(reference_paths))
+    tasks = [asyncio.ensure_future(_get_path_async(path, timeout)) for path in reference_paths]
+    try:
+        results = await asyncio.gather(*tasks, return_exceptions=return_exceptions)
+    finally:
+        # Em caso de falha ou cancelamento, as leituras ainda pendentes deixam de ser aguardadas
+        for task in tasks:
+            task.cancel()
+    return dict(zip(reference_paths, results))
+
+
+def _get_path_async(reference_path, timeout):
+    root, _, rollup_path = reference_path.partition("/")
+    if root == ROLLUP_ROOT and rollup_path:
+        return get_rollups_async(rollup_path, timeout)
+    return get_data_async(reference_path, timeout)
+
+
+def get_many(reference_paths, timeout: float = DEFAULT_TIMEOUT, return_exceptions: bool = False):
+    """
+    Versão síncrona de `get_many_async`, para uso direto nas páginas do Streamlit.
+
+    Parâmetros:
+        reference_paths (list): Os caminhos de referência no banco de dados Firebase.
+        timeout (float, opcional): Tempo máximo de cada leitura, em segundos.
+        return_exceptions (bool): Ver `get_many_async`.
+
+    Retorna:
+        dict: Mapeia cada caminho para os dados obtidos.
+
+    Levanta:
+        RuntimeError: Se alguma leitura falhar ou o tempo esgotar (quando `return_exceptions` é False).
+    """
+    return asyncio.run(get_many_async(reference_paths, timeout, return_exceptions))
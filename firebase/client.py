@@ -0,0 +1,287 @@
+"""
+Cliente único do Firebase no processo.
+
+O app do Firebase Admin é inicializado uma única vez, na primeira leitura ou escrita, com a URL
+do banco e as credenciais vindas do ambiente; até lá, o SDK nem é importado. As referências aos
+caminhos são reaproveitadas, e todas usam o mesmo cliente HTTP do app (e o seu pool de conexões).
+
+Variáveis de ambiente:
+    BIKEPACKING_BACKEND: "firebase" (padrão) ou "memory", para o emulador em memória (`fake_db`).
+    BIKEPACKING_DATABASE_URL: URL do Realtime Database.
+    BIKEPACKING_CREDENTIALS: Caminho do arquivo da conta de serviço ou o próprio JSON.
+    BIKEPACKING_EMULATOR_DATA: Arquivo JSON com os dados iniciais do emulador em memória.
+    BIKEPACKING_EMULATOR_USERS: Emails dos usuários do emulador em memória, separados por vírgula.
+    FIREBASE_DATABASE_EMULATOR_HOST: Endereço do emulador oficial do Firebase (dispensa credenciais).
+"""
+import json
+import os
+import threading
+from collections import OrderedDict
+
+DATABASE_URL = os.getenv("BIKEPACKING_DATABASE_URL", "https://bikepacking-tracker-3fa9f-default-rtdb.firebaseio.com/")
+CREDENTIALS_PATH = "firebase/service_account.json"
+# Referências reaproveitadas por cliente; caminhos usados há mais tempo são descartados
+MAX_REFERENCES = 1024
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def load_credentials(source=None):
+    """
+    Localiza as credenciais da conta de serviço.
+
+    A ordem de busca é: o valor informado, a variável `BIKEPACKING_CREDENTIALS`, o arquivo
+    `firebase/service_account.json` e, por fim, `st.secrets["firebase"]["credentials"]`.
+
+    Parâmetros:
+        source (dict | str, opcional): Credenciais, caminho do arquivo ou texto JSON.
+
+    Retorna:
+        dict: As credenciais, ou None se nenhuma fonte estiver disponível.
+
+    Levanta:
+        RuntimeError: Se a fonte informada não puder ser lida.
+    """
+    source = source or os.getenv("BIKEPACKING_CREDENTIALS")
+    if source is None and os.path.exists(CREDENTIALS_PATH):
+        source = CREDENTIALS_PATH
+    if source is None:
+        return _streamlit_credentials()
+    if isinstance(source, dict):
+        return source
+    try:
+        if source.lstrip().startswith("{"):
+            return json.loads(source)
+        with open(source, "r") as f:
+            return json.load(f)
+    except (OSError, ValueError) as e:
+        raise RuntimeError(f"Erro ao carregar credenciais: {e}")
+
+
+def _streamlit_credentials():
+    try:
+        import streamlit as st
+        return dict(st.secrets["firebase"]["credentials"])
+    except Exception:
+        return None
+
+
+class FirebaseClient:
+    """
+    Acesso ao Realtime Database por um único app do Firebase Admin, inicializado sob demanda.
+
+    Tem a mesma interface usada de `firebase_admin.db` (`reference(path)`), de modo que pode
+    ser trocado pelo emulador em memória (`fake_db.FakeDatabase`) com `firebase_utils.use_backend`.
+
+    Parâmetros:
+        database_url (str, opcional): URL do Realtime Database (padrão: `DATABASE_URL`).
+        credentials_source (dict | str, opcional): Credenciais (ver `load_credentials`).
+    """
+
+    def __init__(self, database_url: str = None, credentials_source=None):
+        self.database_url = database_url or DATABASE_URL
+        self._credentials_source = credentials_source
+        self._app = None
+        self._lock = threading.Lock()
+        self._references = OrderedDict()
+
+    def configure(self, database_url: str = None, credentials_source=None):
+        """
+        Define a URL e as credenciais, antes da inicialização.
+
+        Depois da inicialização, o app não pode mais ser trocado: repetir a mesma configuração não
+        tem efeito, e uma URL ou credenciais diferentes levantam um erro.
+
+        Parâmetros:
+            database_url (str, opcional): URL do Realtime Database.
+            credentials_source (dict | str, opcional): Credenciais (ver `load_credentials`).
+
+        Levanta:
+            RuntimeError: Se o app já foi inicializado com outra URL ou outras credenciais.
+        """
+        with self._lock:
+            if self._app is not None:
+                if database_url and database_url.rstrip("/") != self.database_url.rstrip("/"):
+                    raise RuntimeError(
+                        f"Erro ao configurar o Firebase: o app já foi inicializado com a URL {self.database_url}"
+                    )
+                if credentials_source is not None and (
+                    load_credentials(credentials_source) != load_credentials(self._credentials_source)
+                ):
+                    raise RuntimeError("Erro ao configurar o Firebase: o app já foi inicializado com outras credenciais")
+                return
+            if database_url:
+                self.database_url = database_url
+            if credentials_source is not None:
+                self._credentials_source = credentials_source
+
+    @property
+    def initialized(self):
+        """
+        bool: Se o app do Firebase já foi inicializado.
+        """
+        return self._app is not None
+
+    @property
+    def app(self):
+        """
+        firebase_admin.App: O app do Firebase, inicializado na primeira chamada.
+
+        Se o app padrão já tiver sido inicializado por outro código, ele é reaproveitado.
+
+        Levanta:
+            RuntimeError: Se não houver credenciais ou a inicialização falhar.
+        """
+        if self._app is None:
+            with self._lock:
+                if self._app is None:
+                    self._app = self._initialize()
+        return self._app
+
+    def reference(self, path: str = "/"):
+        """
+        Retorna a referência de um caminho, reaproveitando a criada anteriormente.
+
+        Parâmetros:
+            path (str): Caminho no banco de dados.
+
+        Retorna:
+            firebase_admin.db.Reference: A referência do caminho.
+        """
+        with self._lock:
+            reference = self._references.get(path)
+            if reference is not None:
+                self._references.move_to_end(path)
+                return reference
+        from firebase_admin import db
+
+        reference = db.reference(path, app=self.app)
+        with self._lock:
+            self._references[path] = reference
+            if len(self._references) > MAX_REFERENCES:
+                self._references.popitem(last=False)
+        return reference
+
+    def _initialize(self):
+        # Importado aqui: o SDK só é carregado no primeiro acesso ao banco, não ao abrir o app
+        import firebase_admin
+        from firebase_admin import credentials
+
+        try:
+            return firebase_admin.get_app()
+        except ValueError:
+            pass
+        try:
+            cred_dict = load_credentials(self._credentials_source)
+            if cred_dict is not None:
+                cred = credentials.Certificate(cred_dict)
+            elif os.getenv("FIREBASE_DATABASE_EMULATOR_HOST"):
+                # O emulador oficial não exige credenciais
+                cred = None
+            else:
+                raise RuntimeError(
+                    "credenciais não encontradas (defina BIKEPACKING_CREDENTIALS ou "
+                    f"crie {CREDENTIALS_PATH})"
+                )
+            return firebase_admin.initialize_app(cred, {"databaseURL": self.database_url})
+        except Exception as e:
+            raise RuntimeError(f"Erro ao inicializar o Firebase: {e}")
+
+
+class FirebaseAuth:
+    """
+    Consulta de usuários no Firebase Authentication, pelo app do cliente do processo.
+
+    Parâmetros:
+        client (FirebaseClient, opcional): Cliente cujo app é usado (padrão: `get_client()`).
+    """
+
+    def __init__(self, client: FirebaseClient = None):
+        self._client = client
+
+    def get_user_by_email(self, email: str):
+        """
+        Busca um usuário pelo email.
+
+        Parâmetros:
+            email (str): O email do usuário.
+
+        Retorna:
+            dict: O "uid" e o "email" do usuário, ou None se não existir.
+        """
+        from firebase_admin import auth
+
+        try:
+            user = auth.get_user_by_email(email, app=(self._client or get_client()).app)
+        except auth.UserNotFoundError:
+            return None
+        return {"uid": user.uid, "email": user.email}
+
+
+def get_client():
+    """
+    Retorna o cliente do Firebase do processo, criando-o (sem conectar) na primeira chamada.
+
+    Retorna:
+        FirebaseClient: O cliente compartilhado.
+    """
+    global _client
+    with _client_lock:
+        if _client is None:
+            _client = FirebaseClient()
+        return _client
+
+
+def create_backend(kind: str = None):
+    """
+    Cria o backend do Realtime Database indicado por `BIKEPACKING_BACKEND`.
+
+    Parâmetros:
+        kind (str, opcional): "firebase" ou "memory"; por padrão, o valor da variável de ambiente.
+
+    Retorna:
+        O cliente do Firebase (`get_client`) ou um `FakeDatabase` com os dados de
+        `BIKEPACKING_EMULATOR_DATA`, se definido.
+
+    Levanta:
+        ValueError: Se o tipo de backend não for reconhecido.
+    """
+    kind = kind or os.getenv("BIKEPACKING_BACKEND", "firebase")
+    if kind == "firebase":
+        return get_client()
+    if kind == "memory":
+        from .fake_db import FakeDatabase
+
+        data_path = os.getenv("BIKEPACKING_EMULATOR_DATA")
+        initial = None
+        if data_path:
+            with open(data_path, "r") as f:
+                initial = json.load(f)
+        return FakeDatabase(initial)
+    raise ValueError(f"Backend desconhecido: {kind}")
+
+
+def create_auth_backend(kind: str = None):
+    """
+    Cria o backend de autenticação indicado por `BIKEPACKING_BACKEND`.
+
+    Parâmetros:
+        kind (str, opcional): "firebase" ou "memory"; por padrão, o valor da variável de ambiente.
+
+    Retorna:
+        Um `FirebaseAuth` ou um `FakeAuth` com os emails de `BIKEPACKING_EMULATOR_USERS`
+        (separados por vírgula).
+
+    Levanta:
+        ValueError: Se o tipo de backend não for reconhecido.
+    """
+    kind = kind or os.getenv("BIKEPACKING_BACKEND", "firebase")
+    if kind == "firebase":
+        return FirebaseAuth()
+    if kind == "memory":
+        from .fake_db import FakeAuth
+
+        users = os.getenv("BIKEPACKING_EMULATOR_USERS", "")
+        return FakeAuth([email.strip() for email in users.split(",") if email.strip()])
+    raise ValueError(f"Backend desconhecido: {kind}")
@@ -0,0 +1,354 @@
+import copy
+import queue
+import threading
+import time
+
+from .push_keys import generate_push_key
+
+
+def _split(path: str):
+    return [part for part in (path or "").split("/") if part]
+
+
+class FakeDatabase:
+    """
+    Substituto local e em memória do módulo `firebase_admin.db`.
+
+    Implementa o subconjunto da API usado pelo projeto (`reference`, `get`, `set`, `push`,
+    `update`, `transaction`, `delete`, `listen` e consultas ordenadas) para permitir testes e
+    benchmarks sem rede.
+    Uma instância pode ser usada diretamente como backend em `firebase_utils.use_backend`.
+
+    Parâmetros:
+        initial (dict, opcional): Conteúdo inicial do banco de dados.
+        latency (float): Atraso simulado, em segundos, de cada leitura ou escrita (ida e volta à rede).
+    """
+
+    def __init__(self, initial: dict = None, latency: float = 0.0):
+        self._lock = threading.RLock()
+        self._root = copy.deepcopy(initial) if initial else {}
+        self.latency = latency
+        self._listeners = []
+
+    def reference(self, path: str = "/"):
+        """
+        Retorna uma referência para o caminho informado, como `firebase_admin.db.reference`.
+        """
+        return FakeReference(self, _split(path))
+
+    def dump(self):
+        """
+        Retorna uma cópia de todo o conteúdo do banco de dados.
+        """
+        with self._lock:
+            return copy.deepcopy(self._root)
+
+    def disconnect_listeners(self):
+        """
+        Simula a queda da conexão: os listeners ativos param de receber eventos sem serem fechados.
+        """
+        with self._lock:
+            listeners, self._listeners = self._listeners, []
+        for registration in listeners:
+            registration._stop()
+
+    def _notify(self, parts, event_type: str, changes: dict):
+        # Chamado com o lock adquirido, logo após a escrita; `changes` mapeia caminhos relativos a `parts`
+        for registration in list(self._listeners):
+            listen_parts = registration._parts
+            if parts[:len(listen_parts)] == listen_parts:
+                relative = "/" + "/".join(parts[len(listen_parts):])
+                if event_type == "put":
+                    registration._deliver("put", relative, copy.deepcopy(changes[""]))
+                else:
+                    registration._deliver("patch", relative, copy.deepcopy(changes))
+            elif any(
+                (parts + _split(path))[:len(listen_parts)] == listen_parts
+                or listen_parts[:len(parts) + len(_split(path))] == parts + _split(path)
+                for path in changes
+            ):
+                # Escrita acima do caminho ouvido: envia o novo conteúdo completo do caminho
+                registration._deliver("put", "/", copy.deepcopy(self._read(listen_parts)))
+
+    def _round_trip(self):
+        # Fora do lock, para que requisições simultâneas esperem em paralelo, como na rede
+        if self.latency:
+            time.sleep(self.latency)
+
+    def _read(self, parts):
+        node = self._root
+        for part in parts:
+            if not isinstance(node, dict) or part not in node:
+                return None
+            node = node[part]
+        return node
+
+    def _write(self, parts, value):
+        if not parts:
+            self._root = value if isinstance(value, dict) else {}
+            return
+        node = self._root
+        for part in parts[:-1]:
+            if not isinstance(node.get(part), dict):
+                node[part] = {}
+            node = node[part]
+        if value is None:
+            node.pop(parts[-1], None)
+        else:
+            node[parts[-1]] = value
+
+
+class FakeAuth:
+    """
+    Substituto local e em memória da busca de usuários do Firebase Authentication.
+
+    Pode ser usado como backend em `firebase_utils.use_auth_backend`.
+
+    Parâmetros:
+        users (list, opcional): Emails dos usuários cadastrados.
+        latency (float): Atraso simulado, em segundos, de cada consulta.
+    """
+
+    def __init__(self, users=None, latency: float = 0.0):
+        self._lock = threading.Lock()
+        self._users = {}
+        self.latency = latency
+        self.lookups = 0
+        for email in users or []:
+            self.add_user(email)
+
+    def add_user(self, email: str, uid: str = None):
+        """
+        Cadastra um usuário e retorna seus dados ("uid" e "email").
+        """
+        user = {"uid": uid or generate_push_key(), "email": email}
+        with self._lock:
+            self._users[email.lower()] = user
+        return dict(user)
+
+    def delete_user(self, email: str):
+        """
+        Remove um usuário cadastrado.
+        """
+        with self._lock:
+            self._users.pop(email.lower(), None)
+
+    def get_user_by_email(self, email: str):
+        """
+        Busca um usuário pelo email, como `client.FirebaseAuth.get_user_by_email`.
+
+        Retorna:
+            dict: O "uid" e o "email" do usuário, ou None se não existir.
+        """
+        if self.latency:
+            time.sleep(self.latency)
+        with self._lock:
+            self.lookups += 1
+            user = self._users.get((email or "").lower())
+        return dict(user) if user else None
+
+
+class FakeQuery:
+    """
+    Consulta ordenada sobre os filhos de uma `FakeReference`, como `firebase_admin.db.Query`.
+    """
+
+    def __init__(self, ref, order_by: str, child_path: str = None):
+        self._ref = ref
+        self._order_by = order_by
+        self._child_path = _split(child_path) if child_path else []
+        self._start = None
+        self._end = None
+        self._equal = None
+        self._limit_first = None
+        self._limit_last = None
+
+    def start_at(self, start):
+        self._start = start
+        return self
+
+    def end_at(self, end):
+        self._end = end
+        return self
+
+    def equal_to(self, value):
+        self._equal = value
+        return self
+
+    def limit_to_first(self, limit: int):
+        self._limit_first = limit
+        return self
+
+    def limit_to_last(self, limit: int):
+        self._limit_last = limit
+        return self
+
+    def _sort_value(self, key, value):
+        if self._order_by == "key":
+            return key
+        if self._order_by == "value":
+            return value
+        for part in self._child_path:
+            value = value.get(part) if isinstance(value, dict) else None
+        return value
+
+    def get(self):
+        children = self._ref.get()
+        if not isinstance(children, dict):
+            return {}
+
+        entries = []
+        for key, value in children.items():
+            sort_value = self._sort_value(key, value)
+            if self._equal is not None and sort_value != self._equal:
+                continue
+            if self._start is not None and (sort_value is None or sort_value < self._start):
+                continue
+            if self._end is not None and (sort_value is None or sort_value > self._end):
+                continue
+            entries.append((sort_value, key, value))
+
+        # O Firebase ordena valores ausentes primeiro e desempata pela chave
+        entries.sort(key=lambda entry: (entry[0] is not None, entry[0] if entry[0] is not None else "", entry[1]))
+        if self._limit_first is not None:
+            entries = entries[:self._limit_first]
+        if self._limit_last is not None:
+            entries = entries[-self._limit_last:] if self._limit_last else []
+        return {key: value for _, key, value in entries}
+
+
+class FakeReference:
+    """
+    Referência para um caminho de um `FakeDatabase`, como `firebase_admin.db.Reference`.
+    """
+
+    def __init__(self, database: FakeDatabase, parts: list):
+        self._db = database
+        self._parts = parts
+
+    @property
+    def key(self):
+        return self._parts[-1] if self._parts else None
+
+    @property
+    def path(self):
+        return "/" + "/".join(self._parts)
+
+    @property
+    def parent(self):
+        return FakeReference(self._db, self._parts[:-1]) if self._parts else None
+
+    def child(self, path: str):
+        return FakeReference(self._db, self._parts + _split(path))
+
+    def get(self, etag=False, shallow=False):
+        self._db._round_trip()
+        with self._db._lock:
+            value = copy.deepcopy(self._db._read(self._parts))
+        if shallow and isinstance(value, dict):
+            value = {key: True for key in value}
+        return (value, None) if etag else value
+
+    def set(self, value):
+        self._db._round_trip()
+        with self._db._lock:
+            self._db._write(self._parts, copy.deepcopy(value))
+            self._db._notify(self._parts, "put", {"": value})
+
+    def push(self, value=""):
+        ref = self.child(generate_push_key())
+        ref.set(value)
+        return ref
+
+    def update(self, value: dict):
+        # Chaves com "/" atualizam vários caminhos de uma só vez, como no Firebase
+        self._db._round_trip()
+        with self._db._lock:
+            for path, item in value.items():
+                self._db._write(self._parts + _split(path), copy.deepcopy(item))
+            self._db._notify(self._parts, "patch", value)
+
+    def transaction(self, transaction_update):
+        # O lock do banco garante a atomicidade que o Firebase obtém com novas tentativas
+        self._db._round_trip()
+        with self._db._lock:
+            current = copy.deepcopy(self._db._read(self._parts))
+            new_value = transaction_update(current)
+            self._db._write(self._parts, copy.deepcopy(new_value))
+            self._db._notify(self._parts, "put", {"": new_value})
+            return new_value
+
+    def delete(self):
+        self._db._round_trip()
+        with self._db._lock:
+            self._db._write(self._parts, None)
+            self._db._notify(self._parts, "put", {"": None})
+
+    def listen(self, callback):
+        """
+        Registra `callback` para receber os eventos de alteração do caminho, como `Reference.listen`.
+
+        O primeiro evento é um "put" com o conteúdo atual; os eventos são entregues em uma thread
+        própria, na ordem das escritas.
+        """
+        self._db._round_trip()
+        registration = FakeListenerRegistration(self._db, self._parts, callback)
+        with self._db._lock:
+            registration._deliver("put", "/", copy.deepcopy(self._db._read(self._parts)))
+            self._db._listeners.append(registration)
+        return registration
+
+    def order_by_key(self):
+        return FakeQuery(self, "key")
+
+    def order_by_value(self):
+        return FakeQuery(self, "value")
+
+    def order_by_child(self, path: str):
+        return FakeQuery(self, "child", path)
+
+
+class FakeEvent:
+    """
+    Evento de alteração entregue aos listeners, como `firebase_admin.db.Event`.
+    """
+
+    def __init__(self, event_type: str, path: str, data):
+        self.event_type = event_type
+        self.path = path
+        self.data = data
+
+
+class FakeListenerRegistration:
+    """
+    Listener registrado com `FakeReference.listen`, como `firebase_admin.db.ListenerRegistration`.
+    """
+
+    def __init__(self, database: FakeDatabase, parts: list, callback):
+        self._db = database
+        self._parts = parts
+        self._callback = callback
+        self._events = queue.Queue()
+        self._thread = threading.Thread(target=self._run, name="fake-listener", daemon=True)
+        self._thread.start()
+
+    def close(self):
+        with self._db._lock:
+            if self in self._db._listeners:
+                self._db._listeners.remove(self)
+        self._stop()
+        if self._thread is not threading.current_thread():
+            self._thread.join()
+
+    def _deliver(self, event_type, path, data):
+        self._events.put(FakeEvent(event_type, path, data))
+
+    def _stop(self):
+        self._events.put(None)
+
+    def _run(self):
+        while True:
+            event = self._events.get()
+            if event is None:
+                return
+            self._callback(event)
@@ -1,30 +1,87 @@
-import firebase_admin
-from firebase_admin import credentials, db, auth
 from datetime import datetime
+import logging
+import os
+import threading
+import time
+from .client import create_auth_backend, create_backend, get_client
+from .listeners import ListenerService
+from .local_cache import LocalCache, CACHED_PATHS
+from .outbox import Outbox
+from .rollups import ROLLUP_PATHS, ROLLUP_ROOT, apply_rollups, compute_rollups
+from .shared_cache import SharedCache, estimate_size
+from .instrumentation import timed
+from .push_keys import generate_push_key, push_key_prefix
+
+logger = logging.getLogger(__name__)
+
+# Backend do Realtime Database: o cliente do Firebase (ver `client`) ou o emulador em memória (ver `fake_db`)
+_backend = create_backend()
+# Backend de autenticação: o Firebase Authentication (ver `client.FirebaseAuth`) ou `fake_db.FakeAuth`
+_auth_backend = create_auth_backend()
+
+# Estado da sincronização incremental por caminho: último push key visto e registros já baixados
+_sync_lock = threading.Lock()
+_sync_state = {}
+_fetch_locks = {}
+_refreshing = set()
+# Registros gravados por outros processos chegam ao banco com o push key gerado na escrita, que
+# pode ser bem anterior ao envio (fila de escrita offline) e, portanto, menor que o cursor. Por
+# isso, a cada `SYNC_LOOKBACK_INTERVAL` segundos a sincronização relê as chaves das últimas
+# `BIKEPACKING_SYNC_LOOKBACK_H` horas antes do cursor
+SYNC_LOOKBACK_S = float(os.getenv("BIKEPACKING_SYNC_LOOKBACK_H", "72")) * 3600
+SYNC_LOOKBACK_INTERVAL = 600.0
+# Lotes com push keys anteriores a essa janela (ex.: pontos importados, com a chave do horário de
+# cada ponto) são anunciados em `sincronizacao/<caminho>`, em ordem de envio, com a menor chave
+SYNC_MARKERS_ROOT = "sincronizacao"
+
+# Cache persistente em disco, criado sob demanda
+LOCAL_CACHE_PATH = os.getenv("BIKEPACKING_CACHE_PATH", "data/local_cache.sqlite3")
+_local_cache = None
+_local_cache_lock = threading.Lock()
+
+# Fila de escrita durável, criada sob demanda
+OUTBOX_PATH = os.getenv("BIKEPACKING_OUTBOX_PATH", "data/outbox.jsonl")
+_outbox = None
+_outbox_lock = threading.Lock()
+
+# Cópia única, por processo, dos dados lidos (compartilhada por todas as sessões do Streamlit)
+SHARED_CACHE_MAX_BYTES = int(os.getenv("BIKEPACKING_SHARED_CACHE_MB", "256")) * 2 ** 20
+# Validade das cópias de caminhos que não são sincronizados nem acompanhados por listener
+SHARED_CACHE_TTL = 30.0
+_shared_cache = SharedCache(SHARED_CACHE_MAX_BYTES)
+
+# Listeners do Realtime Database compartilhados por todas as sessões do processo, criados sob demanda
+_listener_service = None
+_listener_lock = threading.Lock()
 
 def initialize_firebase(cred_dict, database_url):
     """
     Inicializa a conexão com o Firebase utilizando as credenciais fornecidas e a URL do banco de dados.
 
+    Não é necessária para as páginas: o cliente do Firebase se inicializa na primeira leitura ou
+    escrita, com as credenciais do ambiente (ver `client.load_credentials`).
+
     Parâmetros:
         cred_dict (dict): Dicionário contendo as credenciais do Firebase.
         database_url (str): URL do banco de dados Firebase.
 
     Levanta:
-        RuntimeError: Se houver um erro ao inicializar a conexão com o Firebase.
+        RuntimeError: Se houver um erro ao inicializar a conexão com o Firebase, ou se ela já
+            tiver sido inicializada com outra URL ou outras credenciais.
     """
-    try:
-        cred = credentials.Certificate(cred_dict)
-        if not firebase_admin._apps:
-            firebase_admin.initialize_app(cred, {"databaseURL": database_url})
-    except Exception as e:
-        raise RuntimeError(f"Erro ao inicializar o Firebase: {e}")
+    client = get_client()
+    client.configure(database_url, cred_dict)
+    # Acessar o app força a inicialização, para que erros de credenciais apareçam aqui
+    client.app
 
 
 def authenticate_user(email: str, password: str):
     """
     Autentica um usuário no Firebase com base no email fornecido.
 
+    Faz uma consulta ao Firebase Authentication; nas execuções seguintes da página, a sessão
+    é validada localmente pelo token emitido no login (ver `sessions`).
+
     Parâmetros:
         email (str): O email do usuário.
         password (str): A senha do usuário (não utilizada diretamente aqui, mas incluída por questão de consistência).
@@ -36,36 +93,139 @@ def authenticate_user(email: str, password: str):
         RuntimeError: Se houver um erro durante o processo de autenticação.
     """
     try:
-        user = auth.get_user_by_email(email)
-        return {"uid": user.uid, "email": user.email}
-    except auth.UserNotFoundError:
-        return None
+        return _auth_backend.get_user_by_email(email)
     except Exception as e:
         raise RuntimeError(f"Erro ao autenticar usuário: {e}")
 
+@timed("set_data", label="reference_path")
 def set_data(reference_path: str, data: dict):
     """
     Envia dados para o Firebase, incluindo um timestamp automático.
 
+    O registro é gravado na fila de escrita local (`Outbox`) e enviado em segundo plano, em lote,
+    de modo que o envio não bloqueia a interface e não se perde sem conexão. Para os caminhos
+    espelhados localmente, o registro também é gravado no cache em disco para aparecer na
+    próxima leitura.
+
     Parâmetros:
         reference_path (str): O caminho de referência no banco de dados Firebase onde os dados serão armazenados.
         data (dict): Os dados a serem enviados para o Firebase.
+
+    Retorna:
+        str: O push key atribuído ao registro.
     
     Levanta:
-        RuntimeError: Se houver um erro ao enviar os dados para o Firebase.
+        RuntimeError: Se houver um erro ao registrar os dados na fila de escrita.
     """
     try:
-        ref = db.reference(reference_path)
         timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
         data_with_timestamp = {**data, "timestamp": timestamp}
-        ref.push(data_with_timestamp)
+        key = get_outbox().enqueue(reference_path, data_with_timestamp)
+        if reference_path in CACHED_PATHS:
+            _merge_records(reference_path, {key: data_with_timestamp}, advance_cursor=False)
+        return key
     except Exception as e:
         raise RuntimeError(f"Erro ao enviar dados: {e}")
 
+@timed("set_data_batch", label="reference_path")
+def set_data_batch(reference_path: str, records: list, keys: list = None):
+    """
+    Envia vários registros para o Firebase de uma só vez, pela fila de escrita.
+
+    Diferente de `set_data`, registros que já possuem "timestamp" (ex.: pontos importados
+    de um arquivo GPX) mantêm o seu horário; os demais recebem o horário atual.
+
+    Parâmetros:
+        reference_path (str): O caminho de referência no banco de dados Firebase onde os dados serão armazenados.
+        records (list): Os dados de cada registro.
+        keys (list, opcional): Push keys dos registros (ex.: `push_keys_for_times`); por padrão, novos push keys.
+
+    Retorna:
+        list: Os push keys atribuídos, na ordem dos registros.
+
+    Levanta:
+        RuntimeError: Se houver um erro ao registrar os dados na fila de escrita.
+    """
+    try:
+        timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        records = [record if record.get("timestamp") else {**record, "timestamp": timestamp} for record in records]
+        keys = get_outbox().enqueue_many(reference_path, records, keys)
+        if reference_path in CACHED_PATHS:
+            _merge_records(reference_path, dict(zip(keys, records)), advance_cursor=False)
+        return keys
+    except Exception as e:
+        raise RuntimeError(f"Erro ao enviar dados: {e}")
+
+def update_data(reference_path: str, updates: dict):
+    """
+    Altera campos de registros existentes, pela fila de escrita.
+
+    Só os campos informados são enviados (um caminho por campo, ex.: `locations/<chave>/cidade`),
+    de modo que os demais campos do registro são preservados mesmo que ele ainda não esteja no
+    estado local. As alterações não são somadas nos agregados (`rollups`); se elas mudarem
+    valores agregados de `gastos` ou `progresso_viagem`, use `python -m firebase.rollups rebuild`.
+    A revisão do caminho (ver `data_revision`) é incrementada.
+
+    Parâmetros:
+        reference_path (str): O caminho de referência no banco de dados Firebase.
+        updates (dict): Mapeia o push key de cada registro para os campos a alterar.
+
+    Retorna:
+        list: Os push keys dos registros alterados.
+
+    Levanta:
+        RuntimeError: Se houver um erro ao registrar as alterações na fila de escrita.
+    """
+    try:
+        keys = get_outbox().enqueue_many(reference_path, list(updates.values()), keys=list(updates), op="update")
+        if reference_path in CACHED_PATHS:
+            state = _load_state(reference_path)
+            with _sync_lock:
+                current = {key: state["data"].get(key) for key in updates}
+            records = {
+                key: {**current[key], **changes}
+                for key, changes in updates.items() if isinstance(current[key], dict)
+            }
+            if records:
+                _merge_records(reference_path, records, advance_cursor=False)
+        return keys
+    except Exception as e:
+        raise RuntimeError(f"Erro ao atualizar dados: {e}")
+
+def data_revision(reference_path: str):
+    """
+    Retorna a revisão dos registros de um caminho, incrementada quando registros já existentes mudam.
+
+    Complementa `push_keys.dataset_version`, que só muda quando chegam registros novos: a cidade
+    resolvida em segundo plano (ver `update_data`), por exemplo, não altera a quantidade nem o
+    maior push key.
+
+    Parâmetros:
+        reference_path (str): O caminho de referência no banco de dados Firebase.
+
+    Retorna:
+        int: A revisão (0 enquanto nenhum registro existente tiver mudado).
+    """
+    with _sync_lock:
+        state = _sync_state.get(reference_path)
+        revision = state["revision"] if state is not None else 0
+    view = _listener_service.view(reference_path) if _listener_service is not None else None
+    if view is not None:
+        revision += view.revision
+    return revision
+
+@timed("get_data", size=estimate_size, label="reference_path")
 def get_data(reference_path: str):
     """
     Obtém dados do Firebase a partir de um caminho de referência específico.
 
+    Os caminhos acompanhados por listener (ver `watch_path`) são servidos pela visão em memória,
+    com os registros ainda na fila de escrita mesclados por cima.
+    Os caminhos espelhados localmente (`CACHED_PATHS`) são servidos a partir do cache em disco
+    e atualizados em segundo plano; só a primeira leitura, com o cache vazio, espera pela rede.
+    Em todos os casos, o resultado fica em um cache único do processo (`SharedCache`),
+    invalidado quando o caminho é escrito; os dados retornados não devem ser alterados.
+
     Parâmetros:
         reference_path (str): O caminho de referência no banco de dados Firebase de onde os dados serão obtidos.
     
@@ -75,8 +235,559 @@ def get_data(reference_path: str):
     Levanta:
         RuntimeError: Se houver um erro ao recuperar os dados.
     """
+    view = _listener_service.view(reference_path) if _listener_service is not None else None
+    if view is not None and view.ready:
+        # Caminho acompanhado por listener: a visão em memória já está atualizada, exceto pelas
+        # escritas que ainda não saíram da fila (que só chegam à visão depois do envio)
+        outbox = get_outbox()
+        return _shared_cache.get(
+            reference_path, lambda: _with_pending(reference_path, view.snapshot(), outbox),
+            token=(view.version, outbox.version),
+        )
+
+    if reference_path in CACHED_PATHS:
+        if _snapshot_empty(reference_path):
+            # Cache vazio: a leitura espera pelo download. Um caminho ainda vazio não é guardado,
+            # para que a próxima leitura consulte o banco de novo
+            data = sync_data(reference_path)
+            if data is None:
+                return None
+            return _shared_cache.get(reference_path, lambda: data)
+        refresh_in_background(reference_path)
+        return _shared_cache.get(reference_path, lambda: _snapshot(reference_path))
+
     try:
-        ref = db.reference(reference_path)
-        return ref.get()
+        return _shared_cache.get(
+            reference_path, lambda: _backend.reference(reference_path).get(), ttl=SHARED_CACHE_TTL,
+        )
     except Exception as e:
         raise RuntimeError(f"Erro ao obter dados: {e}")
+
+def get_rollups(reference_path: str):
+    """
+    Obtém os agregados mantidos para um caminho (ver `firebase.rollups`).
+
+    Parâmetros:
+        reference_path (str): "progresso_viagem" ou "gastos".
+
+    Enquanto `rollups/<caminho>` não existir (nenhuma escrita desde a implantação dos agregados),
+    eles são calculados a partir dos dados brutos do caminho, e o resultado fica no cache do processo.
+
+    Retorna:
+        dict: Nós "total", "por_dia" e, para gastos, "por_categoria"; ou None se o caminho estiver vazio.
+
+    Levanta:
+        RuntimeError: Se houver um erro ao recuperar os dados.
+    """
+    rollup = get_data(f"{ROLLUP_ROOT}/{reference_path}")
+    if not rollup and reference_path in ROLLUP_PATHS:
+        # Invalidado junto com o caminho, a cada escrita nele
+        rollup = _shared_cache.get(
+            f"{reference_path}/?rollups", lambda: compute_rollups(reference_path, get_data(reference_path)),
+            ttl=SHARED_CACHE_TTL,
+        )
+    if rollup:
+        # Cópia rasa: o resultado de `get_data` é compartilhado com as outras sessões
+        rollup = {key: value for key, value in rollup.items() if key != "chaves_recentes"}
+    return rollup or None
+
+@timed("query_data", size=estimate_size, label="reference_path")
+def query_data(reference_path: str, order_by: str, start=None, end=None, limit: int = None, start_after=None):
+    """
+    Obtém uma janela dos registros de um caminho, ordenada por um campo, com a consulta feita no servidor.
+
+    Só os registros da janela são baixados (`order_by_child`, `start_at`, `end_at` e `limit_to_first`).
+    Nos caminhos espelhados localmente (`CACHED_PATHS`) com o cache em disco já preenchido, a
+    consulta é respondida com os dados locais (que incluem os registros ainda na fila de escrita)
+    e o caminho é atualizado em segundo plano; essa resposta local copia e ordena todos os
+    registros do caminho a cada consulta distinta (o resultado fica no cache único do processo),
+    o que custa mais que a consulta no servidor em caminhos muito grandes. Para paginar, passe em `start_after` o par
+    (valor, chave) do último registro da página anterior. O resultado fica no cache único do
+    processo, invalidado quando o caminho é escrito. No Firebase, o campo deve estar em
+    `.indexOn` nas regras do caminho.
+
+    Parâmetros:
+        reference_path (str): O caminho de referência no banco de dados.
+        order_by (str): Campo usado na ordenação e nos filtros (ex.: "data", "categoria").
+        start (opcional): Menor valor aceito do campo (inclusivo).
+        end (opcional): Maior valor aceito do campo (inclusivo).
+        limit (int, opcional): Quantidade máxima de registros.
+        start_after (tuple, opcional): Par (valor, chave) do último registro já exibido.
+
+    Retorna:
+        dict: Os registros da janela, indexados pelo push key, na ordem do campo (desempate pela chave).
+
+    Levanta:
+        RuntimeError: Se houver um erro ao recuperar os dados.
+    """
+    cache_path = f"{reference_path}/?{order_by}|{start}|{end}|{limit}|{start_after}"
+
+    def _load():
+        if local:
+            return _query_records(_snapshot(reference_path), order_by, start, end, limit, start_after)
+        return _query_backend(reference_path, order_by, start, end, limit, start_after)
+
+    local = reference_path in CACHED_PATHS and not _snapshot_empty(reference_path)
+    if local:
+        refresh_in_background(reference_path)
+    try:
+        return _shared_cache.get(cache_path, _load, ttl=SHARED_CACHE_TTL)
+    except Exception as e:
+        raise RuntimeError(f"Erro ao consultar dados: {e}")
+
+def sync_data(reference_path: str):
+    """
+    Obtém dados do Firebase de forma incremental, baixando apenas os filhos mais novos que o último push key visto.
+
+    Periodicamente, a busca começa `SYNC_LOOKBACK_S` antes do cursor, para receber registros
+    enviados com atraso por outros processos (push keys gerados antes do envio), ou na menor
+    chave dos lotes anunciados em `SYNC_MARKERS_ROOT` desde a última busca (registros com
+    push keys mais antigos, ex.: importados); só os registros novos ou alterados são mesclados. Os registros já recebidos ficam em memória no processo (e no cache em disco, para os caminhos
+    espelhados) e são mesclados com os novos, de modo que o resultado tem o mesmo formato de
+    `get_data`. Indicado para caminhos que só recebem `push` (`locations`, `gastos`, `progresso_viagem`).
+
+    Parâmetros:
+        reference_path (str): O caminho de referência no banco de dados Firebase de onde os dados serão obtidos.
+
+    Retorna:
+        dict: Os registros mesclados, ordenados pela chave, ou None se o caminho estiver vazio.
+
+    Levanta:
+        RuntimeError: Se houver um erro ao recuperar os dados.
+    """
+    try:
+        with _sync_lock:
+            fetch_lock = _fetch_locks.setdefault(reference_path, threading.Lock())
+
+        # Uma busca por caminho de cada vez; leituras do estado local não esperam pela rede
+        with fetch_lock:
+            state = _load_state(reference_path)
+            start = state["cursor"]
+            markers = {}
+            if time.monotonic() - state.get("lookback_at", 0.0) >= SYNC_LOOKBACK_INTERVAL:
+                state["lookback_at"] = time.monotonic()
+                markers = _new_markers(reference_path, state["marker"])
+                if start is not None:
+                    start = min(start, push_key_prefix((time.time() - SYNC_LOOKBACK_S) * 1000), *markers.values())
+            query = _backend.reference(reference_path).order_by_key()
+            if start is not None:
+                query = query.start_at(start)
+            fetched = query.get() or {}
+
+            # start_at é inclusivo e a releitura traz registros já mesclados: ficam só os novos ou
+            # alterados, mas o cursor avança até a maior chave recebida (inclusive registros gravados
+            # por este processo, que já estavam mesclados)
+            with _sync_lock:
+                data = state["data"]
+                new_records = {key: record for key, record in fetched.items() if data.get(key) != record}
+                behind = bool(fetched) and max(fetched) > (state["cursor"] or "")
+            if new_records or behind:
+                _merge_records(reference_path, new_records, cursor=max(fetched))
+            if markers:
+                _set_marker(reference_path, max(markers))
+
+        return _snapshot(reference_path)
+    except Exception as e:
+        raise RuntimeError(f"Erro ao sincronizar dados: {e}")
+
+def _new_markers(reference_path: str, seen: str):
+    """
+    Retorna os lotes anunciados em `SYNC_MARKERS_ROOT` depois de `seen` (marcador -> menor push key).
+    """
+    query = _backend.reference(f"{SYNC_MARKERS_ROOT}/{reference_path}").order_by_key()
+    if seen is not None:
+        query = query.start_at(seen)
+    markers = query.get() or {}
+    markers.pop(seen, None)
+    return markers
+
+def _set_marker(reference_path: str, marker: str):
+    state = _load_state(reference_path)
+    with _sync_lock:
+        state["marker"] = marker
+    cache = get_local_cache() if reference_path in CACHED_PATHS else None
+    if cache is not None:
+        cache.set_cursor(f"{SYNC_MARKERS_ROOT}/{reference_path}", marker)
+
+def refresh_in_background(reference_path: str):
+    """
+    Dispara uma sincronização incremental do caminho em uma thread separada.
+
+    Se já houver uma sincronização em andamento para o caminho, nada é feito.
+
+    Parâmetros:
+        reference_path (str): O caminho de referência a ser sincronizado.
+    """
+    with _sync_lock:
+        if reference_path in _refreshing:
+            return
+        _refreshing.add(reference_path)
+
+    def _run():
+        try:
+            sync_data(reference_path)
+        except RuntimeError as e:
+            # Sem conexão: os dados locais continuam valendo e a próxima leitura tenta de novo
+            logger.warning("Falha ao atualizar '%s' em segundo plano: %s", reference_path, e)
+        finally:
+            with _sync_lock:
+                _refreshing.discard(reference_path)
+
+    threading.Thread(target=_run, name=f"refresh-{reference_path}", daemon=True).start()
+
+def reset_sync(reference_path: str = None):
+    """
+    Descarta o estado de sincronização incremental, forçando um download completo na próxima chamada.
+
+    O cache em disco dos caminhos descartados também é apagado.
+
+    Parâmetros:
+        reference_path (str, opcional): Caminho a ser descartado. Se omitido, todos os caminhos são descartados.
+    """
+    with _sync_lock:
+        if reference_path is None:
+            _sync_state.clear()
+        else:
+            _sync_state.pop(reference_path, None)
+    cache = get_local_cache()
+    if cache is not None:
+        cache.clear(reference_path)
+    if reference_path is None:
+        _shared_cache.clear()
+    else:
+        _shared_cache.invalidate(reference_path)
+
+def get_local_cache():
+    """
+    Retorna o cache persistente em disco, criando-o na primeira chamada.
+
+    Retorna:
+        LocalCache: O cache local, ou None se ele estiver desativado (`configure_local_cache(None)`).
+    """
+    global _local_cache
+    with _local_cache_lock:
+        if _local_cache is None and LOCAL_CACHE_PATH:
+            _local_cache = LocalCache(LOCAL_CACHE_PATH)
+        return _local_cache
+
+def configure_local_cache(db_path: str):
+    """
+    Define o arquivo SQLite usado como cache local e descarta o estado carregado em memória.
+
+    Parâmetros:
+        db_path (str): Caminho do arquivo SQLite, ":memory:" para um cache volátil ou None para desativar.
+    """
+    global _local_cache, LOCAL_CACHE_PATH
+    with _local_cache_lock:
+        if _local_cache is not None:
+            _local_cache.close()
+        _local_cache = None
+        LOCAL_CACHE_PATH = db_path
+    with _sync_lock:
+        _sync_state.clear()
+
+def get_outbox():
+    """
+    Retorna a fila de escrita durável, criando-a na primeira chamada.
+
+    Retorna:
+        Outbox: A fila de escrita usada por `set_data`.
+    """
+    global _outbox
+    with _outbox_lock:
+        if _outbox is None:
+            _outbox = Outbox(OUTBOX_PATH, lambda: _backend, after_write=_after_write)
+        return _outbox
+
+def outbox_path_for(name: str):
+    """
+    Retorna um journal próprio para uma ferramenta, ao lado do journal padrão (ex.: "data/outbox_track_import.jsonl").
+
+    Cada journal só pode ser usado por um processo de cada vez (ver `Outbox`); as ferramentas de
+    linha de comando usam o seu, para rodar junto com o servidor do Streamlit.
+
+    Parâmetros:
+        name (str): Nome da ferramenta.
+
+    Retorna:
+        str: O caminho do journal.
+    """
+    root, extension = os.path.splitext(OUTBOX_PATH)
+    return f"{root}_{name}{extension}"
+
+def configure_outbox(journal_path: str, **options):
+    """
+    Define o journal da fila de escrita, fechando a fila atual (seus registros pendentes ficam no disco).
+
+    Parâmetros:
+        journal_path (str): Caminho do arquivo do journal.
+        **options: Parâmetros adicionais repassados para `Outbox` (ex.: `batch_size`, `max_backoff`).
+    """
+    global _outbox, OUTBOX_PATH
+    with _outbox_lock:
+        if _outbox is not None:
+            _outbox.close()
+        OUTBOX_PATH = journal_path
+        _outbox = Outbox(journal_path, lambda: _backend, **{"after_write": _after_write, **options})
+
+def _after_write(backend, batch):
+    """
+    Atualiza os agregados após o envio de um lote e invalida as cópias dos caminhos escritos.
+    """
+    # Só registros novos somam nos agregados; alterações de registros existentes não
+    apply_rollups(backend, [(key, path, data) for key, path, data, op in batch if op == "write"])
+    for path in {path for _, path, _, _ in batch}:
+        if path not in CACHED_PATHS:
+            _shared_cache.invalidate(path)
+        _shared_cache.invalidate(f"{ROLLUP_ROOT}/{path}")
+
+    # Chaves anteriores à janela de releitura de `sync_data` são anunciadas aos outros processos
+    oldest = push_key_prefix((time.time() - SYNC_LOOKBACK_S) * 1000)
+    for path in CACHED_PATHS:
+        keys = [key for key, key_path, _, op in batch if key_path == path and op == "write" and key < oldest]
+        if keys:
+            _announce_backfill(backend, path, min(keys))
+
+def _announce_backfill(backend, path: str, first_key: str):
+    """
+    Acrescenta em `sincronizacao/<caminho>`, com um marcador sequencial, a menor chave de um lote
+    gravado abaixo da janela de releitura (ver `sync_data`).
+    """
+    def _append(current):
+        current = current if isinstance(current, dict) else {}
+        # Prefixo não numérico: o Firebase converteria chaves só com dígitos em lista
+        sequence = int(max(current)[1:]) + 1 if current else 1
+        current[f"m{sequence:010d}"] = first_key
+        return current
+
+    backend.reference(f"{SYNC_MARKERS_ROOT}/{path}").transaction(_append)
+
+def get_cache_stats():
+    """
+    Retorna os contadores do cache de leituras compartilhado.
+
+    Retorna:
+        dict: Acertos, faltas, descartes, invalidações, caminhos em cache e memória estimada (ver `SharedCache.stats`).
+    """
+    return _shared_cache.stats()
+
+def configure_shared_cache(max_bytes: int = None, ttl: float = None):
+    """
+    Ajusta o cache de leituras compartilhado, descartando as cópias atuais.
+
+    Parâmetros:
+        max_bytes (int, opcional): Orçamento de memória, em bytes.
+        ttl (float, opcional): Validade das cópias de caminhos sem invalidação, em segundos.
+    """
+    global SHARED_CACHE_TTL
+    if max_bytes is not None:
+        _shared_cache.max_bytes = max_bytes
+    if ttl is not None:
+        SHARED_CACHE_TTL = ttl
+    _shared_cache.clear()
+
+def get_listener_service():
+    """
+    Retorna o serviço de listeners do processo, criando-o na primeira chamada.
+
+    Retorna:
+        ListenerService: O serviço, compartilhado por todas as sessões do Streamlit.
+    """
+    global _listener_service
+    with _listener_lock:
+        if _listener_service is None:
+            _listener_service = ListenerService(lambda: _backend)
+        return _listener_service
+
+def watch_path(reference_path: str):
+    """
+    Passa a acompanhar um caminho por listener; `get_data` passa a ler a visão em memória.
+
+    Parâmetros:
+        reference_path (str): O caminho de referência no banco de dados Firebase.
+
+    Retorna:
+        MaterializedView: A visão do caminho, cuja `version` muda a cada alteração.
+    """
+    return get_listener_service().watch(reference_path)
+
+def use_backend(backend):
+    """
+    Substitui o backend do Realtime Database usado por `get_data`, `set_data` e `sync_data`.
+
+    Parâmetros:
+        backend: Objeto com a função `reference(path)`, como `client.FirebaseClient` ou `fake_db.FakeDatabase()`.
+    """
+    global _backend, _listener_service
+    _backend = backend
+    with _sync_lock:
+        _sync_state.clear()
+    _shared_cache.clear()
+    with _listener_lock:
+        # Os listeners do backend anterior são fechados; `watch_path` os recria no novo
+        if _listener_service is not None:
+            _listener_service.close()
+            _listener_service = None
+
+def use_auth_backend(backend):
+    """
+    Substitui o backend de autenticação usado por `authenticate_user`.
+
+    Parâmetros:
+        backend: Objeto com a função `get_user_by_email(email)`, como `client.FirebaseAuth` ou `fake_db.FakeAuth()`.
+    """
+    global _auth_backend
+    _auth_backend = backend
+
+def _load_state(reference_path: str):
+    """
+    Retorna o estado de sincronização do caminho, carregando-o do cache em disco na primeira vez.
+    """
+    with _sync_lock:
+        state = _sync_state.get(reference_path)
+        if state is not None:
+            return state
+
+    state = {"cursor": None, "data": {}, "revision": 0, "marker": None}
+    cache = get_local_cache() if reference_path in CACHED_PATHS else None
+    if cache is not None:
+        state = {
+            "cursor": cache.get_cursor(reference_path), "data": cache.load(reference_path), "revision": 0,
+            "marker": cache.get_cursor(f"{SYNC_MARKERS_ROOT}/{reference_path}"),
+        }
+
+    with _sync_lock:
+        return _sync_state.setdefault(reference_path, state)
+
+def _merge_records(reference_path: str, records: dict, advance_cursor: bool = True, cursor: str = None):
+    """
+    Mescla registros no estado em memória e no cache em disco.
+
+    Registros gravados localmente não avançam o cursor, para não pular registros de outros clientes.
+    Com `cursor`, o cursor avança ao menos até essa chave.
+    """
+    state = _load_state(reference_path)
+    with _sync_lock:
+        data = state["data"]
+        fresh_keys = [key for key in records if key not in data]
+        if any(key in data and data[key] != record for key, record in records.items()):
+            state["revision"] += 1
+        in_order = not data or not fresh_keys or min(fresh_keys) > next(reversed(data))
+        data.update(records)
+        if not in_order:
+            # Chave fora de ordem (ex.: relógio de outro cliente adiantado): reordena uma vez aqui
+            state["data"] = {key: data[key] for key in sorted(data)}
+        if advance_cursor:
+            state["cursor"] = max(state["cursor"] or "", cursor or "", *records)
+        cursor = state["cursor"]
+
+    _shared_cache.invalidate(reference_path)
+
+    cache = get_local_cache() if reference_path in CACHED_PATHS else None
+    if cache is not None:
+        cache.upsert(reference_path, records)
+        if advance_cursor:
+            cache.set_cursor(reference_path, cursor)
+
+def _with_pending(reference_path: str, data: dict, outbox):
+    """
+    Mescla nos registros de um caminho os registros e alterações dele ainda na fila de escrita, mantendo a ordem das chaves.
+    """
+    pending = outbox.pending().get(reference_path)
+    updates = outbox.pending_updates().get(reference_path)
+    if not pending and not updates:
+        return data or None
+    data = dict(data or {})
+    if pending:
+        in_order = not data or min(pending) > next(reversed(data))
+        data.update(pending)
+        if not in_order:
+            data = {key: data[key] for key in sorted(data)}
+    for key, changes in (updates or {}).items():
+        if isinstance(data.get(key), dict):
+            data[key] = {**data[key], **changes}
+    return data
+
+def _snapshot_empty(reference_path: str):
+    state = _load_state(reference_path)
+    with _sync_lock:
+        return not state["data"]
+
+def _snapshot(reference_path: str):
+    """
+    Retorna uma cópia dos registros locais do caminho, ordenados pela chave, ou None se não houver nenhum.
+    """
+    state = _load_state(reference_path)
+    with _sync_lock:
+        return dict(state["data"]) or None
+
+def _query_backend(reference_path, order_by, start, end, limit, start_after):
+    """
+    Executa a consulta de `query_data` no backend.
+
+    O Firebase não pagina por (valor, chave): a consulta começa no valor do cursor, e os registros
+    empatados já exibidos são descartados; se forem muitos, a janela é ampliada e a consulta, repetida.
+    """
+    if start_after is not None:
+        start = start_after[0]
+    extra = 0 if start_after is None else (limit or 0) + 1
+    while True:
+        query = _backend.reference(reference_path).order_by_child(order_by)
+        if start is not None:
+            query = query.start_at(start)
+        if end is not None:
+            query = query.end_at(end)
+        if limit is not None:
+            query = query.limit_to_first(limit + extra)
+        records = query.get() or {}
+        items = _skip_seen(list(records.items()), order_by, start_after)
+        if limit is None or len(items) >= limit or len(records) < limit + extra:
+            return dict(items[:limit])
+        extra *= 2
+
+def _query_records(records, order_by, start, end, limit, start_after):
+    """
+    Executa a consulta de `query_data` sobre registros locais, na mesma ordem do Firebase.
+    """
+    lower = _value_rank(start) if start is not None else None
+    upper = _value_rank(end) if end is not None else None
+    items = []
+    for key, record in (records or {}).items():
+        order = _order_key(record.get(order_by) if isinstance(record, dict) else None, key)
+        if lower is not None and order[:2] < lower:
+            continue
+        if upper is not None and order[:2] > upper:
+            continue
+        items.append((order, key, record))
+    items.sort(key=lambda item: item[0])
+    if start_after is not None:
+        cursor = _order_key(*start_after)
+        items = [item for item in items if item[0] > cursor]
+    return {key: record for _, key, record in items[:limit]}
+
+def _value_rank(value):
+    """
+    Posição de um valor na ordem do Firebase: ausentes, booleanos, números, textos e, por último, objetos.
+    """
+    if value is None:
+        return 0, 0
+    if isinstance(value, bool):
+        return 1, value
+    if isinstance(value, (int, float)):
+        return 2, value
+    if isinstance(value, str):
+        return 3, value
+    return 4, 0
+
+def _order_key(value, key):
+    # Empates desfeitos pela chave
+    return (*_value_rank(value), key)
+
+def _skip_seen(items, order_by, start_after):
+    if start_after is None:
+        return items
+    cursor = _order_key(*start_after)
+    position = 0
+    while position < len(items) and _order_key(items[position][1].get(order_by), items[position][0]) <= cursor:
+        position += 1
+    return items[position:]
@@ -0,0 +1,412 @@
+"""
+Instrumentação dos caminhos mais usados: duração e tamanho dos dados de cada etapa.
+
+Cada etapa medida (span, ver `span` e `timed`) é registrada em dois lugares:
+
+- nos agregados do processo (quantidade, tempo e bytes por etapa), exportados no formato de
+  texto do Prometheus (`prometheus_text`);
+- na execução da página em andamento na thread (`begin_run`), exibida no painel de tempos
+  (ver `utils.timing_panel`) e exportada como uma linha JSON por execução (`export_jsonl`).
+
+Variáveis de ambiente:
+    BIKEPACKING_TRACE_PATH: Arquivo onde cada execução das páginas é acrescentada como uma linha JSON.
+"""
+import functools
+import inspect
+import json
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import datetime
+
+from .shared_cache import estimate_size
+
+TRACE_PATH = os.getenv("BIKEPACKING_TRACE_PATH")
+# Execuções recentes mantidas em memória para o painel e a exportação
+MAX_RUNS = 50
+
+_current_run = ContextVar("bikepacking_run", default=None)
+_current_span = ContextVar("bikepacking_span", default=None)
+
+
+def payload_size(value):
+    """
+    Estima o tamanho, em bytes, de um resultado medido (DataFrame, texto ou dados do Firebase).
+
+    Parâmetros:
+        value: O valor a medir.
+
+    Retorna:
+        int: Tamanho aproximado, em bytes.
+    """
+    if value is None:
+        return 0
+    if hasattr(value, "memory_usage") and hasattr(value, "columns"):
+        return int(value.memory_usage(index=True).sum())
+    if isinstance(value, (str, bytes)):
+        return len(value)
+    return estimate_size(value)
+
+
+class Span:
+    """
+    Uma etapa medida: nome, atributos (ex.: o caminho lido), duração e tamanho dos dados.
+    """
+
+    __slots__ = ("name", "attributes", "depth", "started", "duration", "size")
+
+    def __init__(self, name: str, attributes: dict, depth: int):
+        self.name = name
+        self.attributes = attributes
+        self.depth = depth
+        self.started = time.perf_counter()
+        self.duration = 0.0
+        self.size = None
+
+    def to_dict(self, origin: float = None):
+        """
+        Retorna a etapa como dicionário (tempos em ms, relativos a `origin`).
+        """
+        entry = {
+            "nome": self.name,
+            "inicio_ms": round((self.started - (origin or self.started)) * 1000, 3),
+            "duracao_ms": round(self.duration * 1000, 3),
+            "profundidade": self.depth,
+        }
+        if self.size is not None:
+            entry["bytes"] = self.size
+        entry.update(self.attributes)
+        return entry
+
+
+class RunTrace:
+    """
+    As etapas medidas em uma execução de uma página.
+
+    Parâmetros:
+        page (str): Nome da página.
+        sizes (bool): Se True, mede também o tamanho dos resultados das etapas (ver `timed`).
+    """
+
+    def __init__(self, page: str, sizes: bool = False):
+        self.page = page
+        self.sizes = sizes
+        self.started_at = datetime.now()
+        self.started = time.perf_counter()
+        self.duration = None
+        # A execução foi encerrada sem chegar ao fim da página (ex.: `st.rerun` ou `st.stop`)
+        self.interrupted = False
+        self.spans = []
+        self._lock = threading.Lock()
+
+    def add(self, span: Span):
+        # Etapas de threads auxiliares (ex.: leituras em paralelo) chegam ao mesmo tempo
+        with self._lock:
+            self.spans.append(span)
+
+    @property
+    def measured(self):
+        """
+        float: Tempo, em segundos, das etapas de primeiro nível (sem contar as aninhadas).
+        """
+        with self._lock:
+            return sum(span.duration for span in self.spans if span.depth == 0)
+
+    def to_dict(self):
+        """
+        Retorna a execução como dicionário, com as etapas em ordem de início.
+        """
+        with self._lock:
+            spans = sorted(self.spans, key=lambda span: span.started)
+        total = self.duration if self.duration is not None else time.perf_counter() - self.started
+        entry = {
+            "pagina": self.page,
+            "inicio": self.started_at.isoformat(timespec="milliseconds"),
+            "total_ms": round(total * 1000, 3),
+            "spans": [span.to_dict(self.started) for span in spans],
+        }
+        if self.interrupted:
+            entry["interrompida"] = True
+        return entry
+
+
+class Recorder:
+    """
+    Agregados das etapas no processo e execuções recentes das páginas.
+
+    Parâmetros:
+        trace_path (str, opcional): Arquivo JSON lines onde cada execução concluída é acrescentada.
+        max_runs (int): Execuções recentes mantidas em memória.
+    """
+
+    def __init__(self, trace_path: str = None, max_runs: int = MAX_RUNS):
+        self.trace_path = trace_path
+        self._lock = threading.Lock()
+        # (etapa, caminho) -> [quantidade, segundos, bytes, maior duração]
+        self._spans = {}
+        # página -> [quantidade, segundos]
+        self._runs = {}
+        self._recent = deque(maxlen=max_runs)
+
+    def record(self, span: Span, run: RunTrace = None):
+        """
+        Registra uma etapa concluída nos agregados e, se informada, na execução da página.
+        """
+        key = (span.name, span.attributes.get("caminho"))
+        with self._lock:
+            totals = self._spans.setdefault(key, [0, 0.0, 0, 0.0])
+            totals[0] += 1
+            totals[1] += span.duration
+            totals[2] += span.size or 0
+            totals[3] = max(totals[3], span.duration)
+        if run is not None:
+            run.add(span)
+
+    def finish(self, run: RunTrace, interrupted: bool = False):
+        """
+        Conclui uma execução: guarda entre as recentes e a acrescenta ao arquivo JSON lines.
+
+        Uma execução já concluída é ignorada. Se `interrupted`, a duração vai até o fim da
+        última etapa medida, e não até agora.
+        """
+        with run._lock:
+            if run.duration is not None:
+                return
+            if interrupted:
+                last = max((span.started + span.duration for span in run.spans), default=run.started)
+                run.duration, run.interrupted = last - run.started, True
+            else:
+                run.duration = time.perf_counter() - run.started
+        with self._lock:
+            totals = self._runs.setdefault(run.page, [0, 0.0])
+            totals[0] += 1
+            totals[1] += run.duration
+            self._recent.append(run)
+        if self.trace_path:
+            line = json.dumps(run.to_dict(), ensure_ascii=False)
+            with self._lock, open(self.trace_path, "a", encoding="utf-8") as f:
+                f.write(line + "\n")
+
+    def recent_runs(self):
+        """
+        Retorna as execuções recentes, da mais antiga para a mais nova.
+        """
+        with self._lock:
+            return list(self._recent)
+
+    def stats(self):
+        """
+        Retorna os agregados por etapa.
+
+        Retorna:
+            list: Dicionários com "nome", "caminho", "quantidade", "total_ms", "medio_ms", "maximo_ms" e "bytes".
+        """
+        with self._lock:
+            items = sorted(self._spans.items(), key=lambda item: (item[0][0], item[0][1] or ""))
+        return [
+            {
+                "nome": name, "caminho": path, "quantidade": count,
+                "total_ms": seconds * 1000, "medio_ms": seconds * 1000 / count,
+                "maximo_ms": longest * 1000, "bytes": size,
+            }
+            for (name, path), (count, seconds, size, longest) in items
+        ]
+
+    def prometheus_text(self):
+        """
+        Exporta os agregados no formato de texto do Prometheus.
+
+        Retorna:
+            str: As métricas `bikepacking_span_seconds` (count/sum), `bikepacking_span_bytes_total`
+            e `bikepacking_run_seconds` (count/sum, por página).
+        """
+        with self._lock:
+            spans = sorted(self._spans.items(), key=lambda item: (item[0][0], item[0][1] or ""))
+            runs = sorted(self._runs.items())
+        lines = [
+            "# HELP bikepacking_span_seconds Duração das etapas instrumentadas.",
+            "# TYPE bikepacking_span_seconds summary",
+        ]
+        for (name, path), (count, seconds, _, _) in spans:
+            labels = _labels(span=name, caminho=path)
+            lines.append(f"bikepacking_span_seconds_count{labels} {count}")
+            lines.append(f"bikepacking_span_seconds_sum{labels} {seconds:.6f}")
+        lines += [
+            "# HELP bikepacking_span_bytes_total Bytes dos resultados das etapas instrumentadas.",
+            "# TYPE bikepacking_span_bytes_total counter",
+        ]
+        for (name, path), (_, _, size, _) in spans:
+            lines.append(f"bikepacking_span_bytes_total{_labels(span=name, caminho=path)} {size}")
+        lines += [
+            "# HELP bikepacking_run_seconds Duração das execuções das páginas.",
+            "# TYPE bikepacking_run_seconds summary",
+        ]
+        for page, (count, seconds) in runs:
+            lines.append(f"bikepacking_run_seconds_count{_labels(pagina=page)} {count}")
+            lines.append(f"bikepacking_run_seconds_sum{_labels(pagina=page)} {seconds:.6f}")
+        return "\n".join(lines) + "\n"
+
+    def clear(self):
+        """
+        Descarta os agregados e as execuções recentes.
+        """
+        with self._lock:
+            self._spans.clear()
+            self._runs.clear()
+            self._recent.clear()
+
+
+def _labels(**labels):
+    parts = []
+    for name, value in labels.items():
+        if value is None:
+            continue
+        value = str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+        parts.append(f'{name}="{value}"')
+    return "{" + ",".join(parts) + "}"
+
+
+_recorder = Recorder(TRACE_PATH)
+
+
+def get_recorder():
+    """
+    Retorna o registro de etapas do processo.
+
+    Retorna:
+        Recorder: O registro compartilhado.
+    """
+    return _recorder
+
+
+@contextmanager
+def span(name: str, **attributes):
+    """
+    Mede um trecho de código como uma etapa.
+
+    O tamanho dos dados pode ser informado dentro do bloco, em `span.size` (bytes).
+
+    Parâmetros:
+        name (str): Nome da etapa (ex.: "get_data").
+        **attributes: Atributos da etapa (ex.: caminho="locations").
+
+    Retorna:
+        Span: A etapa em andamento.
+    """
+    parent = _current_span.get()
+    current = Span(name, attributes, parent.depth + 1 if parent is not None else 0)
+    token = _current_span.set(current)
+    try:
+        yield current
+    finally:
+        current.duration = time.perf_counter() - current.started
+        _current_span.reset(token)
+        _recorder.record(current, _current_run.get())
+
+
+def timed(name: str = None, size=None, label: str = None):
+    """
+    Decorador que mede cada chamada da função como uma etapa (ver `span`).
+
+    Parâmetros:
+        name (str, opcional): Nome da etapa (padrão: o nome da função).
+        size (callable, opcional): Calcula o tamanho do resultado, em bytes (ex.: `payload_size`).
+            Só é chamado quando a execução da página mede tamanhos ou é gravada em `TRACE_PATH`,
+            pois percorre o resultado inteiro.
+        label (str, opcional): Argumento da função registrado como o atributo "caminho".
+
+    Retorna:
+        callable: O decorador.
+    """
+    def decorator(function):
+        span_name = name or function.__name__
+        signature = inspect.signature(function) if label else None
+
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            attributes = {}
+            if label:
+                attributes["caminho"] = signature.bind_partial(*args, **kwargs).arguments.get(label)
+            with span(span_name, **attributes) as current:
+                result = function(*args, **kwargs)
+                if size is not None and _measures_sizes():
+                    current.size = size(result)
+                return result
+
+        return wrapper
+
+    return decorator
+
+
+def _measures_sizes():
+    run = _current_run.get()
+    return run is not None and (run.sizes or bool(_recorder.trace_path))
+
+
+def begin_run(page: str, sizes: bool = False):
+    """
+    Inicia a medição de uma execução de página na thread atual.
+
+    As etapas medidas a seguir nesta thread (e nas tarefas que herdam o seu contexto) entram
+    nesta execução, até `end_run`. Uma execução anterior ainda em andamento na thread é
+    concluída como interrompida.
+
+    Parâmetros:
+        page (str): Nome da página.
+        sizes (bool): Se True, mede também o tamanho dos resultados das etapas.
+
+    Retorna:
+        RunTrace: A execução iniciada.
+    """
+    previous = _current_run.get()
+    if previous is not None:
+        _recorder.finish(previous, interrupted=True)
+    run = RunTrace(page, sizes)
+    _current_run.set(run)
+    return run
+
+
+def current_run():
+    """
+    Retorna a execução de página em andamento na thread, ou None.
+    """
+    return _current_run.get()
+
+
+def end_run():
+    """
+    Conclui a execução de página em andamento (ver `Recorder.finish`).
+
+    Retorna:
+        RunTrace: A execução concluída, ou None se não houver uma em andamento.
+    """
+    run = _current_run.get()
+    if run is None:
+        return None
+    _current_run.set(None)
+    _recorder.finish(run)
+    return run
+
+
+def export_jsonl(runs=None):
+    """
+    Exporta execuções como JSON lines (uma execução por linha).
+
+    Parâmetros:
+        runs (list, opcional): As execuções (padrão: as recentes do processo).
+
+    Retorna:
+        str: O texto JSON lines.
+    """
+    runs = _recorder.recent_runs() if runs is None else runs
+    return "".join(json.dumps(run.to_dict(), ensure_ascii=False) + "\n" for run in runs)
+
+
+def prometheus_text():
+    """
+    Exporta os agregados do processo no formato de texto do Prometheus (ver `Recorder.prometheus_text`).
+    """
+    return _recorder.prometheus_text()
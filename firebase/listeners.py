@@ -0,0 +1,295 @@
+import logging
+import queue
+import random
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+# Eventos recebidos e ainda não aplicados; acima disso, o caminho é recarregado por completo
+EVENT_BACKLOG = 10_000
+# Intervalo, em segundos, entre as verificações das conexões
+CHECK_INTERVAL = 1.0
+
+
+def _split(path: str):
+    return [part for part in (path or "").split("/") if part]
+
+
+class MaterializedView:
+    """
+    Cópia em memória de um caminho do Realtime Database, mantida pelos eventos do listener.
+
+    Cada evento aplicado incrementa `version`, de modo que as páginas sabem se há dados
+    novos comparando a versão, sem ler o conteúdo. `revision` só é incrementada quando
+    registros já existentes mudam (ex.: a cidade resolvida depois da gravação) ou quando o
+    caminho é recarregado.
+
+    Parâmetros:
+        path (str): Caminho no banco de dados.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.version = 0
+        self.revision = 0
+        self.ready = False
+        self._data = {}
+        self._unsorted = False
+        self._changed = threading.Condition()
+
+    def apply(self, event_type: str, path: str, data):
+        """
+        Aplica um evento "put" (substitui o valor em `path`) ou "patch" (altera os filhos de `path`).
+
+        Parâmetros:
+            event_type (str): Tipo do evento ("put" ou "patch").
+            path (str): Caminho do evento, relativo ao caminho da visão.
+            data: Os dados do evento.
+        """
+        parts = _split(path)
+        with self._changed:
+            if event_type == "put":
+                self._set(parts, data)
+            elif event_type == "patch" and isinstance(data, dict):
+                for child, value in data.items():
+                    self._set(parts + _split(child), value)
+            else:
+                return
+            if not parts and event_type == "put":
+                self.ready = True
+            self.version += 1
+            self._changed.notify_all()
+
+    def snapshot(self):
+        """
+        Retorna uma cópia rasa do conteúdo atual, ordenado pela chave, como `get_data`.
+
+        Retorna:
+            dict: Os registros do caminho (vazio se não houver nada).
+        """
+        with self._changed:
+            if self._unsorted:
+                self._data = {key: self._data[key] for key in sorted(self._data)}
+                self._unsorted = False
+            return dict(self._data)
+
+    def wait_for_change(self, version: int, timeout: float = None):
+        """
+        Aguarda até que a versão da visão seja diferente de `version`.
+
+        Parâmetros:
+            version (int): Versão já conhecida.
+            timeout (float, opcional): Tempo máximo de espera, em segundos.
+
+        Retorna:
+            int: A versão atual.
+        """
+        with self._changed:
+            self._changed.wait_for(lambda: self.version != version, timeout)
+            return self.version
+
+    def _set(self, parts, value):
+        if not parts:
+            self._data = dict(value) if isinstance(value, dict) else {}
+            self._unsorted = True
+            self.revision += 1
+            return
+        if parts[0] in self._data:
+            self.revision += 1
+        elif len(parts) == 1 and value is not None:
+            # Push keys chegam em ordem crescente; só reordena se uma chave chegar fora de ordem
+            if self._data and parts[0] < next(reversed(self._data)):
+                self._unsorted = True
+        node = self._data
+        for part in parts[:-1]:
+            # Cópia do nó alterado: os registros são compartilhados com os `snapshot` já entregues
+            node[part] = dict(node[part]) if isinstance(node.get(part), dict) else {}
+            node = node[part]
+        if value is None:
+            node.pop(parts[-1], None)
+        else:
+            node[parts[-1]] = value
+
+
+class ListenerService:
+    """
+    Mantém visões materializadas de caminhos do Realtime Database a partir de `reference(path).listen()`.
+
+    Os eventos de todos os listeners entram em uma fila limitada e são aplicados por uma única
+    thread. Se a fila encher (consumo mais lento que a chegada de eventos), os eventos do caminho
+    afetado são descartados e ele é reconectado, recebendo de novo o conteúdo completo. Uma thread
+    de supervisão reconecta, com backoff exponencial, listeners cuja conexão caiu.
+
+    Parâmetros:
+        get_backend (callable): Função que retorna o backend atual (objeto com `reference(path)`).
+        backlog (int): Tamanho máximo da fila de eventos.
+        check_interval (float): Intervalo, em segundos, entre as verificações das conexões.
+        base_backoff (float): Espera inicial, em segundos, após uma falha de conexão.
+        max_backoff (float): Espera máxima, em segundos, entre tentativas.
+    """
+
+    def __init__(self, get_backend, backlog: int = EVENT_BACKLOG, check_interval: float = CHECK_INTERVAL,
+                 base_backoff: float = 1.0, max_backoff: float = 60.0):
+        self.check_interval = check_interval
+        self.base_backoff = base_backoff
+        self.max_backoff = max_backoff
+        self._get_backend = get_backend
+        self._lock = threading.Lock()
+        self._events = queue.Queue(maxsize=backlog)
+        self._wakeup = threading.Event()
+        self._closed = threading.Event()
+        self._views = {}
+        # Por caminho: registro do listener, geração da conexão, próxima tentativa e backoff atual
+        self._connections = {}
+        self._resync = set()
+        self._counters = {"events": 0, "dropped_events": 0, "reconnects": 0, "failed_connects": 0}
+        self._threads = [
+            threading.Thread(target=self._apply_events, name="listener-eventos", daemon=True),
+            threading.Thread(target=self._supervise, name="listener-supervisor", daemon=True),
+        ]
+        for thread in self._threads:
+            thread.start()
+
+    def watch(self, path: str):
+        """
+        Começa a acompanhar um caminho (se ainda não acompanhado) e retorna sua visão.
+
+        Parâmetros:
+            path (str): Caminho no banco de dados.
+
+        Retorna:
+            MaterializedView: A visão do caminho; `ready` fica True após o primeiro evento.
+        """
+        with self._lock:
+            view = self._views.get(path)
+            if view is None:
+                view = self._views[path] = MaterializedView(path)
+                self._connections[path] = {"registration": None, "generation": 0, "retry_at": 0.0, "backoff": 0.0}
+        self._wakeup.set()
+        return view
+
+    def view(self, path: str):
+        """
+        Retorna a visão de um caminho já acompanhado, ou None.
+        """
+        with self._lock:
+            return self._views.get(path)
+
+    def stats(self):
+        """
+        Retorna os contadores do serviço.
+
+        Retorna:
+            dict: Eventos aplicados e descartados, reconexões, falhas de conexão, eventos na
+            fila e a versão de cada visão.
+        """
+        with self._lock:
+            return {
+                **self._counters,
+                "backlog": self._events.qsize(),
+                "versions": {path: view.version for path, view in self._views.items()},
+            }
+
+    def close(self):
+        """
+        Fecha todos os listeners e encerra as threads do serviço.
+        """
+        self._closed.set()
+        self._wakeup.set()
+        with self._lock:
+            registrations = [c["registration"] for c in self._connections.values() if c["registration"]]
+            for connection in self._connections.values():
+                connection["registration"] = None
+        for registration in registrations:
+            self._close_registration(registration)
+        self._events.put(None)
+
+    def _on_event(self, path, generation, event):
+        try:
+            self._events.put_nowait((path, generation, event.event_type, event.path, event.data))
+        except queue.Full:
+            # Fila cheia: o evento é descartado e o caminho é recarregado por completo ao reconectar
+            with self._lock:
+                self._counters["dropped_events"] += 1
+                self._resync.add(path)
+            self._wakeup.set()
+
+    def _apply_events(self):
+        while True:
+            item = self._events.get()
+            if item is None:
+                return
+            path, generation, event_type, event_path, data = item
+            with self._lock:
+                connection = self._connections.get(path)
+                current = connection is not None and connection["generation"] == generation and path not in self._resync
+                view = self._views.get(path)
+            # Eventos de uma conexão já substituída são ignorados
+            if current:
+                view.apply(event_type, event_path, data)
+                with self._lock:
+                    self._counters["events"] += 1
+
+    def _supervise(self):
+        while not self._closed.is_set():
+            self._wakeup.wait(self.check_interval)
+            self._wakeup.clear()
+            if self._closed.is_set():
+                return
+            now = time.monotonic()
+            with self._lock:
+                paths = [
+                    path for path, connection in self._connections.items()
+                    if path in self._resync or not self._is_alive(connection["registration"])
+                ]
+            for path in paths:
+                self._connect(path, now)
+
+    def _connect(self, path, now):
+        with self._lock:
+            connection = self._connections[path]
+            if now < connection["retry_at"]:
+                return
+            old, connection["registration"] = connection["registration"], None
+            connection["generation"] += 1
+            generation = connection["generation"]
+            reconnecting = old is not None or path in self._resync
+            self._resync.discard(path)
+        if old is not None:
+            self._close_registration(old)
+
+        try:
+            registration = self._get_backend().reference(path).listen(
+                lambda event: self._on_event(path, generation, event)
+            )
+        except Exception as e:
+            with self._lock:
+                connection["backoff"] = min(self.max_backoff, max(self.base_backoff, connection["backoff"] * 2))
+                # Jitter para que vários processos não tentem ao mesmo tempo
+                connection["retry_at"] = now + connection["backoff"] * random.uniform(0.5, 1.0)
+                self._counters["failed_connects"] += 1
+            logger.warning("Falha ao ouvir '%s', nova tentativa em %.1fs: %s", path, connection["backoff"], e)
+            return
+
+        with self._lock:
+            connection["registration"] = registration
+            connection["backoff"] = 0.0
+            connection["retry_at"] = 0.0
+            if reconnecting:
+                self._counters["reconnects"] += 1
+
+    @staticmethod
+    def _is_alive(registration):
+        if registration is None:
+            return False
+        # O SDK entrega os eventos em uma thread própria; se ela terminou, a conexão caiu
+        thread = getattr(registration, "_thread", None)
+        return thread is None or thread.is_alive()
+
+    @staticmethod
+    def _close_registration(registration):
+        try:
+            registration.close()
+        except Exception as e:
+            logger.warning("Falha ao fechar listener: %s", e)
@@ -0,0 +1,138 @@
+import json
+import sqlite3
+import threading
+
+# Caminhos do Realtime Database espelhados localmente
+CACHED_PATHS = ("locations", "gastos", "progresso_viagem")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS records (
+    path TEXT NOT NULL,
+    push_key TEXT NOT NULL,
+    timestamp TEXT,
+    payload TEXT NOT NULL,
+    PRIMARY KEY (path, push_key)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_records_timestamp ON records (path, timestamp);
+CREATE TABLE IF NOT EXISTS sync_cursors (
+    path TEXT PRIMARY KEY,
+    cursor TEXT NOT NULL
+);
+"""
+
+
+class LocalCache:
+    """
+    Cache persistente em SQLite que espelha os registros dos caminhos do Realtime Database.
+
+    Cada registro é indexado pelo push key e pelo timestamp, e o cursor da sincronização
+    incremental de cada caminho é guardado junto, permitindo retomar a sincronização
+    após reiniciar o processo.
+
+    Parâmetros:
+        db_path (str): Caminho do arquivo SQLite (use ":memory:" para um cache volátil).
+    """
+
+    def __init__(self, db_path: str):
+        self.db_path = db_path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        if db_path != ":memory:":
+            self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(_SCHEMA)
+
+    def load(self, path: str):
+        """
+        Lê todos os registros de um caminho, ordenados pelo push key.
+
+        Parâmetros:
+            path (str): Caminho no banco de dados (ex.: "locations").
+
+        Retorna:
+            dict: Registros no mesmo formato retornado pelo Firebase (vazio se não houver nada).
+        """
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT push_key, payload FROM records WHERE path = ? ORDER BY push_key", (path,)
+            ).fetchall()
+        return {key: json.loads(payload) for key, payload in rows}
+
+    def load_range(self, path: str, start: str = None, end: str = None):
+        """
+        Lê os registros de um caminho cujo timestamp está no intervalo [start, end].
+
+        Parâmetros:
+            path (str): Caminho no banco de dados.
+            start (str, opcional): Timestamp inicial no formato "%Y-%m-%d %H:%M:%S".
+            end (str, opcional): Timestamp final no mesmo formato.
+
+        Retorna:
+            dict: Registros encontrados, ordenados pelo timestamp.
+        """
+        query = "SELECT push_key, payload FROM records WHERE path = ?"
+        params = [path]
+        if start is not None:
+            query += " AND timestamp >= ?"
+            params.append(start)
+        if end is not None:
+            query += " AND timestamp <= ?"
+            params.append(end)
+        query += " ORDER BY timestamp, push_key"
+        with self._lock:
+            rows = self._conn.execute(query, params).fetchall()
+        return {key: json.loads(payload) for key, payload in rows}
+
+    def upsert(self, path: str, records: dict):
+        """
+        Insere ou atualiza registros de um caminho.
+
+        Parâmetros:
+            path (str): Caminho no banco de dados.
+            records (dict): Registros indexados pelo push key.
+        """
+        rows = [
+            (path, key, value.get("timestamp") if isinstance(value, dict) else None, json.dumps(value))
+            for key, value in records.items()
+        ]
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO records (path, push_key, timestamp, payload) VALUES (?, ?, ?, ?)",
+                rows,
+            )
+
+    def get_cursor(self, path: str):
+        """
+        Retorna o último push key sincronizado do caminho, ou None se nunca foi sincronizado.
+        """
+        with self._lock:
+            row = self._conn.execute("SELECT cursor FROM sync_cursors WHERE path = ?", (path,)).fetchone()
+        return row[0] if row else None
+
+    def set_cursor(self, path: str, cursor: str):
+        """
+        Registra o último push key sincronizado do caminho.
+        """
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO sync_cursors (path, cursor) VALUES (?, ?)", (path, cursor)
+            )
+
+    def clear(self, path: str = None):
+        """
+        Remove os registros e o cursor de um caminho, ou de todos os caminhos se omitido.
+        """
+        with self._lock, self._conn:
+            if path is None:
+                self._conn.execute("DELETE FROM records")
+                self._conn.execute("DELETE FROM sync_cursors")
+            else:
+                self._conn.execute("DELETE FROM records WHERE path = ?", (path,))
+                self._conn.execute("DELETE FROM sync_cursors WHERE path = ?", (path,))
+
+    def close(self):
+        """
+        Fecha a conexão com o arquivo SQLite.
+        """
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,330 @@
+import json
+import logging
+import os
+import random
+import threading
+import time
+from itertools import islice
+
+from .push_keys import generate_push_key, generate_push_keys
+
+try:
+    import fcntl
+except ImportError:
+    # Sem `fcntl` (Windows), o journal não é travado
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+
+class Outbox:
+    """
+    Fila de escrita local e durável para o Realtime Database.
+
+    Cada escrita é anexada imediatamente a um journal em disco (JSON lines) com um push key
+    gerado no cliente, e uma thread em segundo plano envia os registros pendentes em lotes,
+    com um único `update()` multi-caminho por lote. Como a chave de cada registro é fixa,
+    reenviar um lote após uma falha não duplica registros. Falhas de envio são repetidas
+    com backoff exponencial, e os registros pendentes sobrevivem a reinícios do processo.
+
+    Cada journal pertence a um único processo: a compactação troca o arquivo, e outro processo
+    que gravasse nele perderia as suas escritas. Por isso, o journal fica travado (`flock` em
+    `<journal>.lock`) enquanto a fila estiver aberta, e uma segunda fila no mesmo arquivo é
+    recusada; ferramentas de linha de comando usam o seu próprio journal (ver
+    `firebase_utils.outbox_path_for`).
+
+    Parâmetros:
+        journal_path (str): Caminho do arquivo do journal.
+        get_backend (callable): Função que retorna o backend atual (objeto com `reference(path)`).
+        batch_size (int): Quantidade máxima de registros por `update()`.
+        base_backoff (float): Espera inicial, em segundos, após uma falha de envio.
+        max_backoff (float): Espera máxima, em segundos, entre tentativas.
+        fsync (bool): Se True, força a gravação em disco a cada escrita (mais lento, resiste a quedas do sistema).
+        after_write (callable, opcional): Chamada como `after_write(backend, lote)` depois do `update()` de
+            cada lote, com tuplas (push key, caminho, dados, operação), em que a operação é "write" para
+            registros novos e "update" para alterações de registros existentes; se falhar, o lote é reenviado.
+
+    Levanta:
+        RuntimeError: Se o journal já estiver em uso por outro processo.
+    """
+
+    def __init__(self, journal_path: str, get_backend, batch_size: int = 500,
+                 base_backoff: float = 1.0, max_backoff: float = 60.0, fsync: bool = False,
+                 after_write=None):
+        self.journal_path = journal_path
+        self.batch_size = batch_size
+        self.base_backoff = base_backoff
+        self.max_backoff = max_backoff
+        self.fsync = fsync
+        self.after_write = after_write
+        self._get_backend = get_backend
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._closed = threading.Event()
+        self._pending = {}
+        # Incrementada a cada registro enfileirado ou confirmado (ver `pending`)
+        self.version = 0
+        self._flusher = None
+        self._acked_since_compact = 0
+
+        self._flushed_records = 0
+        self._flush_count = 0
+        self._failed_flushes = 0
+        self._last_flush_latency = 0.0
+        self._total_flush_latency = 0.0
+
+        journal_dir = os.path.dirname(journal_path)
+        if journal_dir:
+            os.makedirs(journal_dir, exist_ok=True)
+        self._lock_file = self._acquire_lock()
+        self._replay()
+        self._journal = open(journal_path, "a", encoding="utf-8")
+        if self._pending:
+            self._start_flusher()
+            self._wakeup.set()
+
+    def enqueue(self, path: str, data: dict, key: str = None):
+        """
+        Registra uma escrita no journal e agenda o envio ao Firebase.
+
+        Parâmetros:
+            path (str): Caminho no banco de dados onde o registro será criado (ex.: "gastos").
+            data (dict): Os dados do registro.
+            key (str, opcional): Push key de um registro existente, que será sobrescrito; por padrão, um novo push key.
+
+        Retorna:
+            str: O push key atribuído ao registro.
+        """
+        key = key or generate_push_key()
+        with self._lock:
+            self._append({"op": "write", "key": key, "path": path, "data": data})
+            self._pending[key] = (path, data, "write")
+            self.version += 1
+        self._start_flusher()
+        self._wakeup.set()
+        return key
+
+    def enqueue_many(self, path: str, records: list, keys: list = None, op: str = "write"):
+        """
+        Registra várias escritas no journal de uma só vez e agenda o envio ao Firebase.
+
+        Parâmetros:
+            path (str): Caminho no banco de dados onde os registros serão criados.
+            records (list): Os dados de cada registro.
+            keys (list, opcional): Push keys dos registros (de registros existentes, que serão sobrescritos,
+                ou escolhidos por quem grava, ver `push_keys_for_times`); por padrão, novos push keys.
+            op (str): "write" para registros novos ou "update" para alterar apenas os campos informados
+                de registros existentes (enviados campo a campo e não somados nos agregados, ver `after_write`).
+
+        Retorna:
+            list: Os push keys atribuídos, na ordem dos registros.
+        """
+        keys = list(keys) if keys is not None else generate_push_keys(len(records))
+        with self._lock:
+            self._journal.write("".join(
+                json.dumps({"op": op, "key": key, "path": path, "data": data}) + "\n"
+                for key, data in zip(keys, records)
+            ))
+            self._journal.flush()
+            if self.fsync:
+                os.fsync(self._journal.fileno())
+            for key, data in zip(keys, records):
+                self._add_pending(key, path, data, op)
+            self.version += 1
+        self._start_flusher()
+        self._wakeup.set()
+        return keys
+
+    def flush(self):
+        """
+        Envia um lote de registros pendentes em um único `update()` multi-caminho.
+
+        Retorna:
+            int: Quantidade de registros enviados (0 se a fila estiver vazia).
+
+        Levanta:
+            Exception: Repassa o erro do backend se o envio falhar; os registros continuam pendentes.
+        """
+        with self._lock:
+            batch = list(islice(self._pending.items(), self.batch_size))
+        if not batch:
+            return 0
+
+        updates = {}
+        for key, (path, data, op) in batch:
+            if op == "update":
+                # Campo a campo: um registro ausente localmente não é substituído só pelos campos alterados
+                updates.update({f"{path}/{key}/{field}": value for field, value in data.items()})
+            else:
+                updates[f"{path}/{key}"] = data
+        start = time.perf_counter()
+        try:
+            backend = self._get_backend()
+            backend.reference("/").update(updates)
+            if self.after_write is not None:
+                self.after_write(backend, [(key, path, data, op) for key, (path, data, op) in batch])
+        except Exception:
+            with self._lock:
+                self._failed_flushes += 1
+            raise
+        latency = time.perf_counter() - start
+
+        with self._lock:
+            # Um registro sobrescrito durante o envio continua pendente com os dados novos
+            keys = [key for key, entry in batch if self._pending.get(key) is entry]
+            self._append({"op": "ack", "keys": keys})
+            for key in keys:
+                del self._pending[key]
+            self.version += 1
+            self._flushed_records += len(keys)
+            self._flush_count += 1
+            self._last_flush_latency = latency
+            self._total_flush_latency += latency
+            self._acked_since_compact += len(keys)
+            # Reescreve o journal quando a fila esvazia ou quando as confirmações acumuladas dominam o arquivo
+            if not self._pending or self._acked_since_compact > max(10000, 4 * len(self._pending)):
+                self._compact()
+        return len(batch)
+
+    def pending(self):
+        """
+        Retorna os registros novos ainda não confirmados, agrupados por caminho.
+
+        Retorna:
+            dict: Mapeia cada caminho para um dicionário {push key: dados}.
+        """
+        return self._grouped("write")
+
+    def pending_updates(self):
+        """
+        Retorna as alterações de registros existentes ainda não confirmadas, agrupadas por caminho.
+
+        Retorna:
+            dict: Mapeia cada caminho para um dicionário {push key: campos alterados}.
+        """
+        return self._grouped("update")
+
+    def _grouped(self, kind: str):
+        grouped = {}
+        with self._lock:
+            for key, (path, data, op) in self._pending.items():
+                if op == kind:
+                    grouped.setdefault(path, {})[key] = data
+        return grouped
+
+    def _add_pending(self, key, path, data, op):
+        # Uma alteração de um registro ainda pendente é mesclada a ele (um registro novo continua novo)
+        previous = self._pending.get(key)
+        if op == "update" and previous is not None and previous[0] == path:
+            self._pending[key] = (path, {**previous[1], **data}, previous[2])
+        else:
+            self._pending[key] = (path, data, op)
+
+    def stats(self):
+        """
+        Retorna os contadores da fila.
+
+        Retorna:
+            dict: Profundidade da fila, registros enviados, lotes enviados e com falha,
+            e latência do último envio e média, em milissegundos.
+        """
+        with self._lock:
+            return {
+                "queue_depth": len(self._pending),
+                "flushed_records": self._flushed_records,
+                "flushes": self._flush_count,
+                "failed_flushes": self._failed_flushes,
+                "last_flush_latency_ms": self._last_flush_latency * 1000,
+                "avg_flush_latency_ms": (
+                    self._total_flush_latency / self._flush_count * 1000 if self._flush_count else 0.0
+                ),
+            }
+
+    def close(self):
+        """
+        Interrompe a thread de envio e fecha o journal. Registros pendentes continuam no disco.
+        """
+        self._closed.set()
+        self._wakeup.set()
+        if self._flusher is not None:
+            self._flusher.join(timeout=5)
+        with self._lock:
+            self._journal.close()
+            if self._lock_file is not None:
+                self._lock_file.close()
+                self._lock_file = None
+
+    def _acquire_lock(self):
+        if fcntl is None:
+            return None
+        lock_file = open(self.journal_path + ".lock", "a")
+        try:
+            fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            lock_file.close()
+            raise RuntimeError(
+                f"Erro ao abrir a fila de escrita: o journal {self.journal_path} já está em uso por outro processo"
+            )
+        return lock_file
+
+    def _start_flusher(self):
+        with self._lock:
+            if self._flusher is None and not self._closed.is_set():
+                self._flusher = threading.Thread(target=self._run, name="outbox-flusher", daemon=True)
+                self._flusher.start()
+
+    def _run(self):
+        backoff = 0.0
+        while not self._closed.is_set():
+            self._wakeup.wait()
+            self._wakeup.clear()
+            try:
+                while not self._closed.is_set() and self.flush():
+                    pass
+                backoff = 0.0
+            except Exception as e:
+                backoff = min(self.max_backoff, max(self.base_backoff, backoff * 2))
+                logger.warning("Falha ao enviar escritas pendentes, nova tentativa em %.1fs: %s", backoff, e)
+                # Jitter para que vários processos não tentem ao mesmo tempo
+                if self._closed.wait(backoff * random.uniform(0.5, 1.0)):
+                    break
+                self._wakeup.set()
+
+    def _append(self, entry: dict):
+        self._journal.write(json.dumps(entry) + "\n")
+        self._journal.flush()
+        if self.fsync:
+            os.fsync(self._journal.fileno())
+
+    def _replay(self):
+        # Reconstrói a fila a partir do journal: escritas sem confirmação continuam pendentes
+        if not os.path.exists(self.journal_path):
+            return
+        with open(self.journal_path, "r", encoding="utf-8") as journal:
+            for line in journal:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    # Linha incompleta de uma escrita interrompida
+                    continue
+                if entry.get("op") in ("write", "update"):
+                    self._add_pending(entry["key"], entry["path"], entry["data"], entry["op"])
+                elif entry.get("op") == "ack":
+                    for key in entry["keys"]:
+                        self._pending.pop(key, None)
+        self._rewrite_journal()
+
+    def _compact(self):
+        self._acked_since_compact = 0
+        self._journal.close()
+        self._rewrite_journal()
+        self._journal = open(self.journal_path, "a", encoding="utf-8")
+
+    def _rewrite_journal(self):
+        tmp_path = self.journal_path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as journal:
+            for key, (path, data, op) in self._pending.items():
+                journal.write(json.dumps({"op": op, "key": key, "path": path, "data": data}) + "\n")
+            journal.flush()
+            os.fsync(journal.fileno())
+        os.replace(tmp_path, self.journal_path)
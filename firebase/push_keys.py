@@ -0,0 +1,126 @@
+import random
+import threading
+import time
+
+# Alfabeto dos push keys do Firebase, em ordem lexicográfica
+PUSH_CHARS = "-0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZ_abcdefghijklmnopqrstuvwxyz"
+
+_push_lock = threading.Lock()
+_last_push_time = 0
+_last_rand_chars = [0] * 12
+
+def generate_push_key():
+    """
+    Gera um push key no mesmo formato do Firebase (20 caracteres, ordenados cronologicamente).
+
+    Chaves geradas no mesmo milissegundo continuam crescentes, o que permite gravar registros
+    com chave definida no cliente sem perder a ordem cronológica.
+
+    Retorna:
+        str: O push key gerado.
+    """
+    return generate_push_keys(1)[0]
+
+def generate_push_keys(count: int):
+    """
+    Gera vários push keys crescentes de uma só vez (ver `generate_push_key`).
+
+    Parâmetros:
+        count (int): Quantidade de chaves.
+
+    Retorna:
+        list: Os push keys gerados, em ordem crescente.
+    """
+    global _last_push_time
+    with _push_lock:
+        now = int(time.time() * 1000)
+        if now != _last_push_time:
+            _last_push_time = now
+            for i in range(12):
+                _last_rand_chars[i] = random.randrange(64)
+        else:
+            _increment_rand_chars()
+
+        prefix = push_key_prefix(now)
+
+        keys = []
+        for i in range(count):
+            if i:
+                # Incrementa a parte aleatória para manter a ordem dentro do mesmo milissegundo
+                _increment_rand_chars()
+            keys.append(prefix + "".join([PUSH_CHARS[c] for c in _last_rand_chars]))
+        return keys
+
+def push_key_prefix(timestamp_ms: int):
+    """
+    Retorna a parte de tempo (8 caracteres) dos push keys gerados no milissegundo informado.
+
+    Como os push keys são ordenados pelo tempo, o prefixo serve de limite em consultas por chave:
+    todos os push keys gerados a partir desse instante são maiores ou iguais a ele.
+
+    Parâmetros:
+        timestamp_ms (int): Milissegundos desde 1970.
+
+    Retorna:
+        str: O prefixo de tempo.
+    """
+    timestamp_ms = max(int(timestamp_ms), 0)
+    time_chars = []
+    for _ in range(8):
+        time_chars.append(PUSH_CHARS[timestamp_ms % 64])
+        timestamp_ms //= 64
+    return "".join(reversed(time_chars))
+
+def push_keys_for_times(timestamps_ms):
+    """
+    Gera push keys com o horário de cada registro, em vez do horário atual (ex.: pontos importados).
+
+    Assim, registros antigos ficam na posição cronológica entre os demais. Chaves do mesmo
+    milissegundo continuam crescentes, na ordem informada.
+
+    Parâmetros:
+        timestamps_ms (iterable): Milissegundos desde 1970 de cada registro.
+
+    Retorna:
+        list: Os push keys gerados, na ordem dos horários.
+    """
+    keys = []
+    previous = None
+    rand_chars = [0] * 12
+    for timestamp_ms in timestamps_ms:
+        prefix = push_key_prefix(timestamp_ms)
+        if prefix != previous:
+            previous = prefix
+            rand_chars = [random.randrange(64) for _ in range(12)]
+        else:
+            _increment_rand_chars(rand_chars)
+        keys.append(prefix + "".join([PUSH_CHARS[c] for c in rand_chars]))
+    return keys
+
+def _increment_rand_chars(rand_chars=None):
+    rand_chars = _last_rand_chars if rand_chars is None else rand_chars
+    for i in range(11, -1, -1):
+        if rand_chars[i] != 63:
+            rand_chars[i] += 1
+            return
+        rand_chars[i] = 0
+
+def dataset_version(data, revision: int = 0):
+    """
+    Calcula uma versão para um conjunto de registros, usada como chave de cache (mapa, gráficos).
+
+    Como os registros só recebem `push`, a quantidade de registros e o maior push key mudam
+    sempre que um novo registro chega. Alterações de registros existentes não mudam nenhum dos
+    dois e são identificadas pela revisão do caminho (ver `firebase_utils.data_revision`).
+
+    Parâmetros:
+        data (dict): Registros indexados pelo push key.
+        revision (int): Revisão dos registros do caminho.
+
+    Retorna:
+        str: A versão do conjunto de dados.
+    """
+    if not data:
+        return "vazio"
+    version = f"{len(data)}:{max(data)}"
+    return f"{version}:r{revision}" if revision else version
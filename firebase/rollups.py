@@ -0,0 +1,260 @@
+"""
+Agregados (rollups) de `progresso_viagem` e `gastos` mantidos no Realtime Database.
+
+Cada registro enviado pela fila de escrita também atualiza, na mesma rodada de envio, os nós
+`rollups/<caminho>/total`, `rollups/<caminho>/por_dia/<aaaa-mm-dd>` e, para gastos,
+`rollups/gastos/por_categoria/<categoria>`. Assim os painéis leem poucos bytes em vez do
+histórico completo.
+
+Uso pela linha de comando:
+    python -m firebase.rollups rebuild   # recalcula os agregados a partir dos dados brutos
+    python -m firebase.rollups check     # compara os agregados com os dados brutos
+"""
+import argparse
+import math
+import re
+import sys
+from datetime import datetime
+
+ROLLUP_ROOT = "rollups"
+ROLLUP_PATHS = ("progresso_viagem", "gastos")
+
+# Chaves aplicadas recentemente, para que o reenvio de um lote não conte o mesmo registro duas vezes
+RECENT_KEYS_LIMIT = 1000
+
+# Caracteres não permitidos em chaves do Realtime Database
+_INVALID_KEY_CHARS = re.compile(r"[.#$\[\]/]")
+
+
+def record_contributions(path: str, record: dict):
+    """
+    Calcula quanto um registro soma em cada nó de agregado.
+
+    Parâmetros:
+        path (str): Caminho do registro ("progresso_viagem" ou "gastos").
+        record (dict): Os dados do registro.
+
+    Retorna:
+        dict: Mapeia o nó relativo (ex.: "por_dia/2024-01-02") para os incrementos de cada campo.
+    """
+    if not isinstance(record, dict):
+        return {}
+
+    if path == "progresso_viagem":
+        day = _day(record.get("timestamp") or record.get("data_envio"))
+        deltas = {
+            "distancia": _number(record.get("distancia")),
+            "altimetria": _number(record.get("altimetria")),
+            "minutos": _minutes(record.get("tempo")),
+            "registros": 1,
+        }
+        return {"total": deltas, f"por_dia/{day}": deltas}
+
+    if path == "gastos":
+        day = _day(record.get("data") or record.get("timestamp"))
+        category = safe_key(record.get("categoria") or "Outros")
+        deltas = {"valor": _number(record.get("valor")), "registros": 1}
+        return {"total": deltas, f"por_dia/{day}": deltas, f"por_categoria/{category}": deltas}
+
+    return {}
+
+
+def compute_rollups(path: str, records: dict):
+    """
+    Calcula todos os agregados de um caminho a partir dos registros brutos.
+
+    Parâmetros:
+        path (str): Caminho dos registros ("progresso_viagem" ou "gastos").
+        records (dict): Registros indexados pelo push key, como retornados por `get_data`.
+
+    Retorna:
+        dict: Árvore de agregados no mesmo formato gravado em `rollups/<caminho>`.
+    """
+    rollup = {}
+    for record in (records or {}).values():
+        _add_contributions(rollup, record_contributions(path, record))
+    return rollup
+
+
+def apply_rollups(backend, batch: list):
+    """
+    Aplica os incrementos de um lote de registros nos agregados, com uma transação por caminho.
+
+    Chamado pela fila de escrita depois do `update()` de cada lote, apenas com registros novos
+    (alterações de registros existentes, ver `update_data`, não são somadas). Registros já
+    aplicados (reenvio de um lote após falha) são ignorados. Se os agregados do caminho ainda
+    não existirem, eles são calculados a partir dos dados brutos já gravados (que incluem o lote),
+    para que o histórico anterior aos agregados também seja contado.
+
+    Parâmetros:
+        backend: Backend do Realtime Database (objeto com `reference(path)`).
+        batch (list): Tuplas (push key, caminho, dados) enviadas no lote.
+    """
+    grouped = {}
+    for key, path, data in batch:
+        if path in ROLLUP_PATHS:
+            grouped.setdefault(path, []).append((key, data))
+
+    for path, records in grouped.items():
+        def update(current, path=path, records=records):
+            if not isinstance(current, dict):
+                current = _initial_rollup(backend, path, [key for key, _ in records])
+            recent = current.get("chaves_recentes") or {}
+            for key, data in records:
+                if key in recent:
+                    continue
+                _add_contributions(current, record_contributions(path, data))
+                recent[key] = True
+            if len(recent) > RECENT_KEYS_LIMIT:
+                recent = {key: True for key in sorted(recent)[-RECENT_KEYS_LIMIT:]}
+            current["chaves_recentes"] = recent
+            return current
+
+        backend.reference(f"{ROLLUP_ROOT}/{path}").transaction(update)
+
+
+def _initial_rollup(backend, path: str, keys):
+    # Agregados de um caminho sem `rollups/<caminho>`, a partir do histórico, com os registros
+    # existentes (inclusive os do lote, já gravados) marcados como aplicados
+    records = backend.reference(path).get() or {}
+    rollup = compute_rollups(path, records)
+    recent = {key: True for key in sorted(records)[-RECENT_KEYS_LIMIT:]}
+    recent.update({key: True for key in keys if key in records})
+    rollup["chaves_recentes"] = recent
+    return rollup
+
+
+def rebuild_rollups(backend, path: str):
+    """
+    Recalcula os agregados de um caminho a partir dos dados brutos e sobrescreve os gravados.
+
+    Parâmetros:
+        backend: Backend do Realtime Database (objeto com `reference(path)`).
+        path (str): Caminho a ser recalculado.
+
+    Retorna:
+        dict: Os agregados gravados.
+    """
+    records = backend.reference(path).get() or {}
+    rollup = compute_rollups(path, records)
+    # Marca os registros existentes como aplicados, caso algum lote pendente seja reenviado depois
+    rollup["chaves_recentes"] = {key: True for key in sorted(records)[-RECENT_KEYS_LIMIT:]}
+    backend.reference(f"{ROLLUP_ROOT}/{path}").set(rollup)
+    return rollup
+
+
+def check_rollups(backend, path: str, tolerance: float = 1e-6):
+    """
+    Compara os agregados gravados com os calculados a partir dos dados brutos.
+
+    Parâmetros:
+        backend: Backend do Realtime Database (objeto com `reference(path)`).
+        path (str): Caminho a ser verificado.
+        tolerance (float): Diferença máxima aceita entre valores numéricos.
+
+    Retorna:
+        list: Divergências no formato (nó, campo, valor gravado, valor esperado); vazia se consistente.
+    """
+    expected = _flatten(compute_rollups(path, backend.reference(path).get()))
+    stored = backend.reference(f"{ROLLUP_ROOT}/{path}").get() or {}
+    stored.pop("chaves_recentes", None)
+    stored = _flatten(stored)
+
+    differences = []
+    for node_field in sorted(set(expected) | set(stored)):
+        got, want = stored.get(node_field, 0), expected.get(node_field, 0)
+        if not math.isclose(got, want, rel_tol=tolerance, abs_tol=tolerance):
+            node, _, field = node_field.rpartition("/")
+            differences.append((node, field, got, want))
+    return differences
+
+
+def _add_contributions(rollup: dict, contributions: dict):
+    for node_path, deltas in contributions.items():
+        node = rollup
+        for part in node_path.split("/"):
+            node = node.setdefault(part, {})
+        for field, delta in deltas.items():
+            node[field] = node.get(field, 0) + delta
+
+
+def _flatten(tree: dict, prefix: str = ""):
+    flat = {}
+    for key, value in tree.items():
+        name = f"{prefix}/{key}" if prefix else key
+        if isinstance(value, dict):
+            flat.update(_flatten(value, name))
+        elif isinstance(value, (int, float)):
+            flat[name] = value
+    return flat
+
+
+def _day(value):
+    try:
+        return datetime.fromisoformat(str(value)).strftime("%Y-%m-%d")
+    except ValueError:
+        return "sem_data"
+
+
+def _number(value):
+    try:
+        number = float(value)
+    except (TypeError, ValueError):
+        return 0
+    return 0 if math.isnan(number) else number
+
+
+def _minutes(tempo):
+    try:
+        h, m = map(int, str(tempo).split(":"))
+        return h * 60 + m
+    except ValueError:
+        return 0
+
+
+def safe_key(value):
+    """
+    Converte um valor em chave válida do Realtime Database, como as usadas nos agregados
+    (ex.: "por_dia", "por_categoria").
+
+    Parâmetros:
+        value: O valor (ex.: uma data ou uma categoria).
+
+    Retorna:
+        str: O valor como texto, com os caracteres não permitidos trocados por "_".
+    """
+    return _INVALID_KEY_CHARS.sub("_", str(value)) or "_"
+
+
+def main(argv=None):
+    from .firebase_utils import initialize_firebase, _backend
+    from .client import DATABASE_URL, load_credentials
+
+    parser = argparse.ArgumentParser(description="Recalcula ou verifica os agregados do Realtime Database.")
+    parser.add_argument("command", choices=["rebuild", "check"])
+    parser.add_argument("--path", choices=ROLLUP_PATHS, action="append", help="Caminho a processar (padrão: todos).")
+    parser.add_argument("--credentials", help="Arquivo da conta de serviço (padrão: ver `firebase.client`).")
+    parser.add_argument("--database-url", default=DATABASE_URL)
+    args = parser.parse_args(argv)
+
+    initialize_firebase(load_credentials(args.credentials), args.database_url)
+
+    status = 0
+    for path in args.path or ROLLUP_PATHS:
+        if args.command == "rebuild":
+            rollup = rebuild_rollups(_backend, path)
+            print(f"{path}: agregados recalculados ({rollup.get('total', {}).get('registros', 0)} registros)")
+        else:
+            differences = check_rollups(_backend, path)
+            if differences:
+                status = 1
+                print(f"{path}: {len(differences)} divergência(s)")
+                for node, field, got, want in differences:
+                    print(f"  {node}.{field}: gravado={got} esperado={want}")
+            else:
+                print(f"{path}: agregados consistentes")
+    return status
+
+
+if __name__ == "__main__":
+    sys.exit(main())
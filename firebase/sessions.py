@@ -0,0 +1,208 @@
+"""
+Sessões de login assinadas.
+
+Depois que `authenticate_user` confirma o usuário no Firebase, o app emite um token de sessão
+de curta duração, assinado com HMAC-SHA256, e o guarda no cookie criptografado. A cada
+execução da página o token é validado localmente (assinatura, validade e lista de revogação),
+sem consultar o Firebase; tokens já validados ficam em um cache do processo.
+
+Variáveis de ambiente:
+    BIKEPACKING_SESSION_SECRET: Chave das assinaturas. Sem ela, uma chave aleatória é gerada
+        por processo e as sessões deixam de valer quando o app reinicia.
+    BIKEPACKING_SESSION_TTL_S: Validade das sessões, em segundos (padrão: 8 horas).
+"""
+import base64
+import hashlib
+import hmac
+import json
+import logging
+import os
+import secrets
+import threading
+import time
+from collections import OrderedDict
+
+logger = logging.getLogger(__name__)
+
+SESSION_TTL_S = int(os.getenv("BIKEPACKING_SESSION_TTL_S", str(8 * 3600)))
+# Tempo máximo que uma sessão validada fica no cache antes de ser conferida de novo
+CACHE_TTL_S = 300.0
+CACHE_MAX_ENTRIES = 1024
+
+_manager = None
+_manager_lock = threading.Lock()
+
+
+def _encode(data: bytes):
+    return base64.urlsafe_b64encode(data).rstrip(b"=").decode("ascii")
+
+
+def _decode(text: str):
+    return base64.urlsafe_b64decode(text + "=" * (-len(text) % 4))
+
+
+class SessionManager:
+    """
+    Emite e valida tokens de sessão assinados, com cache das sessões validadas e revogação.
+
+    O token tem o formato `<dados>.<assinatura>`, ambos em base64url; os dados levam o uid,
+    o email, o identificador da sessão e o horário de expiração.
+
+    Parâmetros:
+        secret (bytes): Chave das assinaturas.
+        ttl_s (float): Validade das sessões, em segundos.
+        cache_ttl_s (float): Tempo máximo de uma sessão no cache, em segundos.
+        cache_max_entries (int): Quantidade máxima de sessões no cache.
+        clock (callable): Relógio, em segundos (substituível em testes).
+    """
+
+    def __init__(self, secret: bytes, ttl_s: float = SESSION_TTL_S, cache_ttl_s: float = CACHE_TTL_S,
+                 cache_max_entries: int = CACHE_MAX_ENTRIES, clock=time.time):
+        self.ttl_s = ttl_s
+        self.cache_ttl_s = cache_ttl_s
+        self.cache_max_entries = cache_max_entries
+        self._secret = secret
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._cache = OrderedDict()
+        # Sessões revogadas e o horário em que expirariam (depois disso, não precisam mais ser lembradas)
+        self._revoked = {}
+        self._counters = {"issued": 0, "cache_hits": 0, "verified": 0, "rejected": 0, "revoked": 0}
+
+    def issue(self, user: dict):
+        """
+        Emite um token de sessão para um usuário autenticado.
+
+        Parâmetros:
+            user (dict): Usuário com "uid" e "email" (ver `authenticate_user`).
+
+        Retorna:
+            str: O token de sessão.
+        """
+        payload = {
+            "uid": user["uid"],
+            "email": user["email"],
+            "sid": secrets.token_urlsafe(12),
+            "exp": int(self._clock() + self.ttl_s),
+        }
+        body = _encode(json.dumps(payload, separators=(",", ":")).encode("utf-8"))
+        with self._lock:
+            self._counters["issued"] += 1
+        return f"{body}.{self._sign(body)}"
+
+    def verify(self, token: str):
+        """
+        Valida um token de sessão localmente, sem consultar o Firebase.
+
+        Parâmetros:
+            token (str): O token guardado no cookie.
+
+        Retorna:
+            dict: O usuário da sessão ("uid" e "email"), ou None se o token for inválido,
+            expirado ou revogado.
+        """
+        if not token:
+            return None
+        now = self._clock()
+        with self._lock:
+            cached = self._cache.get(token)
+            if cached is not None:
+                session, valid_until = cached
+                if now < valid_until and session["sid"] not in self._revoked:
+                    self._cache.move_to_end(token)
+                    self._counters["cache_hits"] += 1
+                    return {"uid": session["uid"], "email": session["email"]}
+                del self._cache[token]
+
+        session = self._parse(token)
+        with self._lock:
+            if session is None or session["exp"] <= now or session["sid"] in self._revoked:
+                self._counters["rejected"] += 1
+                return None
+            self._counters["verified"] += 1
+            self._cache[token] = (session, min(session["exp"], now + self.cache_ttl_s))
+            while len(self._cache) > self.cache_max_entries:
+                self._cache.popitem(last=False)
+        return {"uid": session["uid"], "email": session["email"]}
+
+    def revoke(self, token: str):
+        """
+        Revoga uma sessão (logout); o token deixa de ser aceito neste processo.
+
+        Parâmetros:
+            token (str): O token da sessão.
+        """
+        session = self._parse(token) if token else None
+        if session is None:
+            return
+        now = self._clock()
+        with self._lock:
+            self._cache.pop(token, None)
+            self._revoked[session["sid"]] = session["exp"]
+            self._counters["revoked"] += 1
+            # Revogações de sessões já expiradas não precisam mais ser guardadas
+            for sid in [sid for sid, expires_at in self._revoked.items() if expires_at <= now]:
+                del self._revoked[sid]
+
+    def stats(self):
+        """
+        Retorna os contadores das sessões.
+
+        Retorna:
+            dict: Sessões emitidas, acertos do cache, validações por assinatura, rejeições,
+            revogações, sessões no cache e revogações guardadas.
+        """
+        with self._lock:
+            return {**self._counters, "cached": len(self._cache), "revoked_active": len(self._revoked)}
+
+    def _sign(self, body: str):
+        return _encode(hmac.new(self._secret, body.encode("ascii"), hashlib.sha256).digest())
+
+    def _parse(self, token: str):
+        try:
+            body, signature = token.split(".")
+            if not hmac.compare_digest(signature, self._sign(body)):
+                return None
+            session = json.loads(_decode(body))
+            return session if {"uid", "email", "sid", "exp"} <= session.keys() else None
+        except (ValueError, TypeError, AttributeError, UnicodeError):
+            return None
+
+
+def get_session_manager():
+    """
+    Retorna o gerenciador de sessões do processo, criando-o na primeira chamada.
+
+    Retorna:
+        SessionManager: O gerenciador compartilhado.
+    """
+    global _manager
+    with _manager_lock:
+        if _manager is None:
+            secret = os.getenv("BIKEPACKING_SESSION_SECRET")
+            if not secret:
+                logger.warning("BIKEPACKING_SESSION_SECRET não definida; as sessões não sobrevivem a um reinício.")
+                secret = secrets.token_hex(32)
+            _manager = SessionManager(secret.encode("utf-8"))
+        return _manager
+
+
+def issue_session(user: dict):
+    """
+    Emite um token de sessão para o usuário (ver `SessionManager.issue`).
+    """
+    return get_session_manager().issue(user)
+
+
+def verify_session(token: str):
+    """
+    Valida um token de sessão localmente (ver `SessionManager.verify`).
+    """
+    return get_session_manager().verify(token)
+
+
+def revoke_session(token: str):
+    """
+    Revoga uma sessão (ver `SessionManager.revoke`).
+    """
+    get_session_manager().revoke(token)
@@ -0,0 +1,176 @@
+import sys
+import threading
+import time
+from collections import OrderedDict
+from itertools import islice
+
+# Orçamento padrão de memória do cache, em bytes
+DEFAULT_MAX_BYTES = 256 * 2 ** 20
+# Quantidade de registros medidos para estimar o tamanho de um caminho grande
+_SIZE_SAMPLE = 200
+
+
+def _normalize(path: str):
+    return "/".join(part for part in (path or "").split("/") if part)
+
+
+def _related(a: str, b: str):
+    # Um caminho é afetado pela escrita em outro se for igual, ancestral ou descendente dele
+    return a == b or not a or not b or a.startswith(b + "/") or b.startswith(a + "/")
+
+
+def estimate_size(value, _depth: int = 0):
+    """
+    Estima a memória ocupada por um valor retornado pelo Firebase (dicionários, listas e escalares).
+
+    Para dicionários grandes, mede uma amostra dos valores e extrapola, em vez de percorrer tudo.
+
+    Parâmetros:
+        value: O valor a medir.
+
+    Retorna:
+        int: Tamanho aproximado, em bytes.
+    """
+    size = sys.getsizeof(value)
+    if isinstance(value, dict):
+        items = list(value.items()) if len(value) <= _SIZE_SAMPLE or _depth else None
+        if items is None:
+            items = list(islice(value.items(), 0, None, len(value) // _SIZE_SAMPLE))[:_SIZE_SAMPLE]
+        measured = sum(sys.getsizeof(key) + estimate_size(item, _depth + 1) for key, item in items)
+        return size + measured * len(value) // max(len(items), 1)
+    if isinstance(value, (list, tuple)):
+        return size + sum(estimate_size(item, _depth + 1) for item in value)
+    return size
+
+
+class SharedCache:
+    """
+    Cache de leituras compartilhado por todas as sessões do processo, com invalidação por versão.
+
+    Cada caminho tem uma única cópia em memória. Uma escrita no caminho (ou em um ancestral
+    ou descendente dele) invalida a cópia com `invalidate`; leituras simultâneas de um mesmo
+    caminho ausente fazem um único download. Acima do orçamento de memória, os caminhos
+    usados há mais tempo são descartados (LRU).
+
+    Os dados retornados são compartilhados entre as sessões e não devem ser alterados.
+
+    Parâmetros:
+        max_bytes (int): Orçamento de memória, em bytes.
+        ttl (float, opcional): Validade máxima de cada cópia, em segundos, para caminhos que não
+            recebem invalidação (ex.: escritos por outros clientes); None para não expirar.
+    """
+
+    def __init__(self, max_bytes: int = DEFAULT_MAX_BYTES, ttl: float = None):
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self._versions = {}
+        self._load_locks = {}
+        self._bytes = 0
+        self._counters = {"hits": 0, "misses": 0, "evictions": 0, "invalidations": 0}
+
+    def get(self, path: str, loader, token=None, ttl: float = None):
+        """
+        Retorna a cópia em cache do caminho, ou carrega com `loader` e guarda o resultado.
+
+        Parâmetros:
+            path (str): Caminho no banco de dados.
+            loader (callable): Função sem argumentos que lê os dados do caminho.
+            token (opcional): Versão externa dos dados (ex.: versão da visão do listener); a cópia só
+                é reaproveitada enquanto o token não mudar.
+            ttl (float, opcional): Validade desta cópia, em segundos; por padrão, a do cache.
+
+        Retorna:
+            Os dados do caminho.
+        """
+        path = _normalize(path)
+        ttl = self.ttl if ttl is None else ttl
+        data, found = self._lookup(path, token, ttl)
+        if found:
+            return data
+
+        with self._lock:
+            load_lock = self._load_locks.setdefault(path, threading.Lock())
+        with load_lock:
+            # Outra sessão pode ter carregado o caminho enquanto esta esperava
+            data, found = self._lookup(path, token, ttl)
+            if found:
+                return data
+            with self._lock:
+                self._counters["misses"] += 1
+                version = self._versions.setdefault(path, 0)
+            data = loader()
+            size = estimate_size(data)
+            with self._lock:
+                # Uma escrita durante o carregamento torna o resultado possivelmente desatualizado
+                if self._versions.get(path) == version and size <= self.max_bytes:
+                    self._store(path, (token, version, time.monotonic(), data, size))
+            return data
+
+    def invalidate(self, path: str):
+        """
+        Descarta a cópia do caminho e dos caminhos relacionados (ancestrais e descendentes).
+
+        Parâmetros:
+            path (str): Caminho escrito.
+        """
+        path = _normalize(path)
+        with self._lock:
+            for cached_path in list(self._versions):
+                if _related(cached_path, path):
+                    self._versions[cached_path] += 1
+                    entry = self._entries.pop(cached_path, None)
+                    if entry is not None:
+                        self._bytes -= entry[4]
+                        self._counters["invalidations"] += 1
+
+    def clear(self):
+        """
+        Descarta todas as cópias.
+        """
+        with self._lock:
+            for path in self._versions:
+                self._versions[path] += 1
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self):
+        """
+        Retorna os contadores do cache.
+
+        Retorna:
+            dict: Acertos, faltas, descartes por memória, invalidações, caminhos em cache,
+            memória estimada em uso e orçamento, em bytes.
+        """
+        with self._lock:
+            return {
+                **self._counters,
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+            }
+
+    def _lookup(self, path, token, ttl):
+        with self._lock:
+            entry = self._entries.get(path)
+            if entry is None:
+                return None, False
+            entry_token, version, loaded_at, data, _ = entry
+            expired = ttl is not None and time.monotonic() - loaded_at > ttl
+            if entry_token != token or version != self._versions.get(path) or expired:
+                return None, False
+            self._entries.move_to_end(path)
+            self._counters["hits"] += 1
+            return data, True
+
+    def _store(self, path, entry):
+        previous = self._entries.pop(path, None)
+        if previous is not None:
+            self._bytes -= previous[4]
+        self._entries[path] = entry
+        self._bytes += entry[4]
+        while self._bytes > self.max_bytes and len(self._entries) > 1:
+            _, evicted = self._entries.popitem(last=False)
+            self._bytes -= evicted[4]
+            self._counters["evictions"] += 1
@@ -8,4 +8,5 @@ st.markdown("""
     - 💰 **Gastos**: Controle de despesas.
     - 🗺️ **Paradas Planejadas**: Informações sobre alimentação, descanso e turismo.
     - 📍 **Mapa do Percurso**: Visualize o trajeto no mapa.
+    - 🧭 **Visão Geral**: Resumo da viagem, com distância, gastos e última localização.
 """)
@@ -1,134 +1,107 @@
 import streamlit as st
-import pandas as pd
 import plotly.graph_objects as go
-from firebase_admin import db
-from datetime import datetime
+from firebase import firebase_utils
+from utils.trip_stats import process_trip_data, progress_chart_data
+from firebase.push_keys import dataset_version
+from firebase.instrumentation import span
+from utils.live_updates import auto_refresh
+from utils.timing_panel import begin_page, display_timing_panel
 
-# Função para inicializar conexão com o Firebase
-def initialize_firebase():
-    import firebase_admin
-    from firebase_admin import credentials
-    if not firebase_admin._apps:
-        cred = credentials.Certificate(st.secrets["firebase"]["credentials"])
-        firebase_admin.initialize_app(cred, {
-            "databaseURL": "https://bikepacking-tracker-3fa9f-default-rtdb.firebaseio.com"
-        })
+# Mede as etapas desta execução (ver `utils.timing_panel`)
+begin_page("Progresso da Viagem")
 
 # Função para obter dados do Firebase
 def get_data(path):
     try:
-        ref = db.reference(path)
-        data = ref.get()
-        return data
+        return firebase_utils.get_data(path)
     except Exception as e:
         st.error(f"Erro ao recuperar dados do Firebase: {e}")
         return None
 
-# Função para processar os dados em um DataFrame
-def process_trip_data(data):
-    if not data:
-        return pd.DataFrame()
-
-    records = []
-    total_distancia = 0
-    total_altimetria = 0
-    total_minutes = 0
-
-    for key, values in data.items():
-        if isinstance(values, dict):
-            timestamp = values.get("timestamp", "Sem Data")
-            tempo = values.get("tempo", "0:00")
-            distancia = values.get("distancia", 0)
-            altimetria = values.get("altimetria", 0)
-
-            try:
-                # Converte o timestamp para uma data legível
-                date = datetime.strptime(timestamp, "%Y-%m-%d %H:%M:%S").strftime("%d/%m/%Y")
-            except ValueError:
-                date = "Sem Data"
-
-            # Converte o tempo para minutos
-            try:
-                h, m = map(int, tempo.split(":"))
-                minutes = h * 60 + m
-            except ValueError:
-                minutes = 0
-
-            # Atualiza totais
-            total_distancia += distancia
-            total_altimetria += altimetria
-            total_minutes += minutes
-
-            # Converte minutos acumulados para o formato HH:MM
-            total_hours = total_minutes // 60
-            total_remaining_minutes = total_minutes % 60
-            formatted_time = f"{total_hours:02}:{total_remaining_minutes:02}"
+# Função para obter os totais agregados da viagem
+def get_trip_totals():
+    try:
+        rollup = firebase_utils.get_rollups("progresso_viagem")
+        return rollup.get("total") if rollup else None
+    except Exception as e:
+        st.error(f"Erro ao recuperar os totais da viagem: {e}")
+        return None
 
-            # Adiciona registro
-            records.append({
-                "Hora": formatted_time,
-                "Distância (km)": total_distancia,
-                "Altimetria (m)": total_altimetria,
-                "Data": date
-            })
+# Resoluções dos gráficos: rótulo exibido e modo de agregação
+CHART_RESOLUTIONS = {"Registros": "registros", "Por hora": "hora", "Por dia": "dia"}
 
-    return pd.DataFrame(records)
+# Pontos dos gráficos, reaproveitados enquanto os registros e a resolução não mudarem
+@st.cache_data(max_entries=16, show_spinner=False)
+def chart_data(version, mode, method, _trip_df):
+    return progress_chart_data(_trip_df, mode, method=method)
 
 # Função para exibir gráficos
-def plot_trip_progress(df):
+def plot_trip_progress(df, version):
     if df.empty:
         st.warning("Nenhum dado disponível para exibir os gráficos.")
         return
 
+    resolution = st.radio("Resolução dos gráficos", list(CHART_RESOLUTIONS), horizontal=True)
+    mode = CHART_RESOLUTIONS[resolution]
+    x_title = "Data" if mode == "dia" else "Hora (HH:MM)"
+    x_column = "Data" if mode == "dia" else "Hora"
+
     # Gráfico de progresso por hora
     st.markdown("### Progresso por Hora")
-    fig = go.Figure()
-    fig.add_trace(go.Scatter(
-        x=df["Hora"],
-        y=df["Altimetria (m)"],
-        fill='tozeroy',
-        name='Altimetria (m)',
-        line=dict(color='orange', width=2),
-        mode='lines+markers',
-        marker=dict(size=8)
-    ))
-    fig.add_trace(go.Scatter(
-        x=df["Hora"],
-        y=df["Distância (km)"],
-        name='Distância (km)',
-        line=dict(color='blue', width=3),
-        mode='lines+markers',
-        marker=dict(size=8)
-    ))
-    fig.update_layout(
-        title="Progresso por Hora 🚴",
-        xaxis_title="Hora (HH:MM)",
-        yaxis_title="Valores",
-        legend_title="Métricas",
-        hovermode="x unified",
-        template="plotly_white"
-    )
-    st.plotly_chart(fig, use_container_width=True)
+    line_df = chart_data(version, mode, "lttb", df)
+    if len(line_df) < len(df):
+        st.caption(f"Exibindo {len(line_df)} pontos para {len(df)} registros, preservando os picos das séries.")
+    with span("plotly_chart", grafico="progresso"):
+        fig = go.Figure()
+        fig.add_trace(go.Scatter(
+            x=line_df[x_column],
+            y=line_df["Altimetria (m)"],
+            fill='tozeroy',
+            name='Altimetria (m)',
+            line=dict(color='orange', width=2),
+            mode='lines+markers',
+            marker=dict(size=8)
+        ))
+        fig.add_trace(go.Scatter(
+            x=line_df[x_column],
+            y=line_df["Distância (km)"],
+            name='Distância (km)',
+            line=dict(color='blue', width=3),
+            mode='lines+markers',
+            marker=dict(size=8)
+        ))
+        fig.update_layout(
+            title="Progresso por Hora 🚴",
+            xaxis_title=x_title,
+            yaxis_title="Valores",
+            legend_title="Métricas",
+            hovermode="x unified",
+            template="plotly_white"
+        )
+        st.plotly_chart(fig, use_container_width=True)
 
     # Gráfico de comparação de distância e altimetria
     st.markdown("### Comparação de Altimetria e Distância")
-    fig_bar = go.Figure(data=[
-        go.Bar(name='Distância (km)', x=df["Hora"], y=df["Distância (km)"], marker_color='blue'),
-        go.Bar(name='Altimetria (m)', x=df["Hora"], y=df["Altimetria (m)"], marker_color='orange')
-    ])
-    fig_bar.update_layout(
-        barmode='group',
-        title="Comparação de Altimetria e Distância",
-        xaxis_title="Hora (HH:MM)",
-        yaxis_title="Valores",
-        template="plotly_white"
-    )
-    st.plotly_chart(fig_bar, use_container_width=True)
-
-# Inicialização do Firebase e recuperação de dados
+    bar_df = chart_data(version, mode, "minmax", df)
+    with span("plotly_chart", grafico="comparacao"):
+        fig_bar = go.Figure(data=[
+            go.Bar(name='Distância (km)', x=bar_df[x_column], y=bar_df["Distância (km)"], marker_color='blue'),
+            go.Bar(name='Altimetria (m)', x=bar_df[x_column], y=bar_df["Altimetria (m)"], marker_color='orange')
+        ])
+        fig_bar.update_layout(
+            barmode='group',
+            title="Comparação de Altimetria e Distância",
+            xaxis_title=x_title,
+            yaxis_title="Valores",
+            template="plotly_white"
+        )
+        st.plotly_chart(fig_bar, use_container_width=True)
+
+# Recuperação de dados
 st.title("Progresso da Viagem 🚴")
 
-initialize_firebase()
+# Atualiza a página automaticamente quando chegam novos registros
+auto_refresh(["progresso_viagem"])
 trip_data = get_data("progresso_viagem")
 
 # Processar e exibir os dados
@@ -138,16 +111,26 @@ if trip_data:
     # Exibir resumo
     st.markdown("## Resumo da Viagem")
     if not trip_df.empty:
-        total_distancia = trip_df["Distância (km)"].iloc[-1]
-        total_altimetria = trip_df["Altimetria (m)"].iloc[-1]
-        total_horas = len(trip_df)
+        # Os totais vêm dos agregados mantidos no Firebase; sem eles, do histórico processado
+        totals = get_trip_totals()
+        if totals:
+            total_distancia = totals.get("distancia", 0)
+            total_altimetria = totals.get("altimetria", 0)
+            total_minutos = int(totals.get("minutos", 0))
+            total_horas = f"{total_minutos // 60:02}:{total_minutos % 60:02}"
+        else:
+            total_distancia = trip_df["Distância (km)"].iloc[-1]
+            total_altimetria = trip_df["Altimetria (m)"].iloc[-1]
+            total_horas = trip_df["Hora"].iloc[-1]
         st.metric("Distância Total (km)", f"{total_distancia:.2f}")
-        st.metric("Altimetria Total (m)", f"{total_altimetria}")
+        st.metric("Altimetria Total (m)", f"{total_altimetria:.0f}")
         st.metric("Total de Horas", total_horas)
 
         # Exibir gráficos
-        plot_trip_progress(trip_df)
+        plot_trip_progress(trip_df, dataset_version(trip_data, firebase_utils.data_revision("progresso_viagem")))
     else:
         st.warning("Os dados recuperados não possuem informações processáveis.")
 else:
     st.warning("Nenhum dado encontrado no Firebase. Verifique sua conexão.")
+
+display_timing_panel()
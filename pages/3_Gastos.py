@@ -1,50 +1,41 @@
 import streamlit as st
 import pandas as pd
-from firebase.firebase_utils import get_data
-from datetime import datetime
+from firebase.firebase_utils import get_rollups
+from utils.expenses_utils import PAGE_SIZE, expense_total, format_currency, load_expense_page
 import plotly.express as px
+from firebase.instrumentation import span
+from utils.timing_panel import begin_page, display_timing_panel
 
-def load_trip_data_from_firebase():
-    # Obter dados do Firebase
-    data = get_data('gastos')
+# Mede as etapas desta execução (ver `utils.timing_panel`)
+begin_page("Gastos")
 
-    # Limpar os dados e remover o hash
-    cleaned_data = []
-    for item in data.values():
-        item_cleaned = {k: v for k, v in item.items() if k != '.key'}
-        cleaned_data.append(item_cleaned)
+CATEGORIES = ["Alimentação", "Hospedagem", "Transporte", "Outros"]
+ORDER_LABELS = {"data": "Data", "categoria": "Categoria"}
 
-    # Converter os dados para um DataFrame do Pandas
-    trip_data = pd.DataFrame(cleaned_data)
+def build_expense_table(page, total):
+    """
+    Monta a tabela exibida: a página de gastos e a linha "Total" do filtro.
 
-    # Renomear a coluna 'timestamp' para 'data e hora', se existir
-    if 'timestamp' in trip_data.columns:
-        trip_data = trip_data.rename(columns={'timestamp': 'data e hora'})
+    Parâmetros:
+        page (pd.DataFrame): Gastos da página (ver `load_expense_page`).
+        total (dict): Total do filtro (ver `expense_total`), ou None se não houver agregados.
 
-    # Garantir que a coluna 'data e hora' seja convertida para datetime
-    if 'data e hora' in trip_data.columns:
-        trip_data['data e hora'] = pd.to_datetime(trip_data['data e hora'], errors='coerce')
+    Retorna:
+        pd.DataFrame: A tabela com a coluna formatada "valor_formatado".
+    """
+    table = pd.DataFrame({
+        'categoria': page['categoria'],
+        'data': page['data'],
+        'descricao': page['descricao'],
         # Formatar a data e hora para exibição amigável
-        trip_data['data e hora'] = trip_data['data e hora'].dt.strftime('%d/%m/%Y %H:%M:%S')
-
-    # Garantir que a coluna 'valor' seja numérica
-    if 'valor' in trip_data.columns:
-        trip_data['valor'] = pd.to_numeric(trip_data['valor'], errors='coerce')
-        # Adicionar uma linha para a soma dos valores
-        total_row = {
-            'categoria': 'Total',
-            'data': '',
-            'descricao': '',
-            'data e hora': '',
-            'valor': trip_data['valor'].sum()
-        }
-        trip_data = pd.concat([trip_data, pd.DataFrame([total_row])], ignore_index=True)
-        # Criar uma coluna formatada para exibição
-        trip_data['valor_formatado'] = trip_data['valor'].apply(lambda x: f'R$ {x:,.2f}'.replace(',', 'X').replace('.', ',').replace('X', '.'))
-    else:
-        st.write("A coluna 'valor' não foi encontrada nos dados.")
-
-    return trip_data
+        'data e hora': pd.to_datetime(page['timestamp'], errors='coerce').dt.strftime('%d/%m/%Y %H:%M:%S'),
+        'valor': page['valor'],
+    }).reset_index(drop=True)
+    if total is not None:
+        total_row = {'categoria': 'Total', 'data': '', 'descricao': '', 'data e hora': '', 'valor': total['valor']}
+        table = pd.concat([table, pd.DataFrame([total_row])], ignore_index=True)
+    table['valor_formatado'] = format_currency(table['valor'])
+    return table
 
 def highlight_total_row(row):
     """Estilizar a linha 'Total' com uma cor de fundo diferente."""
@@ -52,29 +43,71 @@ def highlight_total_row(row):
         return ['background-color: #ffefc1'] * len(row)
     return [''] * len(row)
 
-# Carregar os dados
-trip_data = load_trip_data_from_firebase()
-
 # Exibir o título
 st.title("Gastos da Viagem: ")
 
+# Filtros: a ordenação e o intervalo são aplicados na consulta, não depois de baixar o histórico
+order_by = st.radio("Ordenar por", list(ORDER_LABELS), format_func=ORDER_LABELS.get, horizontal=True)
+start = end = None
+if order_by == "data":
+    period = st.date_input("Período", value=(), format="DD/MM/YYYY")
+    if len(period) == 2:
+        start, end = (day.strftime("%Y-%m-%d") for day in period)
+else:
+    category = st.selectbox("Categoria", ["Todas"] + CATEGORIES)
+    if category != "Todas":
+        start = end = category
+
+# Cursores das páginas já visitadas; reiniciados quando o filtro muda
+query_key = (order_by, start, end)
+if st.session_state.get("gastos_query") != query_key:
+    st.session_state.gastos_query = query_key
+    st.session_state.gastos_cursors = [None]
+cursors = st.session_state.gastos_cursors
+
+try:
+    page, next_cursor = load_expense_page(order_by, start, end, PAGE_SIZE, cursors[-1])
+    total = expense_total(order_by, start, end)
+except RuntimeError as e:
+    st.error(f"Erro ao carregar os gastos: {e}")
+    st.stop()
+
 # Exibir a tabela de gastos de forma dinâmica e estilizada
-if not trip_data.empty:
-    # Exibir tabela com estilização
+if not page.empty:
+    trip_data = build_expense_table(page, total)
     styled_table = trip_data.drop(columns='valor').style.apply(highlight_total_row, axis=1)
     st.write(styled_table, unsafe_allow_html=True)
+    if total is None:
+        st.caption("Total indisponível: os agregados ainda não foram calculados (`python -m firebase.rollups rebuild`).")
 
-    # Criar gráfico de gastos ao longo do tempo (exclui a linha "Total")
-    trip_data_grafico = trip_data[trip_data['categoria'] != 'Total']
-    if 'data e hora' in trip_data_grafico.columns and 'valor' in trip_data_grafico.columns:
+    col_previous, col_page, col_next = st.columns([1, 2, 1])
+    if col_previous.button("Anterior", disabled=len(cursors) == 1):
+        cursors.pop()
+        st.rerun()
+    col_page.caption(f"Página {len(cursors)}")
+    if col_next.button("Próxima", disabled=next_cursor is None):
+        cursors.append(next_cursor)
+        st.rerun()
+else:
+    st.write("Nenhum dado disponível.")
+
+# Gráfico de gastos ao longo do tempo, a partir dos totais por dia (não do histórico completo)
+by_day = (get_rollups('gastos') or {}).get('por_dia') or {}
+if by_day:
+    daily = pd.DataFrame(
+        [(day, node.get('valor', 0)) for day, node in sorted(by_day.items())], columns=['data', 'valor'],
+    )
+    if order_by == "data" and start is not None:
+        daily = daily[(daily['data'] >= start) & (daily['data'] <= end)]
+    with span("plotly_chart", grafico="gastos_por_dia"):
         fig = px.line(
-            trip_data_grafico,
-            x='data e hora',
+            daily,
+            x='data',
             y='valor',
-            color='categoria',
+            markers=True,
             title='Gastos ao Longo do Tempo',
-            labels={'data e hora': 'Data e Hora', 'valor': 'Valor em R$'}
+            labels={'data': 'Data', 'valor': 'Valor em R$'}
         )
         st.plotly_chart(fig)  # Exibe o gráfico interativo
-else:
-    st.write("Nenhum dado disponível.")
+
+display_timing_panel()
@@ -1,5 +1,12 @@
 import streamlit as st
 import json
+import numpy as np
+from firebase.firebase_utils import get_data
+from utils.spatial_index import location_index_for, stops_index
+from utils.timing_panel import begin_page, display_timing_panel
+
+# Mede as etapas desta execução (ver `utils.timing_panel`)
+begin_page("Paradas Planejadas")
 
 # Carregar dados
 @st.cache_data
@@ -7,6 +14,10 @@ def load_stops_data():
     with open("data/stops_data.json", "r") as file:
         return json.load(file)
 
+@st.cache_resource
+def load_stops_index():
+    return stops_index(load_stops_data())
+
 stops_data = load_stops_data()
 
 st.title("Paradas Planejadas 🗺️")
@@ -18,3 +29,28 @@ for stop in stops_data:
     - **Descrição:** {stop['descricao']}
     - **Horário estimado:** {stop['horario']}
     """)
+
+# Parada mais próxima da última localização registrada
+st.subheader("Parada Mais Próxima 🧭")
+try:
+    index = load_stops_index()
+    locations = location_index_for(get_data("locations"))
+    located = np.flatnonzero(np.isfinite(locations.latitudes) & np.isfinite(locations.longitudes))
+    if located.size == 0:
+        st.info("Nenhuma localização registrada ainda.")
+    else:
+        latitude, longitude = locations.latitudes[located[-1]], locations.longitudes[located[-1]]
+        positions, distances = index.nearest(latitude, longitude)
+        if positions.size == 0:
+            st.info("Adicione latitude e longitude às paradas em data/stops_data.json para ver a parada mais próxima.")
+        else:
+            stop = stops_data[index.ids[positions[0]]]
+            st.markdown(f"**{stop['local']}** ({stop['tipo']}) a {distances[0] / 1000:.1f} km da última localização.")
+
+            radius_km = st.slider("Paradas em um raio de (km)", 1, 200, 50)
+            for position, distance in zip(*index.radius(latitude, longitude, radius_km * 1000)):
+                st.markdown(f"- {stops_data[index.ids[position]]['local']}: {distance / 1000:.1f} km")
+except Exception as e:
+    st.error(f"Erro ao buscar a parada mais próxima: {e}")
+
+display_timing_panel()
@@ -1,77 +1,88 @@
 import streamlit as st
 import pandas as pd
-import folium
-from streamlit_folium import folium_static
-from firebase.firebase_utils import get_data
+from firebase.firebase_utils import data_revision, get_data
+from firebase.push_keys import dataset_version
+from utils.map_builder import display_static_route_map, display_viewport_map
+from utils.route_export import EXPORT_URL, export_route
+from utils.geodesy import track_metrics_for
+from utils.spatial_index import location_index_for
+from utils.columnar_store import location_store_for
+from utils.timeline import display_timeline
+from utils.live_updates import auto_refresh
+from firebase.instrumentation import span, timed
+from utils.timing_panel import begin_page, display_timing_panel
+
+# Mede as etapas desta execução (ver `utils.timing_panel`)
+begin_page("Mapa do Percurso")
 
 # Configuração da página
 st.title("Mapa do Percurso 📍")
 
+# Modos do mapa: marcadores da área visível montados a cada execução, ou camadas pré-geradas
+# (arquivos estáticos atualizados só quando chegam novas localizações, ver `utils.route_export`)
+MAP_MODES = ["Interativo", "Camadas pré-geradas"]
+
+# Atualiza a página automaticamente quando chegam novas localizações
+auto_refresh(["locations"])
+
 # Função para carregar dados do Firebase
+@timed()
 def fetch_map_data():
+    empty = pd.DataFrame(columns=["cidade", "latitude", "longitude", "hora"])
     try:
         # Corrigido o caminho para "locations"
         data = get_data("locations")
         if data:
-            locations = []
-            for entry in data.values():
-                locations.append({
-                    "cidade": entry.get("cidade", "Desconhecida"),
-                    "latitude": float(entry.get("latitude", 0)),
-                    "longitude": float(entry.get("longitude", 0)),
-                    "hora": entry.get("timestamp", "Sem horário"),
-                })
-            
-            if not locations:
+            store = location_store_for(data)
+            if not len(store):
                 st.warning("Nenhuma localização válida encontrada no Firebase.")
-            return pd.DataFrame(locations) if locations else pd.DataFrame(
-                columns=["cidade", "latitude", "longitude", "hora"]
-            )
+                return empty, dataset_version(data), None, None, None
+            # Colunas tipadas do armazenamento colunar, sem cópia dos registros
+            map_data = store.to_frame(["cidade", "latitude", "longitude", "timestamp"]).rename(columns={"timestamp": "hora"})
+            return map_data, dataset_version(data, data_revision("locations")), track_metrics_for(data), location_index_for(data), store
         else:
             st.warning("Nenhum dado encontrado no caminho 'locations'.")
-            return pd.DataFrame(columns=["cidade", "latitude", "longitude", "hora"])
+            return empty, dataset_version(data), None, None, None
     except Exception as e:
         st.error(f"Erro ao buscar dados do Firebase: {e}")
-        return pd.DataFrame(columns=["cidade", "latitude", "longitude", "hora"])
+        return empty, dataset_version(None), None, None, None
 
 # Carregar dados
-map_data = fetch_map_data()
+map_data, data_version, track_metrics, location_index, location_store = fetch_map_data()
+
+# Exibir métricas calculadas a partir das localizações registradas
+if track_metrics is not None and track_metrics.count > 1:
+    summary = track_metrics.summary()
+    moving_minutes = int(summary["tempo_em_movimento_s"] // 60)
+    col_distance, col_moving, col_elevation = st.columns(3)
+    col_distance.metric("Distância pelo GPS (km)", f"{summary['distancia_km']:.2f}")
+    col_moving.metric("Tempo em movimento", f"{moving_minutes // 60:02}:{moving_minutes % 60:02}")
+    col_elevation.metric("Ganho de elevação (m)", f"{summary['ganho_elevacao_m']:.0f}")
 
 # Exibir mapa com rastro se houver dados
 if not map_data.empty:
     try:
-        # Criar o mapa base
-        m = folium.Map(location=[map_data["latitude"].mean(), map_data["longitude"].mean()], zoom_start=10)
-
-        # Adicionar marcadores de bicicleta
-        locations = []  # Lista para armazenar as coordenadas dos pontos
-        for index, row in map_data.iterrows():
-            folium.Marker(
-                location=[row["latitude"], row["longitude"]],
-                popup=f"{row['cidade']}<br>{row['hora']}<br>({row['latitude']:.4f}, {row['longitude']:.4f})",
-                icon=folium.Icon(color="green", icon="bicycle", prefix="fa"),  # Ícone de bicicleta (FontAwesome)
-            ).add_to(m)
-            # Adicionar coordenada à lista para desenhar a linha
-            locations.append([row["latitude"], row["longitude"]])
-
-        # Adicionar linha conectando os pontos
-        if len(locations) > 1:
-            folium.PolyLine(locations, color="green", weight=2.5, opacity=1).add_to(m)
-
-        # Exibir o mapa
-        folium_static(m)
+        map_mode = st.radio("Modo do mapa", MAP_MODES, horizontal=True)
+        if map_mode == "Camadas pré-geradas":
+            # O navegador carrega as camadas dos arquivos estáticos; aqui só se atualiza a exportação
+            manifest = export_route()
+            display_static_route_map(manifest, EXPORT_URL)
+            st.caption(f"Camadas geradas em {manifest['gerado_em']} com {manifest['pontos']} localizações.")
+        else:
+            # Exibir o mapa, enviando apenas as localizações da área visível
+            shown = display_viewport_map(map_data, data_version, location_index)
+            st.caption(f"Exibindo {shown} de {len(map_data)} localizações na área visível do mapa.")
 
         # Exibir a linha do tempo
         st.subheader("Linha do Tempo 📜")
-        
-        # Exibir os dados das cidades
-        for index, row in map_data.iterrows():
-            st.markdown(f"### {row['cidade']}")
-            st.markdown(f"**Hora:** {row['hora']}")
-            st.markdown(f"**Coordenadas:** ({row['latitude']:.4f}, {row['longitude']:.4f})")
-            st.markdown("---")  # Linha de separação para as outras cidades
+
+        # Exibir as localizações agrupadas por dia e cidade, uma página por vez
+        with span("linha_do_tempo"):
+            display_timeline(location_store)
 
     except Exception as e:
         st.error(f"Erro ao renderizar o mapa: {e}")
 else:
     st.info("Nenhuma localização registrada ainda.")
+
+display_timing_panel()
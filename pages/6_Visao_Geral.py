@@ -0,0 +1,43 @@
+import time
+
+import streamlit as st
+from firebase.async_data import get_many
+from utils.timing_panel import begin_page, display_timing_panel
+
+# Mede as etapas desta execução (ver `utils.timing_panel`)
+begin_page("Visão Geral")
+
+st.title("Visão Geral 🧭")
+
+# Carrega as localizações e os agregados ao mesmo tempo: a página espera pela leitura mais lenta, não pela soma
+# (os agregados passam por `get_rollups`, como nas páginas de progresso e de gastos)
+start = time.perf_counter()
+results = get_many(["locations", "rollups/progresso_viagem", "rollups/gastos"], return_exceptions=True)
+elapsed = time.perf_counter() - start
+
+for path, result in results.items():
+    if isinstance(result, Exception):
+        st.error(f"Erro ao carregar '{path}': {result}")
+        results[path] = None
+
+progress = (results["rollups/progresso_viagem"] or {}).get("total", {})
+expenses = (results["rollups/gastos"] or {}).get("total", {})
+locations = results["locations"] or {}
+
+col_distance, col_elevation, col_expenses = st.columns(3)
+col_distance.metric("Distância (km)", f"{progress.get('distancia', 0):.1f}")
+col_elevation.metric("Altimetria (m)", f"{progress.get('altimetria', 0):.0f}")
+col_expenses.metric(
+    "Gastos", f"R$ {expenses.get('valor', 0):,.2f}".replace(",", "X").replace(".", ",").replace("X", ".")
+)
+
+if locations:
+    last = locations[max(locations)]
+    st.markdown(f"**Última localização:** {last.get('cidade', 'Desconhecida')} ({last.get('timestamp', 'sem horário')})")
+    st.markdown(f"**Localizações registradas:** {len(locations)}")
+else:
+    st.info("Nenhuma localização registrada ainda.")
+
+st.caption(f"Dados carregados em {elapsed * 1000:.0f} ms.")
+
+display_timing_panel()
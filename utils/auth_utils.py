@@ -1,6 +1,7 @@
 import os
 import streamlit as st
 from firebase.firebase_utils import authenticate_user
+from firebase.sessions import issue_session, revoke_session
 from streamlit_cookies_manager import EncryptedCookieManager
 from email_validator import validate_email, EmailNotValidError
 
@@ -19,7 +20,7 @@ def display_login():
     Fluxo:
     - Se o usuário for autenticado com sucesso:
         - O estado de autenticação é armazenado na sessão (`st.session_state.authenticated`).
-        - As informações de autenticação são salvas nos cookies.
+        - Um token de sessão assinado e o email são salvos nos cookies.
         - Uma mensagem de boas-vindas é exibida.
     - Caso contrário:
         - Uma mensagem de erro é exibida.
@@ -45,7 +46,7 @@ def display_login():
                 user = authenticate_user(email, password)
                 if user:
                     st.session_state.authenticated = True
-                    cookies["authenticated"] = "true"
+                    cookies["session_token"] = issue_session(user)
                     cookies["user_email"] = user["email"]  
                     cookies.save()  
                     st.success(f"Bem-vindo(a), {user['email']}!")
@@ -62,10 +63,11 @@ def logout():
 
     Fluxo:
     - O estado de autenticação é redefinido para falso.
-    - Os cookies relacionados à autenticação são excluídos.
+    - A sessão é revogada e os cookies relacionados à autenticação são excluídos.
     - Uma mensagem de sucesso é exibida.
     """
     st.session_state.authenticated = False
-    cookies.delete("authenticated") 
+    revoke_session(cookies.get("session_token"))
+    cookies.delete("session_token") 
     cookies.delete("user_email")  
     st.success("Você saiu com sucesso!")
@@ -0,0 +1,378 @@
+"""
+Armazenamento colunar compacto dos registros de `locations` e `progresso_viagem`.
+
+Os registros chegam do Firebase como um dicionário de dicionários de objetos Python (cerca de
+meio kilobyte por ponto). Aqui cada campo vira um array tipado: float64 para coordenadas e
+medidas, int64 para horários (segundos desde 1970) e códigos int32 para textos repetidos, como
+o nome da cidade, cujos valores distintos são guardados uma única vez. Os registros são
+convertidos em blocos, sem listas de dicionários intermediárias, e os arrays crescem apenas
+no fim, de modo que `column` e `to_frame` expõem visões sem cópia.
+"""
+import hashlib
+import threading
+from itertools import islice
+from typing import NamedTuple
+
+import numpy as np
+import pandas as pd
+
+# Registros convertidos por bloco ao ler o payload do Firebase
+CHUNK_SIZE = 65_536
+# Horário ausente; é o mesmo valor que o NumPy usa para NaT em datetime64
+MISSING_EPOCH = np.iinfo(np.int64).min
+# Código de texto ausente; o pandas o interpreta como NaN em `Categorical`
+MISSING_CODE = -1
+
+
+class Column(NamedTuple):
+    """
+    Descrição de uma coluna do armazenamento.
+
+    Parâmetros:
+        field (str): Campo do registro no Firebase.
+        kind (str): "float" (float64, NaN se ausente), "epoch" (int64 em segundos) ou "text" (códigos int32).
+        time_format (str, opcional): Formato do horário, para colunas "epoch".
+        default (str, opcional): Valor usado quando o campo está ausente, para colunas "text".
+    """
+    field: str
+    kind: str
+    time_format: str = "%Y-%m-%d %H:%M:%S"
+    default: str = None
+
+
+LOCATION_SCHEMA = {
+    "latitude": Column("latitude", "float"),
+    "longitude": Column("longitude", "float"),
+    "altitude": Column("altitude", "float"),
+    "timestamp": Column("timestamp", "epoch"),
+    "cidade": Column("cidade", "text", default="Desconhecida"),
+}
+
+PROGRESS_SCHEMA = {
+    "distancia": Column("distancia", "float"),
+    "altimetria": Column("altimetria", "float"),
+    "tempo": Column("tempo", "text"),
+    "timestamp": Column("timestamp", "epoch"),
+    # Registros antigos só possuem "data_envio" (ISO)
+    "data_envio": Column("data_envio", "epoch", "ISO8601"),
+}
+
+_DTYPES = {"float": np.float64, "epoch": np.int64, "text": np.int32}
+
+_cache = {}
+_cache_lock = threading.Lock()
+
+
+class StringPool:
+    """
+    Guarda cada texto distinto uma única vez e o representa por um código inteiro.
+    """
+
+    def __init__(self):
+        self.values = []
+        self._codes = {}
+
+    def encode(self, strings):
+        """
+        Converte textos em códigos, incluindo os textos novos no conjunto.
+
+        Parâmetros:
+            strings (list): Os textos (None para ausente).
+
+        Retorna:
+            np.ndarray: Os códigos (int32), com `MISSING_CODE` para valores ausentes.
+        """
+        codes = self._codes
+        for value in set(strings).difference(codes):
+            if value is not None:
+                codes[value] = len(self.values)
+                self.values.append(value)
+        codes[None] = MISSING_CODE
+        return np.fromiter((codes[value] for value in strings), dtype=np.int32, count=len(strings))
+
+
+class ColumnarStore:
+    """
+    Registros de um caminho do Firebase em arrays tipados, com crescimento apenas no fim.
+
+    Parâmetros:
+        schema (dict): Mapeia o nome de cada coluna para sua descrição (`Column`).
+        capacity (int): Quantidade inicial de registros reservada.
+    """
+
+    def __init__(self, schema, capacity: int = 1024):
+        self.schema = dict(schema)
+        # Incrementado quando registros já incluídos são alterados (ver `refresh_text`)
+        self.revision = 0
+        self._size = 0
+        self._keys = np.empty(capacity, dtype="S20")
+        self._arrays = {name: np.empty(capacity, dtype=_DTYPES[column.kind]) for name, column in self.schema.items()}
+        self._pools = {name: StringPool() for name, column in self.schema.items() if column.kind == "text"}
+
+    @classmethod
+    def from_payload(cls, data, schema):
+        """
+        Cria o armazenamento a partir dos registros retornados pelo Firebase.
+
+        Parâmetros:
+            data (dict): Registros indexados pelo push key; valores que não são dicionários são ignorados.
+            schema (dict): Colunas do armazenamento (ex.: `LOCATION_SCHEMA`).
+
+        Retorna:
+            ColumnarStore: O armazenamento preenchido.
+        """
+        store = cls(schema, capacity=max(len(data or {}), 1))
+        store.extend((data or {}).items())
+        return store
+
+    def __len__(self):
+        return self._size
+
+    def extend(self, items):
+        """
+        Inclui registros no fim, convertendo-os em blocos de `CHUNK_SIZE`.
+
+        Parâmetros:
+            items: Pares (push key, registro), na ordem em que devem ficar.
+        """
+        items = iter(items)
+        while True:
+            # Chaves e registros em listas separadas: sem uma tupla nova por registro
+            keys, records, count = [], [], 0
+            for key, record in islice(items, CHUNK_SIZE):
+                count += 1
+                if isinstance(record, dict):
+                    keys.append(key)
+                    records.append(record)
+            if records:
+                self._append_chunk(keys, records)
+            if count < CHUNK_SIZE:
+                return
+
+    def column(self, name: str):
+        """
+        Retorna os valores de uma coluna como array NumPy somente leitura, sem cópia.
+
+        Colunas de texto retornam os códigos; use `categories` ou `to_frame` para os textos.
+
+        Parâmetros:
+            name (str): Nome da coluna.
+
+        Retorna:
+            np.ndarray: Os valores dos registros incluídos até agora.
+        """
+        view = self._arrays[name][:self._size]
+        view.flags.writeable = False
+        return view
+
+    def categories(self, name: str):
+        """
+        Retorna os textos distintos de uma coluna de texto, na ordem dos códigos.
+        """
+        return self._pools[name].values
+
+    def keys(self):
+        """
+        Retorna os push keys dos registros, na ordem em que foram incluídos.
+
+        Retorna:
+            np.ndarray: Os push keys (bytes).
+        """
+        view = self._keys[:self._size]
+        view.flags.writeable = False
+        return view
+
+    def times(self, name: str = "timestamp"):
+        """
+        Retorna uma coluna de horário como datetime64[s] (NaT se ausente), sem cópia.
+        """
+        return self.column(name).view("datetime64[s]")
+
+    def to_frame(self, columns=None):
+        """
+        Monta um DataFrame com as colunas do armazenamento.
+
+        As colunas numéricas compartilham a memória dos arrays, as de horário viram datetime64
+        e as de texto viram `Categorical`, que reaproveita os códigos.
+
+        Parâmetros:
+            columns (list, opcional): Colunas a incluir; por padrão, todas.
+
+        Retorna:
+            pd.DataFrame: Um registro por linha.
+        """
+        frame = {}
+        for name in columns or self.schema:
+            kind = self.schema[name].kind
+            if kind == "epoch":
+                frame[name] = self.times(name)
+            elif kind == "text":
+                frame[name] = pd.Categorical.from_codes(self.column(name), self.categories(name), validate=False)
+            else:
+                frame[name] = self.column(name)
+        return pd.DataFrame(frame, copy=False)
+
+    def refresh_text(self, data, name: str, stale_value: str):
+        """
+        Relê, nos registros de `data`, uma coluna de texto das linhas que ainda têm `stale_value`.
+
+        Usado para a cidade resolvida em segundo plano (ver `geocoding.resolve_city_later`),
+        que altera registros já incluídos.
+
+        Parâmetros:
+            data (dict): Registros indexados pelo push key.
+            name (str): Coluna de texto.
+            stale_value (str): Valor provisório a ser conferido.
+        """
+        pool = self._pools[name]
+        stale_code = pool._codes.get(stale_value)
+        if stale_code is None:
+            return
+        codes = self._arrays[name][:self._size]
+        positions = np.flatnonzero(codes == stale_code)
+        if positions.size:
+            field = self.schema[name].field
+            keys = self._keys[positions]
+            current = pool.encode([(data.get(key.decode()) or {}).get(field, stale_value) for key in keys])
+            if np.any(current != stale_code):
+                codes[positions] = current
+                self.revision += 1
+
+    @property
+    def nbytes(self):
+        """
+        int: Memória ocupada pelos registros incluídos (arrays e textos distintos), em bytes.
+        """
+        arrays = sum(array[:self._size].nbytes for array in self._arrays.values())
+        texts = sum(len(value) for pool in self._pools.values() for value in pool.values)
+        return arrays + self._keys[:self._size].nbytes + texts
+
+    def _append_chunk(self, keys, records):
+        self._reserve(self._size + len(records))
+        end = self._size + len(records)
+        keys = np.array(keys, dtype="S")
+        if keys.dtype.itemsize > self._keys.dtype.itemsize:
+            self._keys = self._keys.astype(keys.dtype)
+        self._keys[self._size:end] = keys
+        for name, column in self.schema.items():
+            field = column.field
+            self._arrays[name][self._size:end] = self._convert(name, column, [record.get(field) for record in records])
+        self._size = end
+
+    def _convert(self, name, column, values):
+        if column.kind == "text":
+            return self._pools[name].encode([column.default if value is None else str(value) for value in values])
+        if column.kind == "float":
+            try:
+                # Caminho rápido: números e campos ausentes (None vira NaN)
+                return np.array(values, dtype=np.float64)
+            except (TypeError, ValueError):
+                series = pd.to_numeric(pd.Series(values, dtype="object"), errors="coerce")
+                return series.to_numpy(dtype=np.float64, na_value=np.nan)
+        series = pd.Series(values, dtype="object")
+        if column.time_format == "ISO8601":
+            times = pd.to_datetime(series, format="ISO8601", errors="coerce", utc=True).dt.tz_localize(None)
+        else:
+            times = pd.to_datetime(series, format=column.time_format, errors="coerce")
+        return times.to_numpy(dtype="datetime64[s]").view(np.int64)
+
+    def _reserve(self, size):
+        capacity = self._keys.size
+        if size <= capacity:
+            return
+        capacity = max(size, capacity * 2)
+        # Visões já entregues continuam apontando para os arrays anteriores, que não mudam
+        self._keys = _grown(self._keys, self._size, capacity)
+        self._arrays = {name: _grown(array, self._size, capacity) for name, array in self._arrays.items()}
+
+
+def _grown(array, size, capacity):
+    grown = np.empty(capacity, dtype=array.dtype)
+    grown[:size] = array[:size]
+    return grown
+
+
+def appended_keys(keys, processed):
+    """
+    Compara os push keys recebidos com os já processados por um cache incremental.
+
+    Os registros apenas acrescentam novos push keys quando há pelo menos tantos quanto os já
+    processados e os primeiros são exatamente os mesmos, o que é conferido pela impressão digital
+    do prefixo; caso contrário (registros removidos, trocados ou fora de ordem), o cache deve
+    processar tudo de novo.
+
+    Parâmetros:
+        keys (list): Push keys recebidos, em ordem.
+        processed (tuple): Estado devolvido pela chamada anterior, ou None se nada foi processado.
+
+    Retorna:
+        tuple: (push keys novos, ou None se tudo deve ser processado de novo; estado a guardar
+            com o cache para a próxima chamada).
+    """
+    if processed is not None:
+        count, fingerprint = processed
+        if len(keys) >= count:
+            digest = _keys_digest(keys[:count])
+            if digest.digest() == fingerprint:
+                new_keys = keys[count:]
+                digest.update(_keys_bytes(new_keys))
+                return new_keys, (len(keys), digest.digest())
+    return None, (len(keys), _keys_digest(keys).digest())
+
+
+def _keys_digest(keys):
+    return hashlib.blake2b(_keys_bytes(keys), digest_size=16)
+
+
+def _keys_bytes(keys):
+    return "".join(f"{key}\0" for key in keys).encode()
+
+
+def store_for(data, schema, name: str):
+    """
+    Retorna o armazenamento colunar dos registros, com atualização incremental.
+
+    O armazenamento fica em cache no processo; só os registros novos são convertidos (ver `appended_keys`).
+
+    Parâmetros:
+        data (dict): Registros indexados pelo push key (ordenados pela chave).
+        schema (dict): Colunas do armazenamento (ex.: `LOCATION_SCHEMA`).
+        name (str): Nome do conjunto no cache.
+
+    Retorna:
+        ColumnarStore: O armazenamento atualizado.
+    """
+    keys = [key for key, value in (data or {}).items() if isinstance(value, dict)]
+    with _cache_lock:
+        store, processed = _cache.get(name, (None, None))
+        new_keys, processed = appended_keys(keys, processed if store is not None and store.schema == schema else None)
+        if new_keys is None:
+            store, new_keys = ColumnarStore(schema, capacity=max(len(keys), 1)), keys
+
+        if new_keys:
+            store.extend((key, data[key]) for key in new_keys)
+        _cache[name] = (store, processed)
+        return store
+
+
+def location_store_for(data, name: str = "locations"):
+    """
+    Retorna o armazenamento colunar dos registros de `locations` (ver `store_for`).
+
+    As cidades ainda desconhecidas são relidas a cada chamada, pois são resolvidas em segundo plano.
+
+    Parâmetros:
+        data (dict): Registros de `locations`, indexados pelo push key.
+        name (str): Nome do conjunto no cache.
+
+    Retorna:
+        ColumnarStore: O armazenamento, com as colunas de `LOCATION_SCHEMA`.
+    """
+    # Importado aqui: o serviço de geocodificação depende do índice espacial e do geocoder
+    from utils.geocoding import UNKNOWN_CITY
+
+    store = store_for(data, LOCATION_SCHEMA, name)
+    if data:
+        with _cache_lock:
+            store.refresh_text(data, "cidade", UNKNOWN_CITY)
+    return store
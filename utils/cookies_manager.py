@@ -1,5 +1,10 @@
+import os
 import streamlit as st
 from streamlit_cookies_manager import EncryptedCookieManager
+from firebase.sessions import revoke_session, verify_session
+
+# Chave da criptografia dos cookies
+COOKIE_PASSWORD = os.getenv("COOKIE_MANAGER_PASSWORD", "password")
 
 def initialize_cookies_manager():
     """
@@ -8,24 +13,36 @@ def initialize_cookies_manager():
     Retorna:
         EncryptedCookieManager: Instância inicializada do gerenciador de cookies.
     """
-    cookies = EncryptedCookieManager(prefix="bikepacking_tracker", password="password")
+    cookies = EncryptedCookieManager(prefix="bikepacking_tracker", password=COOKIE_PASSWORD)
 
     if not cookies.ready():
         st.stop()  
 
     return cookies
 
-def set_auth_cookies(cookies, authenticated, user_email=None):
+def get_authenticated_user(cookies):
+    """
+    Retorna o usuário da sessão guardada nos cookies, validando o token localmente.
+
+    Parâmetros:
+        cookies (EncryptedCookieManager): Instância do gerenciador de cookies.
+
+    Retorna:
+        dict: O "uid" e o "email" do usuário, ou None se não houver sessão válida.
+    """
+    return verify_session(cookies.get("session_token"))
+
+def set_auth_cookies(cookies, session_token, user_email=None):
     """
     Define os cookies de autenticação.
 
     Parâmetros:
         cookies (EncryptedCookieManager): Instância do gerenciador de cookies.
-        authenticated (bool): Estado de autenticação do usuário.
+        session_token (str): Token de sessão emitido no login (ver `firebase.sessions.issue_session`).
         user_email (str, opcional): Email do usuário autenticado.
     """
     try:
-        cookies["authenticated"] = "true" if authenticated else "false"
+        cookies["session_token"] = session_token
         if user_email:
             cookies["user_email"] = user_email
         cookies.save()
@@ -34,13 +51,14 @@ def set_auth_cookies(cookies, authenticated, user_email=None):
 
 def clear_auth_cookies(cookies):
     """
-    Redefine os cookies relacionados à autenticação.
+    Revoga a sessão atual e redefine os cookies relacionados à autenticação.
 
     Parâmetros:
         cookies (EncryptedCookieManager): Instância do gerenciador de cookies.
     """
     try:
-        cookies["authenticated"] = "false"  
+        revoke_session(cookies.get("session_token"))
+        cookies["session_token"] = ""  
         cookies["user_email"] = ""  
         cookies.save()
     except Exception as e:
@@ -0,0 +1,101 @@
+import numpy as np
+
+
+def lttb(x, y, threshold: int):
+    """
+    Seleciona os pontos de uma série pelo método Largest-Triangle-Three-Buckets (LTTB).
+
+    A série é dividida em `threshold - 2` grupos; de cada grupo fica o ponto que forma o maior
+    triângulo com o ponto escolhido no grupo anterior e a média do grupo seguinte, o que
+    preserva picos e mudanças de tendência. O primeiro e o último ponto são sempre mantidos.
+
+    Parâmetros:
+        x (np.ndarray): Valores do eixo horizontal, em ordem crescente.
+        y (np.ndarray): Valores da série (sem NaN).
+        threshold (int): Quantidade de pontos desejada.
+
+    Retorna:
+        np.ndarray: Posições dos pontos selecionados, em ordem crescente.
+    """
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    count = y.size
+    if threshold >= count or threshold < 3:
+        return np.arange(count)
+
+    # Limites dos grupos intermediários; o primeiro e o último ponto ficam de fora
+    edges = np.linspace(1, count - 1, threshold - 1).astype(np.int64)
+    selected = np.empty(threshold, dtype=np.int64)
+    selected[0], selected[-1] = 0, count - 1
+    previous = 0
+    for i in range(threshold - 2):
+        start, end = edges[i], edges[i + 1]
+        next_start, next_end = (edges[i + 1], edges[i + 2]) if i + 2 < edges.size else (count - 1, count)
+        mean_x = x[next_start:next_end].mean()
+        mean_y = y[next_start:next_end].mean()
+        areas = np.abs(
+            (x[previous] - mean_x) * (y[start:end] - y[previous])
+            - (x[previous] - x[start:end]) * (mean_y - y[previous])
+        )
+        previous = start + int(np.argmax(areas))
+        selected[i + 1] = previous
+    return selected
+
+
+def minmax(y, buckets: int):
+    """
+    Seleciona, em cada grupo de pontos consecutivos, o menor e o maior valor da série.
+
+    Diferente de uma média por grupo, os extremos aparecem no gráfico reduzido.
+
+    Parâmetros:
+        y (np.ndarray): Valores da série (sem NaN).
+        buckets (int): Quantidade de grupos; o resultado tem até `2 * buckets` pontos.
+
+    Retorna:
+        np.ndarray: Posições dos pontos selecionados, em ordem crescente.
+    """
+    y = np.asarray(y, dtype=np.float64)
+    count = y.size
+    if 2 * buckets >= count or buckets < 1:
+        return np.arange(count)
+
+    bucket = np.arange(count) * buckets // count
+    # Ordena por grupo e, dentro do grupo, pelo valor: o primeiro é o mínimo e o último, o máximo
+    order = np.lexsort((y, bucket))
+    bounds = np.flatnonzero(np.diff(bucket)) + 1
+    first = np.concatenate(([0], bounds))
+    last = np.concatenate((bounds - 1, [count - 1]))
+    return np.unique(np.concatenate((order[first], order[last], [0, count - 1])))
+
+
+def downsample(x, series, max_points: int, method: str = "lttb"):
+    """
+    Reduz várias séries que compartilham o eixo horizontal a cerca de `max_points` pontos.
+
+    Cada série recebe uma parte do total, e as posições escolhidas para todas são unidas,
+    de modo que os picos de qualquer uma delas aparecem no gráfico.
+
+    Parâmetros:
+        x (np.ndarray): Valores do eixo horizontal, em ordem crescente.
+        series (list): As séries (arrays com o mesmo tamanho de `x`).
+        max_points (int): Quantidade máxima de pontos.
+        method (str): "lttb" (linhas) ou "minmax" (barras).
+
+    Retorna:
+        np.ndarray: Posições selecionadas, em ordem crescente.
+
+    Levanta:
+        ValueError: Se o método não for reconhecido.
+    """
+    count = len(x)
+    if count <= max_points or not series:
+        return np.arange(count)
+    share = max(max_points // len(series), 3)
+    if method == "lttb":
+        selected = [lttb(x, y, share) for y in series]
+    elif method == "minmax":
+        selected = [minmax(y, share // 2) for y in series]
+    else:
+        raise ValueError(f"Método de redução desconhecido: {method}")
+    return np.unique(np.concatenate(selected))
@@ -1,6 +1,15 @@
 from datetime import datetime
+import numpy as np
+import pandas as pd
 import streamlit as st
-from firebase.firebase_utils import set_data
+from firebase.firebase_utils import get_rollups, query_data, set_data
+from firebase.rollups import safe_key
+
+# Quantidade de gastos por página da tabela
+PAGE_SIZE = 50
+EXPENSE_ORDERS = ("data", "categoria")
+# Dígitos da parte inteira suportados por `format_currency`
+CURRENCY_DIGITS = 15
 
 def display_expenses_page():
     """
@@ -31,3 +40,107 @@ def display_expenses_page():
                     st.success("Gasto registrado com sucesso!")
                 except Exception as e:
                     st.error(f"Erro ao registrar o gasto: {e}")
+
+def format_currency(values):
+    """
+    Formata valores em reais (ex.: 1234.5 -> "R$ 1.234,50"), de forma vetorizada.
+
+    Os caracteres de todos os valores são montados de uma vez em uma matriz de bytes (dígitos,
+    separadores de milhar e centavos), em vez de formatar e substituir texto valor a valor.
+
+    Parâmetros:
+        values (pd.Series | array): Os valores (até 10^15 reais); ausentes resultam em texto vazio.
+
+    Retorna:
+        pd.Series: Os valores formatados, com o mesmo índice de `values` quando for uma Series.
+    """
+    values = values if isinstance(values, pd.Series) else pd.Series(values)
+    numbers = pd.to_numeric(values, errors="coerce").to_numpy(dtype=np.float64, na_value=np.nan)
+    missing = np.isnan(numbers)
+    cents = np.rint(np.abs(np.where(missing, 0, numbers)) * 100).astype(np.int64)
+    reais = cents // 100
+    digits = (reais[:, None] // 10 ** np.arange(CURRENCY_DIGITS, dtype=np.int64)) % 10
+    width = np.floor(np.log10(np.maximum(reais, 1))).astype(np.int64) + 1
+
+    # Uma linha por valor, alinhada à direita: dígitos e pontos da parte inteira, vírgula e centavos
+    columns = CURRENCY_DIGITS + (CURRENCY_DIGITS - 1) // 3 + 3
+    chars = np.full((numbers.size, columns), ord(" "), dtype=np.uint8)
+    chars[:, -1] = ord("0") + cents % 10
+    chars[:, -2] = ord("0") + cents // 10 % 10
+    chars[:, -3] = ord(",")
+    position = columns - 4
+    for digit in range(CURRENCY_DIGITS):
+        if digit and digit % 3 == 0:
+            chars[:, position] = np.where(width > digit, ord("."), ord(" "))
+            position -= 1
+        chars[:, position] = np.where(width > digit, ord("0") + digits[:, digit], ord(" "))
+        position -= 1
+
+    text = np.char.lstrip(chars.view(f"S{columns}").ravel()).astype(str)
+    prefix = np.where((numbers < 0) & (cents > 0), "-R$ ", "R$ ")
+    formatted = pd.Series(np.char.add(prefix, text), index=values.index, dtype=object)
+    return formatted.mask(missing, "")
+
+def load_expense_page(order_by: str = "data", start=None, end=None, page_size: int = PAGE_SIZE, start_after=None):
+    """
+    Carrega uma página de gastos, ordenada e filtrada no servidor (ver `query_data`).
+
+    Parâmetros:
+        order_by (str): "data" ou "categoria".
+        start (str, opcional): Menor valor do campo (ex.: "2024-01-01" ou uma categoria).
+        end (str, opcional): Maior valor do campo.
+        page_size (int): Quantidade de gastos por página.
+        start_after (tuple, opcional): Cursor retornado pela página anterior.
+
+    Retorna:
+        tuple: O DataFrame da página e o cursor da próxima página (None se esta for a última).
+
+    Levanta:
+        ValueError: Se o campo de ordenação não for suportado.
+    """
+    if order_by not in EXPENSE_ORDERS:
+        raise ValueError(f"Ordenação não suportada: {order_by}")
+    # Um registro a mais indica se existe próxima página
+    records = query_data("gastos", order_by, start, end, page_size + 1, start_after)
+    keys = list(records)[:page_size]
+    page = pd.DataFrame([records[key] for key in keys], index=pd.Index(keys, name="chave"))
+    for column in ("data", "categoria", "descricao", "valor", "timestamp"):
+        if column not in page.columns:
+            page[column] = None
+    page["valor"] = pd.to_numeric(page["valor"], errors="coerce")
+    next_cursor = None
+    if len(records) > page_size:
+        next_cursor = (records[keys[-1]].get(order_by), keys[-1])
+    return page, next_cursor
+
+def expense_total(order_by: str = "data", start=None, end=None):
+    """
+    Soma dos gastos dentro do filtro, lida dos agregados (`rollups/gastos`) em vez do histórico.
+
+    Parâmetros:
+        order_by (str): "data" (soma os dias entre `start` e `end`) ou "categoria" (soma as
+            categorias entre `start` e `end`).
+        start (str, opcional): Menor valor do campo.
+        end (str, opcional): Maior valor do campo.
+
+    Retorna:
+        dict: "valor" e "registros" dentro do filtro, ou None se os agregados não existirem.
+    """
+    rollup = get_rollups("gastos")
+    if not rollup:
+        return None
+    if start is None and end is None:
+        nodes = [rollup.get("total") or {}]
+    else:
+        group = rollup.get("por_dia" if order_by == "data" else "por_categoria") or {}
+        # As chaves dos agregados são os valores com caracteres inválidos substituídos
+        low = safe_key(start) if start is not None else None
+        high = safe_key(end) if end is not None else None
+        nodes = [
+            node for key, node in group.items()
+            if (low is None or key >= low) and (high is None or key <= high)
+        ]
+    return {
+        "valor": sum(node.get("valor", 0) for node in nodes),
+        "registros": sum(node.get("registros", 0) for node in nodes),
+    }
@@ -0,0 +1,491 @@
+"""
+Geocodificação reversa (nome da cidade a partir das coordenadas) com cache persistente.
+
+As consultas ao provedor saem da thread da página: `GeocodingService.submit` enfileira as
+coordenadas para uma thread em segundo plano, que as resolve em lotes, respeitando o
+intervalo mínimo entre requisições do provedor. Os resultados ficam em um cache SQLite
+indexado pela célula da coordenada arredondada, com validade (TTL) e descarte dos menos
+usados (LRU). O provedor é configurável; `StaticProvider` resolve a partir de uma lista
+local de lugares, sem rede.
+
+Uso pela linha de comando:
+    python -m utils.geocoding backfill   # preenche a cidade das localizações "Desconhecida"
+"""
+import argparse
+import logging
+import os
+import queue
+import sqlite3
+import sys
+import threading
+import time
+
+import numpy as np
+
+from utils.spatial_index import SpatialIndex
+
+logger = logging.getLogger(__name__)
+
+GEOCODE_CACHE_PATH = os.getenv("BIKEPACKING_GEOCODE_CACHE_PATH", "data/geocode_cache.sqlite3")
+
+UNKNOWN_CITY = "Desconhecida"
+
+# Casas decimais das coordenadas que formam a célula do cache (~1,1 km)
+CELL_DECIMALS = 2
+CACHE_MAX_ENTRIES = 50_000
+CACHE_TTL_S = 30 * 24 * 3600
+# Intervalo mínimo entre requisições ao provedor (política de uso do Nominatim: 1 por segundo)
+MIN_REQUEST_INTERVAL_S = 1.0
+BATCH_SIZE = 100
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS geocode (
+    cell TEXT PRIMARY KEY,
+    cidade TEXT,
+    resolved_at REAL NOT NULL,
+    used_at REAL NOT NULL
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_geocode_used_at ON geocode (used_at);
+"""
+
+_service = None
+_service_lock = threading.Lock()
+
+
+def cell_key(latitude: float, longitude: float, decimals: int = CELL_DECIMALS):
+    """
+    Retorna a chave da célula do cache para uma coordenada.
+
+    Parâmetros:
+        latitude, longitude (float): Coordenada em graus.
+        decimals (int): Casas decimais mantidas.
+
+    Retorna:
+        str: A chave da célula (ex.: "-22.90,-45.50").
+    """
+    return f"{round(float(latitude), decimals):.{decimals}f},{round(float(longitude), decimals):.{decimals}f}"
+
+
+class OsmProvider:
+    """
+    Provedor de geocodificação reversa do OpenStreetMap (Nominatim), pela biblioteca `geocoder`.
+
+    Parâmetros:
+        timeout (float): Tempo máximo de cada requisição, em segundos.
+    """
+
+    def __init__(self, timeout: float = 5.0):
+        self.timeout = timeout
+
+    def reverse(self, latitude: float, longitude: float):
+        """
+        Retorna o nome da cidade de uma coordenada.
+
+        Parâmetros:
+            latitude, longitude (float): Coordenada em graus.
+
+        Retorna:
+            str: O nome da cidade, ou None se a coordenada não estiver em nenhuma cidade.
+
+        Levanta:
+            RuntimeError: Se a requisição falhar.
+        """
+        import geocoder
+
+        g = geocoder.osm([latitude, longitude], method="reverse", timeout=self.timeout)
+        if not g.ok and g.status != "ERROR - No results found":
+            raise RuntimeError(f"Erro na geocodificação reversa: {g.status}")
+        return g.city or g.town or g.village or g.municipality
+
+
+class StaticProvider:
+    """
+    Provedor local, sem rede: retorna o lugar conhecido mais próximo da coordenada.
+
+    Parâmetros:
+        places (list): Lugares com "cidade", "latitude" e "longitude".
+        max_distance_m (float): Distância máxima até o lugar; acima dela, a coordenada fica sem cidade.
+    """
+
+    def __init__(self, places, max_distance_m: float = 30_000):
+        self.places = list(places)
+        self.max_distance_m = max_distance_m
+        self.requests = 0
+        self._index = SpatialIndex()
+        self._index.add([p["latitude"] for p in self.places], [p["longitude"] for p in self.places])
+
+    def reverse(self, latitude: float, longitude: float):
+        self.requests += 1
+        positions, distances = self._index.nearest(latitude, longitude)
+        if positions.size == 0 or distances[0] > self.max_distance_m:
+            return None
+        return self.places[positions[0]]["cidade"]
+
+
+class GeocodeCache:
+    """
+    Cache persistente em SQLite dos nomes de cidade, indexado pela célula da coordenada.
+
+    Parâmetros:
+        db_path (str): Caminho do arquivo SQLite (use ":memory:" para um cache volátil).
+        max_entries (int): Quantidade máxima de células; as menos usadas são descartadas.
+        ttl_s (float): Validade de cada resultado, em segundos.
+    """
+
+    def __init__(self, db_path: str, max_entries: int = CACHE_MAX_ENTRIES, ttl_s: float = CACHE_TTL_S):
+        self.db_path = db_path
+        self.max_entries = max_entries
+        self.ttl_s = ttl_s
+        self._lock = threading.Lock()
+        cache_dir = os.path.dirname(db_path) if db_path != ":memory:" else ""
+        if cache_dir:
+            os.makedirs(cache_dir, exist_ok=True)
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        if db_path != ":memory:":
+            self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(_SCHEMA)
+
+    def get_many(self, cells):
+        """
+        Lê as cidades das células ainda válidas e marca essas células como usadas.
+
+        Parâmetros:
+            cells (list): Chaves das células (ver `cell_key`).
+
+        Retorna:
+            dict: Mapeia cada célula encontrada para a cidade (None se a coordenada não tem cidade).
+        """
+        cells = list(dict.fromkeys(cells))
+        now = time.time()
+        found = {}
+        with self._lock, self._conn:
+            # Consulta em blocos, abaixo do limite de parâmetros do SQLite
+            for start in range(0, len(cells), 500):
+                chunk = cells[start:start + 500]
+                rows = self._conn.execute(
+                    f"SELECT cell, cidade FROM geocode WHERE cell IN ({','.join('?' * len(chunk))}) AND resolved_at >= ?",
+                    (*chunk, now - self.ttl_s),
+                ).fetchall()
+                found.update(rows)
+            self._conn.executemany("UPDATE geocode SET used_at = ? WHERE cell = ?", [(now, cell) for cell in found])
+        return found
+
+    def put_many(self, results: dict):
+        """
+        Grava as cidades resolvidas e descarta as células menos usadas acima do limite.
+
+        Parâmetros:
+            results (dict): Mapeia cada célula para a cidade (None se a coordenada não tem cidade).
+        """
+        now = time.time()
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO geocode (cell, cidade, resolved_at, used_at) VALUES (?, ?, ?, ?)",
+                [(cell, cidade, now, now) for cell, cidade in results.items()],
+            )
+            excess = self._conn.execute("SELECT COUNT(*) FROM geocode").fetchone()[0] - self.max_entries
+            if excess > 0:
+                self._conn.execute(
+                    "DELETE FROM geocode WHERE cell IN (SELECT cell FROM geocode ORDER BY used_at LIMIT ?)", (excess,)
+                )
+
+    def __len__(self):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM geocode").fetchone()[0]
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+class GeocodingService:
+    """
+    Resolve nomes de cidade para coordenadas, consultando o cache antes do provedor.
+
+    Parâmetros:
+        provider: Objeto com `reverse(latitude, longitude)` (ex.: `OsmProvider`, `StaticProvider`).
+        cache (GeocodeCache): Cache dos resultados.
+        min_interval_s (float): Intervalo mínimo entre requisições ao provedor, em segundos.
+        batch_size (int): Quantidade máxima de coordenadas resolvidas por lote na thread em segundo plano.
+    """
+
+    def __init__(self, provider, cache, min_interval_s: float = MIN_REQUEST_INTERVAL_S, batch_size: int = BATCH_SIZE):
+        self.provider = provider
+        self.cache = cache
+        self.min_interval_s = min_interval_s
+        self.batch_size = batch_size
+        self._queue = queue.Queue()
+        self._worker = None
+        self._worker_lock = threading.Lock()
+        self._request_lock = threading.Lock()
+        self._last_request = 0.0
+        self._stats_lock = threading.Lock()
+        self._counters = {"cache_hits": 0, "cache_misses": 0, "requests": 0, "errors": 0}
+
+    def lookup(self, latitude: float, longitude: float):
+        """
+        Retorna a cidade de uma coordenada apenas se ela já estiver no cache (não acessa a rede).
+
+        Parâmetros:
+            latitude, longitude (float): Coordenada em graus.
+
+        Retorna:
+            str: O nome da cidade, ou None se não estiver no cache.
+        """
+        cell = cell_key(latitude, longitude)
+        return self.cache.get_many([cell]).get(cell)
+
+    def lookup_many(self, coordinates):
+        """
+        Retorna as cidades de várias coordenadas que já estão no cache, em uma única consulta (não acessa a rede).
+
+        Parâmetros:
+            coordinates (list): Pares (latitude, longitude).
+
+        Retorna:
+            list: O nome da cidade de cada coordenada (None se não estiver no cache), na mesma ordem.
+        """
+        cells = [cell_key(latitude, longitude) for latitude, longitude in coordinates]
+        known = self.cache.get_many(cells)
+        return [known.get(cell) for cell in cells]
+
+    def resolve(self, coordinates):
+        """
+        Resolve as cidades de várias coordenadas, aguardando o provedor quando necessário.
+
+        Coordenadas da mesma célula geram uma única consulta. Falhas do provedor não são
+        gravadas no cache, para que a coordenada seja consultada de novo depois.
+
+        Parâmetros:
+            coordinates (list): Pares (latitude, longitude).
+
+        Retorna:
+            list: O nome da cidade de cada coordenada (None se desconhecida), na mesma ordem.
+        """
+        cells = [cell_key(latitude, longitude) for latitude, longitude in coordinates]
+        known = self.cache.get_many(cells)
+        missing = {}
+        for cell, coordinate in zip(cells, coordinates):
+            if cell not in known:
+                missing.setdefault(cell, coordinate)
+        self._count(cache_hits=len(cells) - sum(1 for cell in cells if cell in missing), cache_misses=len(missing))
+
+        resolved = {}
+        for cell, (latitude, longitude) in missing.items():
+            try:
+                resolved[cell] = self._request(latitude, longitude)
+            except Exception as e:
+                self._count(errors=1)
+                logger.warning("Falha na geocodificação reversa de %s: %s", cell, e)
+        if resolved:
+            self.cache.put_many(resolved)
+        known.update(resolved)
+        return [known.get(cell) for cell in cells]
+
+    def submit(self, coordinates, callback=None):
+        """
+        Agenda a resolução de coordenadas na thread em segundo plano e retorna imediatamente.
+
+        Parâmetros:
+            coordinates (list): Pares (latitude, longitude).
+            callback (callable, opcional): Chamada como `callback(cidades)` com o resultado de `resolve`.
+        """
+        self._queue.put((list(coordinates), callback))
+        with self._worker_lock:
+            if self._worker is None or not self._worker.is_alive():
+                self._worker = threading.Thread(target=self._run, name="geocoding", daemon=True)
+                self._worker.start()
+
+    def join(self):
+        """
+        Aguarda a resolução de todas as coordenadas agendadas.
+        """
+        self._queue.join()
+
+    def stats(self):
+        """
+        Retorna os contadores do serviço.
+
+        Retorna:
+            dict: Acertos e faltas no cache, requisições ao provedor, erros e coordenadas na fila.
+        """
+        with self._stats_lock:
+            return {**self._counters, "queue_depth": self._queue.qsize()}
+
+    def _run(self):
+        while True:
+            jobs = [self._queue.get()]
+            # Junta as coordenadas já enfileiradas em um único lote
+            while sum(len(coordinates) for coordinates, _ in jobs) < self.batch_size:
+                try:
+                    jobs.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            try:
+                names = self.resolve([coordinate for coordinates, _ in jobs for coordinate in coordinates])
+                offset = 0
+                for coordinates, callback in jobs:
+                    if callback is not None:
+                        callback(names[offset:offset + len(coordinates)])
+                    offset += len(coordinates)
+            except Exception as e:
+                logger.warning("Falha ao resolver lote de geocodificação: %s", e)
+            finally:
+                for _ in jobs:
+                    self._queue.task_done()
+
+    def _request(self, latitude, longitude):
+        with self._request_lock:
+            wait = self._last_request + self.min_interval_s - time.monotonic()
+            if wait > 0:
+                time.sleep(wait)
+            try:
+                return self.provider.reverse(latitude, longitude)
+            finally:
+                self._last_request = time.monotonic()
+                self._count(requests=1)
+
+    def _count(self, **increments):
+        with self._stats_lock:
+            for name, value in increments.items():
+                self._counters[name] += value
+
+
+def get_geocoding_service():
+    """
+    Retorna o serviço de geocodificação do processo, criando-o com o OpenStreetMap na primeira chamada.
+
+    Retorna:
+        GeocodingService: O serviço.
+    """
+    global _service
+    with _service_lock:
+        if _service is None:
+            _service = GeocodingService(OsmProvider(), GeocodeCache(GEOCODE_CACHE_PATH))
+        return _service
+
+
+def configure_geocoding(provider=None, cache_path: str = None, **options):
+    """
+    Substitui o serviço de geocodificação do processo (ex.: `StaticProvider` nos testes).
+
+    Parâmetros:
+        provider (opcional): Provedor com `reverse(latitude, longitude)`; por padrão, `OsmProvider`.
+        cache_path (str, opcional): Caminho do cache SQLite; por padrão, `GEOCODE_CACHE_PATH`.
+        **options: Parâmetros adicionais repassados para `GeocodingService` (ex.: `min_interval_s`).
+
+    Retorna:
+        GeocodingService: O novo serviço.
+    """
+    global _service
+    with _service_lock:
+        if _service is not None:
+            _service.cache.close()
+        _service = GeocodingService(
+            provider or OsmProvider(), GeocodeCache(cache_path or GEOCODE_CACHE_PATH), **options,
+        )
+        return _service
+
+
+def resolve_city_later(key: str, latitude: float, longitude: float, reference_path: str = "locations"):
+    """
+    Agenda a resolução da cidade de um registro já gravado e atualiza o registro quando ela chegar.
+
+    Parâmetros:
+        key (str): Push key do registro.
+        latitude, longitude (float): Coordenada do registro.
+        reference_path (str): Caminho do registro no banco de dados.
+    """
+    resolve_cities_later([key], [(latitude, longitude)], reference_path)
+
+
+def resolve_cities_later(keys, coordinates, reference_path: str = "locations"):
+    """
+    Agenda a resolução das cidades de vários registros já gravados e os atualiza em uma única escrita.
+
+    Parâmetros:
+        keys (list): Push keys dos registros.
+        coordinates (list): Pares (latitude, longitude) de cada registro, na mesma ordem.
+        reference_path (str): Caminho dos registros no banco de dados.
+    """
+    from firebase.firebase_utils import update_data
+
+    keys = list(keys)
+
+    def _update(names):
+        updates = {key: {"cidade": name} for key, name in zip(keys, names) if name}
+        if updates:
+            update_data(reference_path, updates)
+
+    get_geocoding_service().submit(coordinates, callback=_update)
+
+
+def backfill_locations(service=None, limit: int = None, reference_path: str = "locations"):
+    """
+    Preenche a cidade das localizações gravadas sem cidade ou como "Desconhecida".
+
+    As coordenadas são resolvidas em lotes (com o cache e o intervalo mínimo do provedor)
+    e os registros alterados são gravados pela fila de escrita.
+
+    Parâmetros:
+        service (GeocodingService, opcional): Serviço usado; por padrão, `get_geocoding_service()`.
+        limit (int, opcional): Quantidade máxima de registros a processar.
+        reference_path (str): Caminho das localizações no banco de dados.
+
+    Retorna:
+        dict: Registros pendentes, atualizados e ainda sem cidade.
+    """
+    from firebase.firebase_utils import get_data, update_data
+
+    service = service or get_geocoding_service()
+    pending = []
+    for key, record in (get_data(reference_path) or {}).items():
+        if not isinstance(record, dict) or record.get("cidade") not in (None, "", UNKNOWN_CITY):
+            continue
+        try:
+            latitude, longitude = float(record["latitude"]), float(record["longitude"])
+        except (KeyError, TypeError, ValueError):
+            continue
+        if np.isfinite(latitude) and np.isfinite(longitude):
+            pending.append((key, latitude, longitude))
+    if limit is not None:
+        pending = pending[:limit]
+
+    updated = 0
+    for start in range(0, len(pending), service.batch_size):
+        chunk = pending[start:start + service.batch_size]
+        names = service.resolve([(latitude, longitude) for _, latitude, longitude in chunk])
+        updates = {key: {"cidade": name} for (key, _, _), name in zip(chunk, names) if name}
+        if updates:
+            update_data(reference_path, updates)
+            updated += len(updates)
+    return {"pendentes": len(pending), "atualizados": updated, "sem_cidade": len(pending) - updated}
+
+
+def main(argv=None):
+    from firebase.firebase_utils import configure_outbox, initialize_firebase, get_outbox, outbox_path_for
+    from firebase.client import DATABASE_URL, load_credentials
+
+    parser = argparse.ArgumentParser(description="Preenche a cidade das localizações sem cidade.")
+    parser.add_argument("command", choices=["backfill"])
+    parser.add_argument("--limit", type=int, help="Quantidade máxima de registros a processar.")
+    parser.add_argument("--credentials", help="Arquivo da conta de serviço (padrão: ver `firebase.client`).")
+    parser.add_argument("--database-url", default=DATABASE_URL)
+    args = parser.parse_args(argv)
+
+    initialize_firebase(load_credentials(args.credentials), args.database_url)
+    # Journal próprio: o do servidor do Streamlit fica travado enquanto ele estiver aberto
+    configure_outbox(outbox_path_for("geocoding"))
+
+    stats = backfill_locations(limit=args.limit)
+    outbox = get_outbox()
+    while outbox.flush():
+        pass
+    print(f"{stats['atualizados']} de {stats['pendentes']} localizações atualizadas "
+          f"({stats['sem_cidade']} sem cidade encontrada)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
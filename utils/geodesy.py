@@ -0,0 +1,230 @@
+import threading
+
+import numpy as np
+
+from utils.columnar_store import appended_keys
+
+EARTH_RADIUS_M = 6371008.8
+
+# Abaixo desta velocidade o ciclista é considerado parado
+MOVING_SPEED_KMH = 2.0
+# Intervalos maiores que este entre dois pontos contam como parada (ex.: GPS desligado à noite)
+MAX_MOVING_GAP_S = 10 * 60
+# Janela da média móvel aplicada à altitude antes de somar o ganho de elevação
+ELEVATION_WINDOW = 5
+
+_cache_lock = threading.Lock()
+_cache = {}
+
+
+def haversine(lat1, lon1, lat2, lon2):
+    """
+    Calcula a distância em metros entre pares de coordenadas pela fórmula de haversine.
+
+    Parâmetros:
+        lat1, lon1, lat2, lon2 (array): Coordenadas em graus; aceita escalares ou arrays NumPy.
+
+    Retorna:
+        np.ndarray: Distâncias em metros.
+    """
+    lat1, lon1, lat2, lon2 = (np.radians(np.asarray(value, dtype=np.float64)) for value in (lat1, lon1, lat2, lon2))
+    a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS_M * np.arcsin(np.sqrt(np.clip(a, 0, 1)))
+
+
+class TrackMetrics:
+    """
+    Métricas do percurso calculadas a partir das localizações registradas.
+
+    Calcula, com NumPy e sem laços por ponto, a distância de cada trecho, a distância
+    acumulada, a velocidade, o tempo em movimento e parado e o ganho de elevação suavizado
+    (quando há altitude). Novos pontos são processados com `append`, aproveitando o estado
+    do último ponto em vez de recalcular todo o percurso. Pontos sem coordenadas válidas não
+    formam trechos: o trecho seguinte parte do último ponto válido. A mesma instância pode ser
+    usada por várias sessões (ver `track_metrics_for`).
+    """
+
+    def __init__(self):
+        self.count = 0
+        self.distance_m = 0.0
+        self.moving_s = 0.0
+        self.stopped_s = 0.0
+        self.elevation_gain_m = 0.0
+        self._last = None
+        self._elevation_tail = np.empty(0)
+        self._last_smoothed = np.nan
+        self._chunks = []
+        self._lock = threading.Lock()
+
+    def append(self, latitudes, longitudes, timestamps, elevations=None):
+        """
+        Processa novos pontos, na ordem em que foram registrados.
+
+        Parâmetros:
+            latitudes (array): Latitudes em graus.
+            longitudes (array): Longitudes em graus.
+            timestamps (array): Horários em segundos desde a época (NaN se desconhecido).
+            elevations (array, opcional): Altitudes em metros (NaN se desconhecida).
+        """
+        lat = np.asarray(latitudes, dtype=np.float64)
+        lon = np.asarray(longitudes, dtype=np.float64)
+        ts = np.asarray(timestamps, dtype=np.float64)
+        ele = np.full(lat.shape, np.nan) if elevations is None else np.asarray(elevations, dtype=np.float64)
+        if lat.size == 0:
+            return
+
+        with self._lock:
+            # Trechos entre pontos válidos consecutivos; o último ponto válido já processado é o
+            # início do primeiro trecho novo
+            positions = np.flatnonzero(np.isfinite(lat) & np.isfinite(lon))
+            all_lat, all_lon, all_ts = lat[positions], lon[positions], ts[positions]
+            if self._last is not None:
+                prev_lat, prev_lon, prev_ts = self._last
+                all_lat = np.concatenate(([prev_lat], all_lat))
+                all_lon = np.concatenate(([prev_lon], all_lon))
+                all_ts = np.concatenate(([prev_ts], all_ts))
+                # O primeiro ponto válido do percurso não tem trecho anterior
+                ends = positions
+            else:
+                ends = positions[1:]
+
+            distance_m = haversine(all_lat[:-1], all_lon[:-1], all_lat[1:], all_lon[1:])
+            elapsed_s = np.diff(all_ts)
+            with np.errstate(divide="ignore", invalid="ignore"):
+                valid_speed = np.where(elapsed_s > 0, distance_m / elapsed_s * 3.6, 0.0)
+            valid_time = np.isfinite(elapsed_s) & (elapsed_s > 0)
+            valid_moving = valid_time & (valid_speed >= MOVING_SPEED_KMH) & (elapsed_s <= MAX_MOVING_GAP_S)
+            stopped = valid_time & ~valid_moving
+
+            # Cada trecho é atribuído ao ponto em que termina; os pontos inválidos ficam com zero
+            segment_m = np.zeros(lat.size)
+            speed_kmh = np.zeros(lat.size)
+            moving = np.zeros(lat.size, dtype=bool)
+            segment_m[ends], speed_kmh[ends], moving[ends] = distance_m, valid_speed, valid_moving
+
+            cumulative_m = self.distance_m + np.cumsum(segment_m)
+            self.moving_s += float(elapsed_s[valid_moving].sum())
+            self.stopped_s += float(elapsed_s[stopped].sum())
+            self.distance_m = float(cumulative_m[-1])
+            self.elevation_gain_m += self._elevation_gain(ele)
+            self.count += lat.size
+            if positions.size:
+                last = positions[-1]
+                self._last = (lat[last], lon[last], ts[last])
+            self._chunks.append((segment_m, cumulative_m, speed_kmh, moving))
+
+    def segments(self):
+        """
+        Retorna as métricas por ponto.
+
+        Retorna:
+            pd.DataFrame: Colunas "trecho_m", "distancia_acumulada_km", "velocidade_kmh" e "em_movimento".
+        """
+        import pandas as pd
+
+        with self._lock:
+            if not self._chunks:
+                return pd.DataFrame(columns=["trecho_m", "distancia_acumulada_km", "velocidade_kmh", "em_movimento"])
+            if len(self._chunks) > 1:
+                # Junta os blocos uma única vez e guarda o resultado para as próximas leituras
+                self._chunks = [tuple(np.concatenate(parts) for parts in zip(*self._chunks))]
+            segment_m, cumulative_m, speed_kmh, moving = self._chunks[0]
+        return pd.DataFrame({
+            "trecho_m": segment_m,
+            "distancia_acumulada_km": cumulative_m / 1000,
+            "velocidade_kmh": speed_kmh,
+            "em_movimento": moving,
+        })
+
+    def summary(self):
+        """
+        Retorna os totais do percurso.
+
+        Retorna:
+            dict: Pontos, distância (km), tempo em movimento e parado (s), velocidade média em
+            movimento (km/h) e ganho de elevação (m).
+        """
+        with self._lock:
+            return {
+                "pontos": self.count,
+                "distancia_km": self.distance_m / 1000,
+                "tempo_em_movimento_s": self.moving_s,
+                "tempo_parado_s": self.stopped_s,
+                "velocidade_media_kmh": self.distance_m / self.moving_s * 3.6 if self.moving_s else 0.0,
+                "ganho_elevacao_m": self.elevation_gain_m,
+            }
+
+    def _elevation_gain(self, ele):
+        # Pontos sem altitude são ignorados; a média móvel continua a partir das últimas altitudes conhecidas
+        known = ele[np.isfinite(ele)]
+        if known.size == 0:
+            return 0.0
+
+        # Média móvel (janela crescente no início do percurso) usando o fim do bloco anterior
+        series = np.concatenate((self._elevation_tail, known))
+        sums = np.concatenate(([0.0], np.cumsum(series)))
+        index = np.arange(series.size)
+        low = np.maximum(0, index - ELEVATION_WINDOW + 1)
+        smoothed = ((sums[index + 1] - sums[low]) / (index + 1 - low))[self._elevation_tail.size:]
+
+        if np.isfinite(self._last_smoothed):
+            smoothed_steps = np.diff(np.concatenate(([self._last_smoothed], smoothed)))
+        else:
+            smoothed_steps = np.diff(smoothed)
+        self._elevation_tail = series[-(ELEVATION_WINDOW - 1):] if ELEVATION_WINDOW > 1 else np.empty(0)
+        self._last_smoothed = smoothed[-1]
+        return float(smoothed_steps[smoothed_steps > 0].sum())
+
+
+def records_to_arrays(records):
+    """
+    Converte registros de `locations` em arrays de latitude, longitude, horário e altitude.
+
+    Parâmetros:
+        records (list): Registros (dicionários) na ordem em que foram registrados.
+
+    Retorna:
+        tuple: Arrays (latitudes, longitudes, timestamps em segundos, altitudes).
+    """
+    # Importado aqui: o índice espacial usa este módulo e não precisa do pandas
+    import pandas as pd
+
+    latitudes = pd.to_numeric(pd.Series([r.get("latitude") for r in records], dtype="object"), errors="coerce")
+    longitudes = pd.to_numeric(pd.Series([r.get("longitude") for r in records], dtype="object"), errors="coerce")
+    timestamps = pd.to_datetime(
+        pd.Series([r.get("timestamp") for r in records], dtype="object"),
+        format="%Y-%m-%d %H:%M:%S", errors="coerce",
+    )
+    elevations = pd.to_numeric(pd.Series([r.get("altitude") for r in records], dtype="object"), errors="coerce")
+    seconds = (timestamps - pd.Timestamp("1970-01-01")).dt.total_seconds()
+    return (
+        latitudes.to_numpy(dtype=np.float64), longitudes.to_numpy(dtype=np.float64),
+        seconds.to_numpy(dtype=np.float64, na_value=np.nan), elevations.to_numpy(dtype=np.float64),
+    )
+
+
+def track_metrics_for(data, name: str = "locations"):
+    """
+    Retorna as métricas do percurso para os registros de localização, com cache incremental.
+
+    As métricas ficam em cache no processo; só os pontos novos são calculados (ver `columnar_store.appended_keys`).
+
+    Parâmetros:
+        data (dict): Registros de `locations`, indexados pelo push key (ordenados pela chave).
+        name (str): Nome do conjunto no cache.
+
+    Retorna:
+        TrackMetrics: As métricas atualizadas.
+    """
+    keys = [key for key, value in (data or {}).items()
+            if isinstance(value, dict) and value.get("latitude") is not None and value.get("longitude") is not None]
+    with _cache_lock:
+        metrics, processed = _cache.get(name, (None, None))
+        new_keys, processed = appended_keys(keys, processed)
+        if new_keys is None:
+            metrics, new_keys = TrackMetrics(), keys
+
+        if new_keys:
+            metrics.append(*records_to_arrays([data[key] for key in new_keys]))
+        _cache[name] = (metrics, processed)
+        return metrics
@@ -0,0 +1,146 @@
+"""
+Captura contínua da localização pelo GPS do navegador, com envio em lotes para `locations`.
+
+O componente (`utils/gps_frontend/index.html`) acompanha a posição com `watchPosition` e
+guarda apenas os pontos que indicam deslocamento (amostragem adaptativa: distância e
+intervalo mínimos, e um ponto a cada `STATIONARY_INTERVAL_S` quando parado). Os pontos ficam
+no navegador até formar um lote, que é devolvido ao Python e gravado com uma única chamada
+a `set_data_batch`. O lote só é descartado no navegador depois que o Python confirma a
+gravação; um lote reenviado (ex.: após recarregar a página) é reconhecido e não é gravado
+de novo.
+"""
+import os
+import threading
+from collections import OrderedDict
+from datetime import datetime
+
+import streamlit as st
+import streamlit.components.v1 as components
+
+from firebase.firebase_utils import set_data_batch
+from utils.geocoding import UNKNOWN_CITY, get_geocoding_service, resolve_cities_later
+from utils.track_import import TIMESTAMP_FORMAT, validate_point
+
+FRONTEND_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "gps_frontend")
+
+# Amostragem no navegador: distância mínima entre pontos em movimento (ou a precisão do GPS, se maior)
+MIN_DISTANCE_M = 25.0
+MIN_INTERVAL_S = 5.0
+# Parado, um ponto a cada intervalo, para registrar as pausas
+STATIONARY_INTERVAL_S = 300.0
+# Leituras com precisão pior que esta são descartadas
+MAX_ACCURACY_M = 100.0
+# Um lote é enviado ao atingir esta quantidade de pontos ou quando o ponto mais antigo atinge o intervalo
+BATCH_SIZE = 20
+FLUSH_INTERVAL_S = 120.0
+# Lotes já gravados lembrados no processo, para reconhecer reenvios
+MAX_SAVED_BATCHES = 1000
+# Lotes confirmados ao navegador a cada execução
+ACKNOWLEDGED_BATCHES = 50
+
+_component = components.declare_component("gps_capture", path=FRONTEND_DIR)
+
+_saved_batches = OrderedDict()
+_saved_lock = threading.Lock()
+
+
+def _to_record(point: dict):
+    # Horário da leitura no navegador (ms desde 1970), no mesmo formato de `set_data`
+    try:
+        timestamp = datetime.fromtimestamp(float(point["timestamp"]) / 1000).strftime(TIMESTAMP_FORMAT)
+    except (KeyError, TypeError, ValueError, OverflowError, OSError):
+        timestamp = None
+    return validate_point({
+        "latitude": point.get("latitude"),
+        "longitude": point.get("longitude"),
+        "altitude": point.get("altitude"),
+        "timestamp": timestamp,
+    })
+
+
+def save_gps_batch(batch: dict):
+    """
+    Grava em `locations` um lote de pontos recebido do componente de captura.
+
+    As cidades já conhecidas no cache de geocodificação são preenchidas na gravação; as
+    demais são resolvidas em segundo plano, em uma única atualização para o lote.
+
+    Parâmetros:
+        batch (dict): O lote, com "lote" (identificador) e "pontos" (latitude, longitude,
+            altitude, precisão e horário em ms de cada leitura).
+
+    Retorna:
+        int: Quantidade de pontos gravados (0 se o lote já havia sido gravado).
+
+    Levanta:
+        RuntimeError: Se houver um erro ao gravar os pontos.
+    """
+    batch_id = batch.get("lote")
+    with _saved_lock:
+        if batch_id in _saved_batches:
+            return 0
+        records = [record for record in map(_to_record, batch.get("pontos") or []) if record is not None]
+        if records:
+            coordinates = [(record["latitude"], record["longitude"]) for record in records]
+            for record, city in zip(records, get_geocoding_service().lookup_many(coordinates)):
+                record["cidade"] = city or UNKNOWN_CITY
+            keys = set_data_batch("locations", records)
+            pending = [
+                (key, coordinate)
+                for key, record, coordinate in zip(keys, records, coordinates)
+                if record["cidade"] == UNKNOWN_CITY
+            ]
+            if pending:
+                resolve_cities_later(*zip(*pending))
+        _saved_batches[batch_id] = len(records)
+        while len(_saved_batches) > MAX_SAVED_BATCHES:
+            _saved_batches.popitem(last=False)
+        return len(records)
+
+
+def _acknowledged():
+    with _saved_lock:
+        return list(_saved_batches)[-ACKNOWLEDGED_BATCHES:]
+
+
+def display_gps_capture(key: str = "gps_capture"):
+    """
+    Exibe o componente de captura contínua do GPS e grava os lotes recebidos.
+
+    Parâmetros:
+        key (str): Chave do componente na página.
+    """
+    if "gps_mensagem" in st.session_state:
+        st.success(st.session_state.pop("gps_mensagem"))
+
+    # Lotes gravados recentemente no processo e os recebidos nesta sessão (inclusive reenvios)
+    session_batches = st.session_state.setdefault("gps_lotes", [])
+    acknowledged = _acknowledged() + session_batches[-ACKNOWLEDGED_BATCHES:]
+    batch = _component(
+        distancia_minima_m=MIN_DISTANCE_M,
+        intervalo_minimo_s=MIN_INTERVAL_S,
+        intervalo_parado_s=STATIONARY_INTERVAL_S,
+        precisao_maxima_m=MAX_ACCURACY_M,
+        tamanho_lote=BATCH_SIZE,
+        intervalo_envio_s=FLUSH_INTERVAL_S,
+        confirmados=acknowledged,
+        key=key,
+        default=None,
+    )
+    st.caption(
+        f"Um ponto a cada {MIN_DISTANCE_M:.0f} m em movimento (ou {STATIONARY_INTERVAL_S / 60:.0f} min parado), "
+        f"enviados em lotes de até {BATCH_SIZE} pontos ou a cada {FLUSH_INTERVAL_S / 60:.0f} min. "
+        "Mantenha esta página aberta durante o percurso."
+    )
+    if not batch or not batch.get("lote") or batch["lote"] in acknowledged:
+        return
+    try:
+        saved = save_gps_batch(batch)
+    except RuntimeError as e:
+        st.error(f"Erro ao gravar as localizações do GPS: {e}")
+        return
+    session_batches.append(batch["lote"])
+    # Reexecuta para confirmar o lote ao navegador e atualizar o mapa
+    if saved:
+        st.session_state.gps_mensagem = f"{saved} localizações recebidas do GPS."
+    st.rerun()
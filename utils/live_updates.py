@@ -0,0 +1,32 @@
+import streamlit as st
+from firebase.firebase_utils import watch_path
+
+# Intervalo, em segundos, entre as verificações de dados novos
+REFRESH_INTERVAL = 2.0
+
+
+def auto_refresh(paths, interval: float = REFRESH_INTERVAL):
+    """
+    Acompanha caminhos por listener e reexecuta a página quando algum deles muda.
+
+    Deve ser chamada antes da leitura dos dados. A verificação compara apenas a versão das
+    visões em memória (sem acessar a rede), e a página só é reexecutada quando há alterações.
+
+    Parâmetros:
+        paths (list): Caminhos no banco de dados exibidos pela página.
+        interval (float): Intervalo, em segundos, entre as verificações.
+    """
+    views = [watch_path(path) for path in paths]
+    # Na primeira carga, espera brevemente pelo conteúdo inicial para não ler o cache e logo reexecutar
+    for view in views:
+        if not view.ready:
+            view.wait_for_change(0, timeout=interval)
+    state_key = "versoes_" + "_".join(paths)
+    st.session_state[state_key] = tuple(view.version for view in views)
+
+    @st.fragment(run_every=interval)
+    def _check_versions():
+        if tuple(view.version for view in views) != st.session_state.get(state_key):
+            st.rerun(scope="app")
+
+    _check_versions()
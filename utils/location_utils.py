@@ -1,33 +1,54 @@
 import streamlit as st
-import folium
-from streamlit_folium import folium_static
-from firebase.firebase_utils import set_data, get_data
+from firebase.firebase_utils import data_revision, set_data, get_data
+from firebase.push_keys import dataset_version
+from utils.map_builder import display_route_map
+from utils.columnar_store import location_store_for
+from utils.track_import import import_track_file
+from utils.gps_capture import display_gps_capture
+from utils.geocoding import UNKNOWN_CITY, get_geocoding_service, resolve_city_later
 import pandas as pd
-import geocoder
-from streamlit.components.v1 import html
 
 def get_route_data():
     """
     Obtém os dados de localização armazenados no banco de dados Firebase.
+
+    Retorna:
+        pd.DataFrame: Colunas "cidade", "latitude" e "longitude" das localizações com coordenadas.
     """
     try:
-        data = get_data("locations")
-        if data:
-            return [{"cidade": loc.get("cidade", "Desconhecida"), 
-                     "latitude": loc.get("latitude"), 
-                     "longitude": loc.get("longitude")} 
-                    for loc in data.values() if loc.get("latitude") and loc.get("longitude")]
-        return []
+        return _route_records(get_data("locations"))
     except Exception as e:
         st.error(f"Erro ao obter os dados de localização: {e}")
-        return []
+        return _route_records(None)
+
+def _route_records(data):
+    """
+    Extrai cidade, latitude e longitude dos registros de localização que possuem coordenadas.
+    """
+    if not data:
+        return pd.DataFrame(columns=["cidade", "latitude", "longitude"])
+    # Visões do armazenamento colunar, sem lista intermediária de dicionários
+    frame = location_store_for(data).to_frame(["cidade", "latitude", "longitude"])
+    latitudes, longitudes = frame["latitude"], frame["longitude"]
+    return frame[latitudes.notna() & longitudes.notna() & (latitudes != 0) & (longitudes != 0)]
 
 def add_location_to_db(location):
     """
     Adiciona uma nova localização no banco de dados Firebase.
+
+    Se a cidade for desconhecida, usa o cache de geocodificação ou agenda a resolução em
+    segundo plano, sem esperar pelo provedor.
     """
     try:
-        set_data("locations", location)
+        city_unknown = location.get("cidade") in (None, "", UNKNOWN_CITY)
+        if city_unknown:
+            cached_city = get_geocoding_service().lookup(location["latitude"], location["longitude"])
+            if cached_city:
+                location = {**location, "cidade": cached_city}
+                city_unknown = False
+        key = set_data("locations", location)
+        if city_unknown:
+            resolve_city_later(key, location["latitude"], location["longitude"])
         st.success(f"Localização {location['cidade']} adicionada com sucesso!")
         st.experimental_rerun() 
     except Exception as e:
@@ -40,22 +61,11 @@ def display_map_page():
     st.header("Mapa do Percurso")
     
     try:
-        locations = get_route_data()
-        if locations:
-            map_data = pd.DataFrame(locations)
-            
-            m = folium.Map(location=[map_data["latitude"].mean(), 
-                                     map_data["longitude"].mean()], 
-                           zoom_start=10)
-            
-            for _, row in map_data.iterrows():
-                folium.Marker(
-                    location=[row["latitude"], row["longitude"]],
-                    popup=f"{row['cidade']} ({row['latitude']:.4f}, {row['longitude']:.4f})",
-                    icon=folium.Icon(color="green", icon="bicycle", prefix="fa")
-                ).add_to(m)
-            
-            folium_static(m)
+        data = get_data("locations")
+        locations = _route_records(data)
+        if not locations.empty:
+            # Mapa em cache, reconstruído apenas quando chegam novas localizações
+            display_route_map(locations, dataset_version(data, data_revision("locations")), route=False)
         else:
             st.info("Nenhuma localização encontrada.")
     except Exception as e:
@@ -64,7 +74,7 @@ def display_map_page():
     st.subheader("Adicionar Nova Localização")
     location_option = st.radio(
         "Escolha como você deseja capturar a localização:",
-        ("Manual", "GPS")
+        ("Manual", "GPS", "Importar arquivo")
     )
 
     if location_option == "Manual":
@@ -83,33 +93,20 @@ def display_map_page():
             else:
                 st.warning("Por favor, preencha todos os campos.")
 
-    elif location_option == "GPS":
-        gps_location = get_gps_location()
-
-        if gps_location:
-            st.write(f"Localização atual via GPS: {gps_location['cidade']} ({gps_location['latitude']:.6f}, {gps_location['longitude']:.6f})")
-            add_location_to_db(gps_location)
+    elif location_option == "Importar arquivo":
+        uploaded_file = st.file_uploader("Arquivo do percurso (GPX, FIT ou CSV)", type=["gpx", "fit", "csv"])
+        if uploaded_file is not None and st.button("Importar Percurso"):
+            try:
+                with st.spinner("Importando pontos..."):
+                    stats = import_track_file(uploaded_file, filename=uploaded_file.name)
+                st.success(
+                    f"{stats['importados']} pontos importados de {stats['lidos']} lidos "
+                    f"({stats['duplicados']} duplicados, {stats['invalidos']} inválidos) "
+                    f"em {stats['segundos']:.1f}s ({stats['pontos_por_segundo']:.0f} pontos/s)."
+                )
+            except Exception as e:
+                st.error(f"Erro ao importar o arquivo: {e}")
 
-def get_gps_location():
-    """
-    Captura a localização via GPS usando JavaScript.
-    """
-    location = None
-    gps_code = """
-    <script>
-        if (navigator.geolocation) {
-            navigator.geolocation.getCurrentPosition(function(position) {
-                var latitude = position.coords.latitude;
-                var longitude = position.coords.longitude;
-                var city = 'Desconhecida';  // Pode usar uma API para obter a cidade com base nas coordenadas
-                var location = {latitude: latitude, longitude: longitude, cidade: city};
-                window.parent.postMessage(location, '*');
-            });
-        } else {
-            alert("Geolocalização não suportada.");
-        }
-    </script>
-    """
-    html(gps_code, height=0)
-
-    return location
+    elif location_option == "GPS":
+        # Captura contínua, com os pontos enviados em lotes (ver `utils.gps_capture`)
+        display_gps_capture()
@@ -0,0 +1,362 @@
+import threading
+from html import escape
+from urllib.parse import quote
+
+import folium
+import numpy as np
+import pandas as pd
+import streamlit as st
+from branca.element import MacroElement
+from folium.plugins import FastMarkerCluster
+from jinja2 import Template
+from streamlit.components.v1 import html
+from streamlit_folium import generate_leaflet_string, st_folium
+from firebase.instrumentation import span, timed
+from utils.track_simplify import track_levels
+
+MAP_WIDTH = 700
+MAP_HEIGHT = 500
+
+# Máximo de marcadores enviados ao navegador para a área visível do mapa
+MAX_VISIBLE_POINTS = 2000
+
+# Marcador de bicicleta criado no navegador para cada linha [latitude, longitude, popup]
+_MARKER_CALLBACK = """
+var callback = function (row) {
+    var icon = L.AwesomeMarkers.icon({icon: 'bicycle', prefix: 'fa', markerColor: 'green'});
+    var marker = L.marker(new L.LatLng(row[0], row[1]), {icon: icon});
+    marker.bindPopup(row[2]);
+    return marker;
+};
+"""
+
+
+class ZoomLevels(MacroElement):
+    """
+    Mostra no mapa apenas a camada do nível de detalhe correspondente ao zoom atual.
+
+    Parâmetros:
+        levels (list): Pares (zoom mínimo, camada folium), em ordem crescente de zoom.
+    """
+
+    _template = Template("""
+        {% macro script(this, kwargs) %}
+            (function () {
+                var map = {{ this._parent.get_name() }};
+                var levels = [
+                    {%- for min_zoom, layer in this.levels %}
+                    {minZoom: {{ min_zoom }}, layer: {{ layer.get_name() }}},
+                    {%- endfor %}
+                ];
+                function update() {
+                    var zoom = map.getZoom();
+                    var current = levels[0];
+                    levels.forEach(function (level) {
+                        if (zoom >= level.minZoom) { current = level; }
+                    });
+                    levels.forEach(function (level) {
+                        if (level === current) { map.addLayer(level.layer); }
+                        else { map.removeLayer(level.layer); }
+                    });
+                }
+                map.on('zoomend', update);
+                update();
+            })();
+        {% endmacro %}
+    """)
+
+    def __init__(self, levels):
+        super().__init__()
+        self._name = "ZoomLevels"
+        self.levels = levels
+
+
+class RemoteGeoJson(MacroElement):
+    """
+    Camada GeoJSON carregada pelo navegador a partir de um endereço, sem embutir os dados no HTML.
+
+    Linhas usam o estilo informado; pontos viram marcadores circulares com a propriedade "popup".
+
+    Parâmetros:
+        url (str): Endereço do arquivo GeoJSON.
+        style (dict, opcional): Estilo das linhas (opções do Leaflet).
+        show (bool): Se True, a camada é adicionada ao mapa; se False, fica a cargo de `ZoomLevels`.
+    """
+
+    _template = Template("""
+        {% macro script(this, kwargs) %}
+            var {{ this.get_name() }} = L.layerGroup();
+            fetch({{ this.url|tojson }})
+                .then(function (response) { return response.json(); })
+                .then(function (data) {
+                    L.geoJSON(data, {
+                        style: {{ this.style|tojson }},
+                        pointToLayer: function (feature, latlng) {
+                            var last = feature.properties && feature.properties.ultima;
+                            return L.circleMarker(latlng, {
+                                radius: last ? 8 : 5, color: last ? 'red' : 'green', fill: true, fillOpacity: 0.8
+                            });
+                        },
+                        onEachFeature: function (feature, layer) {
+                            if (feature.properties && feature.properties.popup) {
+                                layer.bindPopup(feature.properties.popup);
+                            }
+                        }
+                    }).addTo({{ this.get_name() }});
+                });
+            {%- if this.show %}
+            {{ this.get_name() }}.addTo({{ this._parent.get_name() }});
+            {%- endif %}
+        {% endmacro %}
+    """)
+
+    def __init__(self, url: str, style: dict = None, show: bool = True):
+        super().__init__()
+        self._name = "RemoteGeoJson"
+        self.url = url
+        self.style = style or {}
+        self.show = show
+
+
+@timed()
+def build_route_map(map_data, route: bool = True, version: str = None, markers: bool = True):
+    """
+    Cria o mapa do percurso com todas as localizações em uma única camada de clusters.
+
+    Os marcadores são criados no navegador (`FastMarkerCluster`) a partir de uma lista de
+    coordenadas, em vez de um objeto `folium.Marker` por ponto. A linha do percurso é
+    simplificada em vários níveis de detalhe (ver `track_simplify`), e o navegador exibe
+    apenas o nível adequado ao zoom.
+
+    Parâmetros:
+        map_data (pd.DataFrame): Colunas "cidade", "latitude", "longitude" e, opcionalmente, "hora".
+        route (bool): Se True, desenha a linha ligando os pontos.
+        version (str, opcional): Versão do conjunto de dados, usada no cache da simplificação.
+        markers (bool): Se False, o mapa leva apenas a linha do percurso (os marcadores são
+            enviados à parte, ver `display_viewport_map`).
+
+    Retorna:
+        folium.Map: O mapa montado.
+    """
+    latitudes = map_data["latitude"].astype(float)
+    longitudes = map_data["longitude"].astype(float)
+    located = latitudes.notna() & longitudes.notna()
+    if not located.all():
+        # Registros sem coordenadas não entram no mapa
+        map_data, latitudes, longitudes = map_data[located], latitudes[located], longitudes[located]
+    m = folium.Map(location=[latitudes.mean(), longitudes.mean()], zoom_start=10)
+
+    if markers:
+        rows = list(zip(latitudes.tolist(), longitudes.tolist(), _popups(map_data).tolist()))
+        FastMarkerCluster(rows, callback=_MARKER_CALLBACK).add_to(m)
+
+    if route and len(map_data) > 1:
+        lat_values, lon_values = latitudes.to_numpy(), longitudes.to_numpy()
+        levels = []
+        for min_zoom, indices in track_levels(version, lat_values, lon_values):
+            coordinates = np.column_stack((lat_values[indices], lon_values[indices])).tolist()
+            line = folium.PolyLine(coordinates, color="green", weight=2.5, opacity=1)
+            line.add_to(m)
+            levels.append((min_zoom, line))
+        ZoomLevels(levels).add_to(m)
+
+    return m
+
+
+def _popups(map_data):
+    latitudes = map_data["latitude"].astype(float)
+    longitudes = map_data["longitude"].astype(float)
+    popups = map_data["cidade"].astype(str).map(escape)
+    if "hora" in map_data.columns:
+        hours = map_data["hora"]
+        if pd.api.types.is_datetime64_any_dtype(hours):
+            hours = hours.dt.strftime("%Y-%m-%d %H:%M:%S").fillna("Sem horário")
+        popups = popups + "<br>" + hours.astype(str).map(escape)
+    # astype(str) mantém o tipo texto mesmo quando não há pontos selecionados
+    latitudes = latitudes.map("{:.4f}".format).astype(str)
+    longitudes = longitudes.map("{:.4f}".format).astype(str)
+    return popups + "<br>(" + latitudes + ", " + longitudes + ")"
+
+
+@st.cache_data(max_entries=8, show_spinner=False)
+def render_route_map(version: str, _map_data, route: bool = True):
+    """
+    Gera o HTML do mapa do percurso, reaproveitando o resultado enquanto a versão dos dados não mudar.
+
+    Parâmetros:
+        version (str): Versão do conjunto de dados (ver `push_keys.dataset_version`); é a chave do cache.
+        _map_data (pd.DataFrame): Localizações (não entram na chave do cache).
+        route (bool): Se True, desenha a linha ligando os pontos.
+
+    Retorna:
+        str: O HTML completo do mapa.
+    """
+    figure = folium.Figure().add_child(build_route_map(_map_data, route, version))
+    with span("folium_render") as current:
+        rendered = figure.render()
+        current.size = len(rendered)
+    return rendered
+
+
+def display_route_map(map_data, version: str, route: bool = True):
+    """
+    Exibe o mapa do percurso na página, reconstruindo-o apenas quando chegam novas localizações.
+
+    Parâmetros:
+        map_data (pd.DataFrame): Localizações a exibir.
+        version (str): Versão do conjunto de dados (ver `push_keys.dataset_version`).
+        route (bool): Se True, desenha a linha ligando os pontos.
+    """
+    html(render_route_map(version, map_data, route), height=MAP_HEIGHT + 10, width=MAP_WIDTH)
+
+
+@st.cache_data(max_entries=8, show_spinner=False)
+def render_static_route_map(version: str, base_url: str, _manifest):
+    """
+    Gera o HTML do mapa que carrega as camadas pré-geradas do percurso (ver `route_export`).
+
+    O HTML leva apenas os endereços das camadas; o navegador baixa a linha do nível de
+    detalhe do zoom atual e os marcadores diretamente dos arquivos estáticos.
+
+    Parâmetros:
+        version (str): Versão da exportação; é a chave do cache e invalida o cache do navegador.
+        base_url (str): Endereço da pasta das camadas.
+        _manifest (dict): Manifesto da exportação (não entra na chave do cache).
+
+    Retorna:
+        str: O HTML completo do mapa.
+    """
+    suffix = f"?v={quote(version, safe='')}"
+    (south, west), (north, east) = _manifest["limites"]
+    m = folium.Map(location=[(south + north) / 2, (west + east) / 2], zoom_start=10)
+    m.fit_bounds([[south, west], [north, east]])
+
+    levels = []
+    for min_zoom, _, name in _manifest["niveis"]:
+        layer = RemoteGeoJson(
+            f"{base_url}/{name}{suffix}", style={"color": "green", "weight": 2.5, "opacity": 1}, show=False,
+        )
+        layer.add_to(m)
+        levels.append((min_zoom, layer))
+    ZoomLevels(levels).add_to(m)
+    RemoteGeoJson(f"{base_url}/{_manifest['marcadores']}{suffix}").add_to(m)
+    return folium.Figure().add_child(m).render()
+
+
+def display_static_route_map(manifest: dict, base_url: str):
+    """
+    Exibe o mapa do percurso a partir das camadas pré-geradas, sem montar marcadores no Python.
+
+    Parâmetros:
+        manifest (dict): Manifesto da exportação (ver `route_export.export_route`).
+        base_url (str): Endereço da pasta das camadas no navegador.
+    """
+    html(render_static_route_map(manifest["versao"], base_url, manifest), height=MAP_HEIGHT + 10, width=MAP_WIDTH)
+
+
+def visible_points(index, bounds=None, limit: int = MAX_VISIBLE_POINTS):
+    """
+    Seleciona as localizações dentro da área visível do mapa.
+
+    Parâmetros:
+        index (SpatialIndex): Índice espacial das localizações (ver `spatial_index.location_index_for`).
+        bounds (tuple, opcional): Limites (sul, oeste, norte, leste) da área visível; se None, todas as localizações.
+        limit (int): Máximo de pontos; acima dele, os pontos são amostrados de forma uniforme ao longo do percurso.
+
+    Retorna:
+        np.ndarray: Posições das localizações selecionadas, em ordem crescente.
+    """
+    if bounds is None:
+        positions = np.flatnonzero(np.isfinite(index.latitudes) & np.isfinite(index.longitudes))
+    else:
+        positions = index.bbox(*bounds)
+    if positions.size > limit:
+        positions = positions[np.linspace(0, positions.size - 1, limit).astype(np.int64)]
+    return positions
+
+
+@timed()
+def build_marker_layer(selected):
+    """
+    Cria a camada com os marcadores das localizações selecionadas (ver `visible_points`).
+
+    Parâmetros:
+        selected (pd.DataFrame): Localizações a exibir, com as colunas de `build_route_map`.
+
+    Retorna:
+        folium.FeatureGroup: A camada de marcadores.
+    """
+    layer = folium.FeatureGroup(name="Localizações")
+    for latitude, longitude, popup in zip(
+        selected["latitude"].astype(float).tolist(), selected["longitude"].astype(float).tolist(),
+        _popups(selected).tolist(),
+    ):
+        folium.CircleMarker(
+            [latitude, longitude], radius=5, color="green", fill=True, fill_opacity=0.8, popup=popup,
+        ).add_to(layer)
+    return layer
+
+
+@st.cache_resource(max_entries=4, show_spinner=False)
+def _base_route_map(version: str, _map_data):
+    """
+    Mapa base (só a linha do percurso) de uma versão dos dados, compartilhado pelas sessões.
+
+    Retorna o mapa e a trava que protege o seu uso: `st_folium` acrescenta ao mapa a camada de marcadores.
+    """
+    route_map = build_route_map(_map_data, route=True, version=version, markers=False)
+    # A primeira serialização altera a estrutura do mapa; feita aqui, todas as execuções geram o
+    # mesmo script, e o navegador mantém o mapa carregado
+    route_map.get_root().render()
+    generate_leaflet_string(route_map)
+    return route_map, threading.Lock()
+
+
+def display_viewport_map(map_data, version: str, index, key: str = "mapa_percurso"):
+    """
+    Exibe o mapa do percurso enviando ao navegador apenas as localizações da área visível.
+
+    A linha do percurso (simplificada por zoom) forma o mapa base, montado uma vez por versão
+    dos dados; como ele não muda, o navegador não recarrega o mapa, e a cada execução só a
+    camada de marcadores (`feature_group_to_add`) é enviada. Os marcadores são consultados no
+    índice espacial a partir dos limites que o mapa devolve ao mover ou aproximar: o próprio
+    componente reexecuta a página, e os limites já estão na sessão quando ela começa.
+
+    Parâmetros:
+        map_data (pd.DataFrame): Localizações, na mesma ordem das posições do índice.
+        version (str): Versão do conjunto de dados (ver `push_keys.dataset_version`).
+        index (SpatialIndex): Índice espacial das localizações.
+        key (str): Chave do componente do mapa na sessão.
+
+    Retorna:
+        int: Quantidade de localizações enviadas ao mapa.
+    """
+    # Últimos limites devolvidos pelo mapa (gravados na sessão pelo `st_folium` antes da reexecução);
+    # na primeira exibição, todo o percurso
+    bounds = _parse_bounds((st.session_state.get(key) or {}).get("bounds"))
+    positions = visible_points(index, bounds)
+
+    layer = build_marker_layer(map_data.iloc[positions])
+
+    route_map, lock = _base_route_map(version, map_data)
+    # Serialização do mapa e envio ao navegador
+    with span("st_folium"), lock:
+        try:
+            st_folium(
+                route_map, key=key, height=MAP_HEIGHT, width=MAP_WIDTH, returned_objects=["bounds"],
+                feature_group_to_add=layer,
+            )
+        finally:
+            # Retira a camada desta execução do mapa compartilhado
+            route_map._children.pop(layer.get_name(), None)
+    return positions.size
+
+
+def _parse_bounds(bounds):
+    try:
+        south_west, north_east = bounds["_southWest"], bounds["_northEast"]
+        return tuple(round(float(value), 6) for value in (
+            south_west["lat"], south_west["lng"], north_east["lat"], north_east["lng"],
+        ))
+    except (KeyError, TypeError, ValueError):
+        return None
@@ -0,0 +1,340 @@
+"""
+Exportação do percurso em camadas GeoJSON pré-geradas, servidas como arquivos estáticos.
+
+As localizações são divididas em pedaços de `CHUNK_POINTS` pontos, na ordem dos push keys.
+Cada pedaço é simplificado em cada nível de detalhe (ver `track_simplify.LOD_LEVELS`) uma única
+vez; quando chegam novos pontos, só o último pedaço (incompleto) e os novos são refeitos, além
+dos pedaços cujas cidades mudaram (ex.: resolvidas em segundo plano depois da exportação). Os
+arquivos finais são:
+
+- `route_z<zoom>.geojson`: a linha do percurso no nível de detalhe a partir daquele zoom;
+- `marcadores.geojson`: um marcador por chegada em uma cidade e a última localização;
+- `manifest.json`: versão dos dados, limites do mapa e a lista de arquivos.
+
+Com `server.enableStaticServing` (ver `.streamlit/config.toml`), os arquivos em `static/` são
+servidos pelo próprio Streamlit em `app/static/`, e o navegador os carrega diretamente.
+
+Uso pela linha de comando:
+    python -m utils.route_export               # exporta uma vez
+    python -m utils.route_export --watch 60    # exporta a cada 60 s, quando houver pontos novos
+
+Variáveis de ambiente:
+    BIKEPACKING_ROUTE_EXPORT_DIR: Pasta dos arquivos (padrão: static/route).
+    BIKEPACKING_ROUTE_EXPORT_URL: Endereço da pasta no navegador (padrão: app/static/route).
+"""
+import argparse
+import json
+import math
+import os
+import sys
+import tempfile
+import threading
+import time
+import zlib
+from datetime import datetime
+from html import escape
+
+import numpy as np
+
+from firebase.instrumentation import timed
+from firebase.push_keys import dataset_version
+from utils.track_simplify import LOD_LEVELS, simplify_track
+
+EXPORT_DIR = os.getenv("BIKEPACKING_ROUTE_EXPORT_DIR", "static/route")
+EXPORT_URL = os.getenv("BIKEPACKING_ROUTE_EXPORT_URL", "app/static/route")
+# Pontos por pedaço: só o último pedaço é refeito quando chegam novos pontos
+CHUNK_POINTS = 5000
+MANIFEST_NAME = "manifest.json"
+MARKERS_NAME = "marcadores.geojson"
+
+_exporters = {}
+_exporters_lock = threading.Lock()
+
+
+def _write_json(path: str, content):
+    # Gravação atômica: quem lê o arquivo ao mesmo tempo vê a versão anterior ou a nova, nunca uma parte
+    # Nome temporário único, para que processos exportando ao mesmo tempo não se atrapalhem
+    with tempfile.NamedTemporaryFile(
+        "w", encoding="utf-8", dir=os.path.dirname(path) or ".", prefix=".tmp-", suffix=".json", delete=False
+    ) as f:
+        json.dump(content, f, ensure_ascii=False, separators=(",", ":"))
+    try:
+        os.replace(f.name, path)
+    except OSError:
+        os.unlink(f.name)
+        raise
+
+
+def _coordinate(value):
+    try:
+        value = float(value)
+    except (TypeError, ValueError):
+        return None
+    return value if math.isfinite(value) else None
+
+
+class RouteExporter:
+    """
+    Gera e atualiza as camadas pré-geradas do percurso em uma pasta.
+
+    Parâmetros:
+        output_dir (str): Pasta dos arquivos.
+        levels (tuple): Pares (zoom mínimo, tolerância em metros) dos níveis de detalhe.
+        chunk_points (int): Pontos por pedaço.
+    """
+
+    def __init__(self, output_dir: str = EXPORT_DIR, levels=LOD_LEVELS, chunk_points: int = CHUNK_POINTS):
+        self.output_dir = output_dir
+        self.levels = tuple(tuple(level) for level in levels)
+        self.chunk_points = chunk_points
+        self._lock = threading.Lock()
+        # Conteúdo dos pedaços já lidos ou gerados, para não reler os arquivos a cada exportação
+        self._chunks = {}
+
+    def manifest(self):
+        """
+        Retorna o manifesto da última exportação, ou None se ainda não houver uma.
+        """
+        try:
+            with open(os.path.join(self.output_dir, MANIFEST_NAME), "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    @timed("route_export")
+    def export(self, data: dict, revision: int = 0):
+        """
+        Exporta as localizações, refazendo apenas os pedaços alterados.
+
+        Parâmetros:
+            data (dict): Registros de `locations`, indexados pelo push key (ordenados pela chave).
+            revision (int): Revisão dos registros já existentes (ver `firebase_utils.data_revision`).
+
+        Retorna:
+            dict: O manifesto gravado.
+        """
+        with self._lock:
+            version = dataset_version(data, revision)
+            manifest = self.manifest()
+            if manifest is not None and manifest.get("versao") == version:
+                return manifest
+
+            records = [
+                (key, value) for key, value in (data or {}).items()
+                if isinstance(value, dict)
+                and _coordinate(value.get("latitude")) is not None and _coordinate(value.get("longitude")) is not None
+            ]
+            chunks = self._reusable_chunks(manifest, records)
+            os.makedirs(os.path.join(self.output_dir, "pedacos"), exist_ok=True)
+            chunks += [None] * (math.ceil(len(records) / self.chunk_points) - len(chunks))
+            chunks = [chunk or self._build_chunk(index, records) for index, chunk in enumerate(chunks)]
+
+            self._write_layers(chunks, records)
+            manifest = {
+                "versao": version,
+                "gerado_em": datetime.now().isoformat(timespec="seconds"),
+                "pontos": len(records),
+                "ultima_chave": records[-1][0] if records else None,
+                "tamanho_pedaco": self.chunk_points,
+                "niveis": [[min_zoom, tolerance, f"route_z{min_zoom}.geojson"] for min_zoom, tolerance in self.levels],
+                "marcadores": MARKERS_NAME,
+                "limites": _union_bounds([chunk["limites"] for chunk in chunks]),
+                "pedacos": chunks,
+            }
+            # O manifesto é gravado por último: só aponta para camadas já completas
+            _write_json(os.path.join(self.output_dir, MANIFEST_NAME), manifest)
+            return manifest
+
+    def _reusable_chunks(self, manifest, records):
+        """
+        Pedaços completos da exportação anterior (os registros só receberam `push`), com None
+        no lugar dos que precisam ser refeitos porque as cidades dos seus pontos mudaram.
+        """
+        if (
+            manifest is None
+            or manifest.get("tamanho_pedaco") != self.chunk_points
+            or [tuple(level[:2]) for level in manifest.get("niveis", [])] != [tuple(level) for level in self.levels]
+        ):
+            self._chunks.clear()
+            return []
+        previous = manifest.get("pontos", 0)
+        if previous > len(records) or (previous and records[previous - 1][0] != manifest.get("ultima_chave")):
+            self._chunks.clear()
+            return []
+        complete = previous // self.chunk_points
+        return [
+            chunk if chunk.get("cidades") == self._cities_fingerprint(chunk["indice"], records) else None
+            for chunk in manifest.get("pedacos", [])[:complete]
+        ]
+
+    def _cities_fingerprint(self, index: int, records):
+        # Os marcadores de um pedaço dependem das suas cidades e da cidade do ponto anterior
+        start = index * self.chunk_points
+        end = min(start + self.chunk_points, len(records))
+        cities = "\x1f".join(str(records[i][1].get("cidade")) for i in range(max(start - 1, 0), end))
+        return zlib.crc32(cities.encode("utf-8"))
+
+    def _build_chunk(self, index: int, records):
+        """
+        Simplifica um pedaço em cada nível de detalhe e grava o seu arquivo.
+        """
+        start = index * self.chunk_points
+        end = min(start + self.chunk_points, len(records))
+        # O pedaço começa no último ponto do anterior, para que as linhas fiquem ligadas
+        first = max(start - 1, 0)
+        latitudes = np.array([float(records[i][1]["latitude"]) for i in range(first, end)])
+        longitudes = np.array([float(records[i][1]["longitude"]) for i in range(first, end)])
+
+        lines = {}
+        for min_zoom, tolerance in self.levels:
+            kept = simplify_track(latitudes, longitudes, tolerance)
+            lines[str(min_zoom)] = np.column_stack((longitudes[kept], latitudes[kept])).round(6).tolist()
+
+        markers = []
+        previous_city = records[start - 1][1].get("cidade") if start else None
+        for position in range(start, end):
+            record = records[position][1]
+            city = record.get("cidade")
+            if city != previous_city:
+                markers.append(_marker(record))
+            previous_city = city
+
+        content = {"linhas": lines, "marcadores": markers}
+        _write_json(os.path.join(self.output_dir, "pedacos", f"{index:05d}.json"), content)
+        self._chunks[index] = content
+        return {
+            "indice": index,
+            "pontos": end - start,
+            "chave_final": records[end - 1][0],
+            "cidades": self._cities_fingerprint(index, records),
+            "limites": [float(latitudes.min()), float(longitudes.min()), float(latitudes.max()), float(longitudes.max())],
+        }
+
+    def _chunk_content(self, index: int):
+        content = self._chunks.get(index)
+        if content is None:
+            with open(os.path.join(self.output_dir, "pedacos", f"{index:05d}.json"), "r", encoding="utf-8") as f:
+                content = self._chunks[index] = json.load(f)
+        return content
+
+    def _write_layers(self, chunks, records):
+        """
+        Grava uma camada por nível de detalhe e a camada de marcadores, a partir dos pedaços.
+        """
+        contents = [self._chunk_content(chunk["indice"]) for chunk in chunks]
+        for min_zoom, _ in self.levels:
+            features = [
+                {
+                    "type": "Feature",
+                    "properties": {"pedaco": chunk["indice"]},
+                    "geometry": {"type": "LineString", "coordinates": content["linhas"][str(min_zoom)]},
+                }
+                for chunk, content in zip(chunks, contents)
+                if len(content["linhas"][str(min_zoom)]) > 1
+            ]
+            _write_json(
+                os.path.join(self.output_dir, f"route_z{min_zoom}.geojson"),
+                {"type": "FeatureCollection", "features": features},
+            )
+
+        markers = [marker for content in contents for marker in content["marcadores"]]
+        if records:
+            markers.append(_marker(records[-1][1], last=True))
+        _write_json(os.path.join(self.output_dir, MARKERS_NAME), {"type": "FeatureCollection", "features": markers})
+
+
+def _marker(record: dict, last: bool = False):
+    latitude, longitude = float(record["latitude"]), float(record["longitude"])
+    city = str(record.get("cidade") or "Desconhecida")
+    hour = str(record.get("timestamp") or "Sem horário")
+    title = f"<b>Última localização</b><br>{escape(city)}" if last else escape(city)
+    return {
+        "type": "Feature",
+        "properties": {
+            "cidade": city,
+            "hora": hour,
+            "ultima": last,
+            "popup": f"{title}<br>{escape(hour)}<br>({latitude:.4f}, {longitude:.4f})",
+        },
+        "geometry": {"type": "Point", "coordinates": [round(longitude, 6), round(latitude, 6)]},
+    }
+
+
+def _union_bounds(bounds):
+    if not bounds:
+        return None
+    south, west, north, east = zip(*bounds)
+    return [[min(south), min(west)], [max(north), max(east)]]
+
+
+def get_route_exporter(output_dir: str = EXPORT_DIR):
+    """
+    Retorna o exportador da pasta, compartilhado no processo.
+
+    Parâmetros:
+        output_dir (str): Pasta dos arquivos.
+
+    Retorna:
+        RouteExporter: O exportador.
+    """
+    with _exporters_lock:
+        exporter = _exporters.get(output_dir)
+        if exporter is None:
+            exporter = _exporters[output_dir] = RouteExporter(output_dir)
+        return exporter
+
+
+def export_route(data: dict = None, output_dir: str = EXPORT_DIR, revision: int = None):
+    """
+    Exporta as localizações para as camadas pré-geradas (sem efeito se os dados não mudaram).
+
+    Parâmetros:
+        data (dict, opcional): Registros de `locations`; por padrão, lidos com `get_data`.
+        output_dir (str): Pasta dos arquivos.
+        revision (int, opcional): Revisão dos registros; por padrão, a de `data_revision("locations")`.
+
+    Retorna:
+        dict: O manifesto da exportação.
+
+    Levanta:
+        RuntimeError: Se houver um erro ao ler os dados ou gravar os arquivos.
+    """
+    try:
+        from firebase.firebase_utils import data_revision, get_data
+
+        if data is None:
+            data = get_data("locations")
+        if revision is None:
+            revision = data_revision("locations")
+        return get_route_exporter(output_dir).export(data or {}, revision)
+    except RuntimeError:
+        raise
+    except Exception as e:
+        raise RuntimeError(f"Erro ao exportar o percurso: {e}")
+
+
+def main(argv=None):
+    from firebase.firebase_utils import initialize_firebase, sync_data
+    from firebase.client import DATABASE_URL, load_credentials
+
+    parser = argparse.ArgumentParser(description="Exporta o percurso em camadas GeoJSON pré-geradas.")
+    parser.add_argument("--output", default=EXPORT_DIR, help="Pasta dos arquivos.")
+    parser.add_argument("--watch", type=float, help="Repete a exportação a cada N segundos.")
+    parser.add_argument("--credentials", help="Arquivo da conta de serviço (padrão: ver `firebase.client`).")
+    parser.add_argument("--database-url", default=DATABASE_URL)
+    args = parser.parse_args(argv)
+
+    # Com o emulador em memória (BIKEPACKING_BACKEND=memory), não há credenciais a carregar
+    if os.getenv("BIKEPACKING_BACKEND", "firebase") == "firebase":
+        initialize_firebase(load_credentials(args.credentials), args.database_url)
+    while True:
+        # Leitura incremental: só os pontos novos são baixados
+        manifest = export_route(sync_data("locations"), args.output)
+        print(f"{manifest['pontos']} pontos, {len(manifest['pedacos'])} pedaços, versão {manifest['versao']}")
+        if not args.watch:
+            return 0
+        time.sleep(args.watch)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
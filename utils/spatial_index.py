@@ -0,0 +1,303 @@
+import threading
+
+import numpy as np
+
+from utils.columnar_store import appended_keys
+from utils.geodesy import EARTH_RADIUS_M, haversine
+
+# Tamanho das células da grade, em graus (~1,1 km de latitude)
+GRID_CELL_DEG = 0.01
+
+METERS_PER_DEGREE = np.pi * EARTH_RADIUS_M / 180
+
+_cache_lock = threading.Lock()
+_cache = {}
+
+
+class SpatialIndex:
+    """
+    Índice espacial em grade regular sobre arrays NumPy de latitude e longitude.
+
+    Cada célula da grade guarda os índices dos pontos que caem nela, e as consultas
+    (vizinho mais próximo, raio e retângulo) examinam apenas as células próximas, com o
+    cálculo exato das distâncias vetorizado. Novos pontos são incluídos com `add`, sem
+    reconstruir o índice. Pontos sem coordenadas válidas mantêm sua posição, mas não são
+    indexados.
+
+    Parâmetros:
+        cell_size (float): Tamanho das células da grade, em graus.
+    """
+
+    def __init__(self, cell_size: float = GRID_CELL_DEG):
+        self.cell_size = cell_size
+        self.ids = []
+        self._columns = int(np.ceil(360 / cell_size)) + 1
+        self._lat = np.empty(0)
+        self._lon = np.empty(0)
+        self._size = 0
+        self._indexed = 0
+        self._cells = {}
+        # Linhas e colunas extremas das células ocupadas (limitam a busca por anéis)
+        self._extent = None
+        # Identificadores e centros das células ocupadas, calculados sob demanda
+        self._cell_centers = None
+
+    def __len__(self):
+        return self._size
+
+    @property
+    def latitudes(self):
+        return self._lat[:self._size]
+
+    @property
+    def longitudes(self):
+        return self._lon[:self._size]
+
+    def add(self, latitudes, longitudes, ids=None):
+        """
+        Inclui novos pontos no índice.
+
+        Parâmetros:
+            latitudes (array): Latitudes em graus.
+            longitudes (array): Longitudes em graus.
+            ids (list, opcional): Identificadores dos pontos (ex.: push keys); por padrão, a posição do ponto.
+
+        Retorna:
+            np.ndarray: As posições atribuídas aos novos pontos.
+        """
+        lat = np.asarray(latitudes, dtype=np.float64)
+        lon = np.asarray(longitudes, dtype=np.float64)
+        start, end = self._size, self._size + lat.size
+        if end > self._lat.size:
+            # Crescimento geométrico: inclusões frequentes e pequenas não copiam tudo a cada vez
+            capacity = max(end, 2 * self._lat.size, 1024)
+            self._lat = np.concatenate((self._lat[:start], np.empty(capacity - start)))
+            self._lon = np.concatenate((self._lon[:start], np.empty(capacity - start)))
+        self._lat[start:end] = lat
+        self._lon[start:end] = lon
+        self._size = end
+        self.ids.extend(range(start, end) if ids is None else ids)
+
+        positions = np.arange(start, end)
+        valid = np.isfinite(lat) & np.isfinite(lon) & (np.abs(lat) <= 90) & (np.abs(lon) <= 180)
+        if valid.any():
+            cells = self._cell_ids(lat[valid], lon[valid])
+            order = np.argsort(cells, kind="stable")
+            cells, members = cells[order], positions[valid][order]
+            boundaries = np.flatnonzero(np.diff(cells)) + 1
+            for cell, group in zip(cells[np.concatenate(([0], boundaries))].tolist(), np.split(members, boundaries)):
+                current = self._cells.get(cell)
+                self._cells[cell] = group if current is None else np.concatenate((current, group))
+            self._indexed += int(valid.sum())
+            rows, cols = np.divmod(cells, self._columns)
+            extent = (int(rows.min()), int(rows.max()), int(cols.min()), int(cols.max()))
+            if self._extent is not None:
+                extent = (
+                    min(extent[0], self._extent[0]), max(extent[1], self._extent[1]),
+                    min(extent[2], self._extent[2]), max(extent[3], self._extent[3]),
+                )
+            self._extent = extent
+            self._cell_centers = None
+        return positions
+
+    def bbox(self, south: float, west: float, north: float, east: float):
+        """
+        Retorna os pontos dentro de um retângulo (ex.: a área visível do mapa).
+
+        Parâmetros:
+            south, west, north, east (float): Limites do retângulo, em graus.
+
+        Retorna:
+            np.ndarray: Posições dos pontos encontrados, em ordem crescente.
+        """
+        row0, col0 = self._cell(south, west)
+        row1, col1 = self._cell(north, east)
+        if (row1 - row0 + 1) * (col1 - col0 + 1) > len(self._cells):
+            # Retângulo grande (mapa afastado): percorrer todos os pontos de uma vez é mais barato
+            candidates = np.arange(self._size)
+        else:
+            candidates = self._gather(
+                row * self._columns + col for row in range(row0, row1 + 1) for col in range(col0, col1 + 1)
+            )
+        lat, lon = self._lat[candidates], self._lon[candidates]
+        inside = (lat >= south) & (lat <= north) & (lon >= west) & (lon <= east)
+        return np.sort(candidates[inside])
+
+    def radius(self, latitude: float, longitude: float, radius_m: float):
+        """
+        Retorna os pontos a até `radius_m` metros de uma coordenada.
+
+        Parâmetros:
+            latitude, longitude (float): Coordenada de referência, em graus.
+            radius_m (float): Raio em metros.
+
+        Retorna:
+            tuple: Arrays (posições, distâncias em metros), ordenados pela distância.
+        """
+        delta_lat = radius_m / METERS_PER_DEGREE
+        cos_lat = np.cos(np.radians(min(89.9, abs(latitude) + delta_lat)))
+        delta_lon = min(180.0, radius_m / (METERS_PER_DEGREE * cos_lat))
+        candidates = self.bbox(latitude - delta_lat, longitude - delta_lon, latitude + delta_lat, longitude + delta_lon)
+        distances = haversine(latitude, longitude, self._lat[candidates], self._lon[candidates])
+        within = distances <= radius_m
+        candidates, distances = candidates[within], distances[within]
+        order = np.argsort(distances, kind="stable")
+        return candidates[order], distances[order]
+
+    def nearest(self, latitude: float, longitude: float, k: int = 1):
+        """
+        Retorna os `k` pontos mais próximos de uma coordenada.
+
+        A busca percorre anéis de células ao redor da coordenada até que nenhum ponto ainda
+        não examinado possa estar mais perto do que os já encontrados.
+
+        Parâmetros:
+            latitude, longitude (float): Coordenada de referência, em graus.
+            k (int): Quantidade de pontos.
+
+        Retorna:
+            tuple: Arrays (posições, distâncias em metros), ordenados pela distância.
+        """
+        k = min(k, self._indexed)
+        if k <= 0:
+            return np.empty(0, dtype=np.int64), np.empty(0)
+
+        row, col = self._cell(latitude, longitude)
+        best = (np.empty(0, dtype=np.int64), np.empty(0))
+        row_min, row_max, col_min, col_max = self._extent
+        # Anéis que não alcançam nenhuma célula ocupada são pulados
+        ring = max(row_min - row, row - row_max, col_min - col, col - col_max, 0)
+        last_ring = max(row - row_min, row_max - row, col - col_min, col_max - col)
+        budget = len(self._cells) // 2 + 64
+        while ring <= last_ring:
+            if budget <= 0:
+                # Coordenada longe dos pontos: percorrer anéis vazios custaria mais que ordenar as células
+                return self._nearest_by_cells(latitude, longitude, k)
+            cells = self._ring(row, col, ring)
+            budget -= len(cells) + 2 * ring + 1
+            best = self._keep_best(best, self._gather(cells), latitude, longitude, k)
+            if best[1].size == k:
+                # Distância mínima até qualquer célula do próximo anel
+                cos_lat = np.cos(np.radians(min(89.9, abs(latitude) + (ring + 1) * self.cell_size)))
+                if best[1].max() <= ring * self.cell_size * METERS_PER_DEGREE * cos_lat:
+                    break
+            ring += 1
+
+        order = np.argsort(best[1], kind="stable")
+        return best[0][order], best[1][order]
+
+    def _nearest_by_cells(self, latitude, longitude, k):
+        # Examina as células em ordem da menor distância possível até elas, parando quando
+        # nenhuma célula restante pode conter um ponto mais próximo que os k já encontrados
+        if self._cell_centers is None:
+            cell_ids = np.fromiter(self._cells, dtype=np.int64, count=len(self._cells))
+            rows, cols = np.divmod(cell_ids, self._columns)
+            self._cell_centers = (cell_ids, (rows + 0.5) * self.cell_size - 90, (cols + 0.5) * self.cell_size - 180)
+        cell_ids, centers_lat, centers_lon = self._cell_centers
+        half_diagonal = np.sqrt(0.5) * self.cell_size * METERS_PER_DEGREE
+        lower_bounds = np.maximum(haversine(latitude, longitude, centers_lat, centers_lon) - half_diagonal, 0)
+        order = np.argsort(lower_bounds)
+
+        best = (np.empty(0, dtype=np.int64), np.empty(0))
+        for start in range(0, order.size, 16):
+            if best[1].size == k and best[1].max() <= lower_bounds[order[start]]:
+                break
+            chunk = cell_ids[order[start:start + 16]].tolist()
+            best = self._keep_best(best, self._gather(chunk), latitude, longitude, k)
+        ranking = np.argsort(best[1], kind="stable")
+        return best[0][ranking], best[1][ranking]
+
+    def _keep_best(self, best, candidates, latitude, longitude, k):
+        # Mantém apenas os k mais próximos entre os já encontrados e os novos candidatos
+        if candidates.size == 0:
+            return best
+        distances = haversine(latitude, longitude, self._lat[candidates], self._lon[candidates])
+        positions = np.concatenate((best[0], candidates))
+        distances = np.concatenate((best[1], distances))
+        if distances.size > k:
+            keep = np.argpartition(distances, k - 1)[:k]
+            positions, distances = positions[keep], distances[keep]
+        return positions, distances
+
+    def _cell(self, latitude, longitude):
+        row = int(np.floor((np.clip(latitude, -90, 90) + 90) / self.cell_size))
+        col = int(np.floor((np.clip(longitude, -180, 180) + 180) / self.cell_size))
+        return row, col
+
+    def _cell_ids(self, latitudes, longitudes):
+        rows = np.floor((latitudes + 90) / self.cell_size).astype(np.int64)
+        cols = np.floor((longitudes + 180) / self.cell_size).astype(np.int64)
+        return rows * self._columns + cols
+
+    def _ring(self, row, col, ring):
+        # Células do anel à distância `ring` (em células) limitadas à região ocupada
+        row_min, row_max, col_min, col_max = self._extent
+        first_col, last_col = max(col - ring, col_min), min(col + ring, col_max)
+        cells = []
+        for r in range(max(row - ring, row_min), min(row + ring, row_max) + 1):
+            if ring == 0 or abs(r - row) == ring:
+                cells.extend(r * self._columns + c for c in range(first_col, last_col + 1))
+            else:
+                cells.extend(r * self._columns + c for c in (col - ring, col + ring) if col_min <= c <= col_max)
+        return cells
+
+    def _gather(self, cells):
+        groups = [self._cells[cell] for cell in cells if cell in self._cells]
+        if not groups:
+            return np.empty(0, dtype=np.int64)
+        return np.concatenate(groups) if len(groups) > 1 else groups[0]
+
+
+def location_index_for(data, name: str = "locations"):
+    """
+    Retorna o índice espacial dos registros de localização, com atualização incremental.
+
+    O índice fica em cache no processo; só os pontos novos são incluídos (ver `columnar_store.appended_keys`).
+
+    Parâmetros:
+        data (dict): Registros de `locations`, indexados pelo push key (ordenados pela chave).
+        name (str): Nome do conjunto no cache.
+
+    Retorna:
+        SpatialIndex: O índice, cujos `ids` são os push keys.
+    """
+    keys = [key for key, value in (data or {}).items() if isinstance(value, dict)]
+    with _cache_lock:
+        index, processed = _cache.get(name, (None, None))
+        new_keys, processed = appended_keys(keys, processed)
+        if new_keys is None:
+            index, new_keys = SpatialIndex(), keys
+
+        if new_keys:
+            index.add(
+                [_coordinate(data[key].get("latitude")) for key in new_keys],
+                [_coordinate(data[key].get("longitude")) for key in new_keys],
+                new_keys,
+            )
+        _cache[name] = (index, processed)
+        return index
+
+
+def stops_index(stops):
+    """
+    Cria o índice espacial das paradas planejadas que possuem "latitude" e "longitude".
+
+    Parâmetros:
+        stops (list): Paradas, como em `data/stops_data.json`.
+
+    Retorna:
+        SpatialIndex: O índice, cujos `ids` são as posições das paradas na lista.
+    """
+    index = SpatialIndex()
+    index.add(
+        [_coordinate(stop.get("latitude")) for stop in stops],
+        [_coordinate(stop.get("longitude")) for stop in stops],
+    )
+    return index
+
+
+def _coordinate(value):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return np.nan
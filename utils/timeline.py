@@ -0,0 +1,244 @@
+"""
+Linha do tempo das localizações, agrupada por dia e cidade e exibida em páginas.
+
+Os grupos são trechos consecutivos de localizações no mesmo dia e na mesma cidade. O índice
+dos grupos (`TimelineIndex`) guarda apenas a posição do primeiro registro de cada grupo no
+armazenamento colunar (ver `utils.columnar_store`) e é atualizado de forma incremental: quando
+chegam novas localizações, só elas são comparadas com a anterior. Cada página monta as linhas
+a partir de uma fatia das colunas, de modo que o tempo de exibição depende do tamanho da
+página, não da duração da viagem.
+"""
+import threading
+
+import numpy as np
+import streamlit as st
+
+from utils.columnar_store import MISSING_EPOCH
+
+# Localizações exibidas por página da linha do tempo
+ROWS_PER_PAGE = 100
+SECONDS_PER_DAY = 86_400
+ORDERS = ["Mais antigas primeiro", "Mais recentes primeiro"]
+
+_cache = {}
+_cache_lock = threading.Lock()
+
+
+def _day_keys(epochs):
+    # Dia (desde 1970) de cada horário; horários ausentes ficam juntos em um dia próprio
+    return np.where(epochs == MISSING_EPOCH, MISSING_EPOCH, epochs // SECONDS_PER_DAY)
+
+
+class TimelineIndex:
+    """
+    Grupos da linha do tempo (mesmo dia e mesma cidade) de um armazenamento de localizações.
+    """
+
+    def __init__(self):
+        self.starts = np.empty(0, dtype=np.int64)
+        self.size = 0
+        self._store = None
+        self._revision = None
+
+    def __len__(self):
+        return self.starts.size
+
+    def update(self, store):
+        """
+        Inclui as localizações novas do armazenamento.
+
+        Tudo é recalculado se o armazenamento foi recriado ou se registros já incluídos mudaram
+        (ex.: cidades resolvidas em segundo plano, ver `ColumnarStore.refresh_text`).
+
+        Parâmetros:
+            store (ColumnarStore): Armazenamento com as colunas "timestamp" e "cidade".
+        """
+        if store is not self._store or store.revision != self._revision or len(store) < self.size:
+            self.starts = np.empty(0, dtype=np.int64)
+            self.size = 0
+        self._store, self._revision = store, store.revision
+        total = len(store)
+        if total == self.size:
+            return
+
+        # Começa no último registro já processado, para comparar o primeiro novo com ele
+        first = max(self.size - 1, 0)
+        days = _day_keys(store.column("timestamp")[first:total])
+        cities = store.column("cidade")[first:total]
+        changes = np.flatnonzero((days[1:] != days[:-1]) | (cities[1:] != cities[:-1])) + first + 1
+        if self.size == 0:
+            changes = np.concatenate(([0], changes))
+        self.starts = np.concatenate((self.starts, changes))
+        self.size = total
+
+    def ends(self):
+        """
+        Retorna a posição seguinte ao último registro de cada grupo.
+        """
+        return np.append(self.starts[1:], self.size)
+
+    def days(self):
+        """
+        Retorna os dias distintos dos grupos, em ordem de aparição, e a posição do primeiro registro de cada um.
+
+        Retorna:
+            tuple: Os dias (datetime64[D], NaT para horários ausentes) e as posições (int64).
+        """
+        keys = _day_keys(self._store.column("timestamp")[self.starts])
+        _, first = np.unique(keys, return_index=True)
+        first.sort()
+        return keys[first].astype("datetime64[D]"), self.starts[first]
+
+    def segments(self, start: int, end: int):
+        """
+        Divide um intervalo de registros pelos grupos que ele atravessa.
+
+        Parâmetros:
+            start (int): Primeiro registro.
+            end (int): Posição seguinte ao último registro.
+
+        Retorna:
+            list: Tuplas (grupo, início, fim) em ordem crescente.
+        """
+        first = int(np.searchsorted(self.starts, start, side="right")) - 1
+        last = int(np.searchsorted(self.starts, end, side="left"))
+        ends = self.ends()
+        return [
+            (group, max(start, int(self.starts[group])), min(end, int(ends[group])))
+            for group in range(max(first, 0), last)
+        ]
+
+
+def timeline_index_for(store, name: str = "locations"):
+    """
+    Retorna o índice da linha do tempo do armazenamento, com atualização incremental.
+
+    Parâmetros:
+        store (ColumnarStore): Armazenamento das localizações (ver `location_store_for`).
+        name (str): Nome do conjunto no cache.
+
+    Retorna:
+        TimelineIndex: O índice atualizado.
+    """
+    with _cache_lock:
+        index = _cache.get(name)
+        if index is None:
+            index = _cache[name] = TimelineIndex()
+        index.update(store)
+        return index
+
+
+def _format_times(epochs, unit: str):
+    text = np.datetime_as_string(epochs.view("datetime64[s]"), unit=unit).astype(object)
+    text[epochs == MISSING_EPOCH] = None
+    return text
+
+
+def _escape(text: str):
+    # Textos vindos do banco dentro de tabelas Markdown
+    return str(text).replace("\\", "\\\\").replace("|", "\\|").replace("*", "\\*").replace("#", "\\#")
+
+
+def timeline_markdown(store, index: TimelineIndex, start: int, end: int, newest_first: bool = False):
+    """
+    Monta o Markdown de uma página da linha do tempo: um título por grupo e uma tabela com as localizações.
+
+    Parâmetros:
+        store (ColumnarStore): Armazenamento das localizações.
+        index (TimelineIndex): Índice dos grupos do armazenamento.
+        start (int): Primeiro registro da página.
+        end (int): Posição seguinte ao último registro da página.
+        newest_first (bool): Se True, exibe os grupos e as localizações do mais recente para o mais antigo.
+
+    Retorna:
+        str: O Markdown da página.
+    """
+    epochs = store.column("timestamp")
+    latitudes = store.column("latitude")[start:end]
+    longitudes = store.column("longitude")[start:end]
+    hours = _format_times(epochs[start:end], "s")
+    cities = store.categories("cidade")
+    codes = store.column("cidade")
+
+    segments = index.segments(start, end)
+    group_ends = index.ends()
+    if newest_first:
+        segments.reverse()
+    blocks = []
+    for group, first, last in segments:
+        group_start, group_end = int(index.starts[group]), int(group_ends[group])
+        code = codes[group_start]
+        city = cities[code] if code >= 0 else "Desconhecida"
+        day = _format_times(epochs[group_start:group_start + 1], "D")[0]
+        title = f"### {_escape(city)}"
+        if day is not None:
+            title += f" — {day[8:10]}/{day[5:7]}/{day[:4]}"
+        # O grupo começou antes desta janela, na ordem exibida
+        if (last < group_end) if newest_first else (first > group_start):
+            title += " (continuação)"
+        count = group_end - group_start
+        summary = f"{count} localização" if count == 1 else f"{count} localizações"
+        limits = _format_times(epochs[[group_start, group_end - 1]], "s")
+        if limits[0] is not None and limits[1] is not None:
+            summary += f", das {limits[0][11:16]} às {limits[1][11:16]}"
+
+        positions = range(first - start, last - start)
+        if newest_first:
+            positions = reversed(positions)
+        rows = [
+            f"| {'Sem horário' if hours[i] is None else hours[i].replace('T', ' ')} "
+            f"| ({latitudes[i]:.4f}, {longitudes[i]:.4f}) |"
+            for i in positions
+        ]
+        blocks.append("\n".join([title, f"*{summary}*", "", "| Hora | Coordenadas |", "|---|---|", *rows]))
+    return "\n\n".join(blocks)
+
+
+def display_timeline(store, name: str = "locations", rows_per_page: int = ROWS_PER_PAGE):
+    """
+    Exibe a linha do tempo das localizações em janelas, com navegação e atalho para um dia.
+
+    Cada janela é um único elemento Markdown com até `rows_per_page` localizações, qualquer
+    que seja o tamanho da viagem.
+
+    Parâmetros:
+        store (ColumnarStore): Armazenamento das localizações (ver `location_store_for`).
+        name (str): Nome do conjunto no cache do índice.
+        rows_per_page (int): Localizações por página.
+    """
+    index = timeline_index_for(store, name)
+    total = index.size
+    if not total:
+        st.write("Nenhuma localização registrada ainda.")
+        return
+
+    col_order, col_day = st.columns(2)
+    newest_first = col_order.radio("Ordem", ORDERS, horizontal=True, key="linha_do_tempo_ordem") == ORDERS[1]
+    days, day_starts = index.days()
+    labels = ["—"] + ["Sem horário" if np.isnat(day) else day.item().strftime("%d/%m/%Y") for day in days]
+    chosen = col_day.selectbox("Ir para o dia", range(len(labels)), format_func=labels.__getitem__)
+
+    # Posição (na ordem exibida) da primeira localização da janela; vai para o dia escolhido
+    # quando a escolha ou a ordem muda
+    state = st.session_state
+    if state.get("linha_do_tempo_filtro") != (chosen, newest_first):
+        state.linha_do_tempo_filtro = (chosen, newest_first)
+        state.linha_do_tempo_inicio = 0
+        if chosen:
+            day_end = int(day_starts[chosen]) if chosen < len(day_starts) else total
+            state.linha_do_tempo_inicio = total - day_end if newest_first else int(day_starts[chosen - 1])
+    first = min(state.get("linha_do_tempo_inicio", 0), total - 1)
+    last = min(first + rows_per_page, total)
+
+    # Posições exibidas convertidas para as posições no armazenamento
+    start, end = (total - last, total - first) if newest_first else (first, last)
+    st.markdown(timeline_markdown(store, index, start, end, newest_first))
+
+    col_previous, col_page, col_next = st.columns([1, 2, 1])
+    if col_previous.button("Anterior", key="linha_do_tempo_anterior", disabled=first == 0):
+        state.linha_do_tempo_inicio = max(first - rows_per_page, 0)
+        st.rerun()
+    col_page.caption(f"Localizações {first + 1}–{last} de {total} · {len(index)} trechos")
+    if col_next.button("Próxima", key="linha_do_tempo_proxima", disabled=last >= total):
+        state.linha_do_tempo_inicio = last
+        st.rerun()
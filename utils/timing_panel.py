@@ -0,0 +1,70 @@
+import os
+import streamlit as st
+from firebase.instrumentation import begin_run, end_run, export_jsonl, get_recorder, prometheus_text
+
+# Painel de tempos na barra lateral, para administração e diagnóstico ("1" para exibir)
+TIMING_PANEL = os.getenv("BIKEPACKING_TIMING_PANEL", "") == "1"
+
+def begin_page(page: str):
+    """
+    Inicia a medição da execução da página; deve ser chamada no início do script da página.
+
+    A execução anterior da sessão que não chegou a `display_timing_panel` (interrompida por
+    `st.rerun` ou `st.stop`) é concluída aqui. Os tamanhos dos dados só são medidos com o
+    painel habilitado.
+
+    Parâmetros:
+        page (str): Nome da página, usado nos relatórios.
+    """
+    previous = st.session_state.get("tempos_execucao")
+    if previous is not None:
+        get_recorder().finish(previous, interrupted=True)
+    st.session_state["tempos_execucao"] = begin_run(page, sizes=TIMING_PANEL)
+
+def display_timing_panel():
+    """
+    Conclui a medição da execução e, se habilitado (`BIKEPACKING_TIMING_PANEL=1`), exibe na
+    barra lateral o tempo de cada etapa desta execução e os botões de exportação.
+
+    Deve ser chamada no fim do script da página (ver `begin_page`).
+    """
+    run = end_run()
+    if not TIMING_PANEL or run is None:
+        return
+    # Importado aqui: o pandas só é carregado quando o painel está habilitado
+    import pandas as pd
+
+    with st.sidebar.expander("⏱️ Tempos desta execução", expanded=False):
+        spans = sorted(run.spans, key=lambda span: span.started)
+        rows = [
+            {
+                "Etapa": "· " * span.depth + span.name
+                         + (f" ({span.attributes['caminho']})" if span.attributes.get("caminho") else ""),
+                "ms": round(span.duration * 1000, 1),
+                "KiB": round(span.size / 1024, 1) if span.size is not None else None,
+            }
+            for span in spans
+        ]
+        if rows:
+            st.dataframe(pd.DataFrame(rows), hide_index=True, use_container_width=True)
+        # O que não está em nenhuma etapa é, em geral, a montagem dos elementos do Streamlit
+        other = max(run.duration - run.measured, 0.0)
+        st.caption(
+            f"Total: {run.duration * 1000:.0f} ms; fora das etapas medidas "
+            f"(Streamlit e demais): {other * 1000:.0f} ms."
+        )
+
+        stats = get_recorder().stats()
+        if stats:
+            st.markdown("**Agregados do processo**")
+            st.dataframe(
+                pd.DataFrame(stats)[["nome", "caminho", "quantidade", "medio_ms", "maximo_ms"]].round(1),
+                hide_index=True, use_container_width=True,
+            )
+        col_json, col_prometheus = st.columns(2)
+        col_json.download_button(
+            "JSON lines", export_jsonl(), file_name="execucoes.jsonl", mime="application/jsonl",
+        )
+        col_prometheus.download_button(
+            "Prometheus", prometheus_text(), file_name="metricas.prom", mime="text/plain",
+        )
@@ -0,0 +1,428 @@
+"""
+Importação em massa de percursos (GPX, FIT ou CSV) para `locations`.
+
+Os arquivos são lidos como fluxo, ponto a ponto, sem carregar o arquivo inteiro na memória;
+os pontos válidos e inéditos são gravados em lotes pela fila de escrita (`set_data_batch`).
+Os horários são gravados na hora local, como em `set_data`, e cada ponto recebe o push key do
+seu horário, para ficar na posição cronológica entre as localizações já registradas.
+
+Uso pela linha de comando:
+    python -m utils.track_import percurso.gpx [--format gpx|fit|csv] [--chunk-size 500]
+"""
+import argparse
+import csv
+import io
+import math
+import os
+import struct
+import sys
+import time
+import xml.etree.ElementTree as ET
+from datetime import datetime
+
+from firebase.firebase_utils import set_data_batch, get_data
+from firebase.push_keys import push_keys_for_times
+
+TIMESTAMP_FORMAT = "%Y-%m-%d %H:%M:%S"
+DEFAULT_CHUNK_SIZE = 500
+
+# Época dos arquivos FIT (1989-12-31 00:00:00 UTC) em segundos Unix
+FIT_EPOCH = 631065600
+FIT_RECORD_MESSAGE = 20
+_SEMICIRCLE_TO_DEGREES = 180.0 / 2 ** 31
+
+# Tipos básicos do FIT: (formato struct, valor inválido)
+_FIT_BASE_TYPES = {
+    0x83: ("h", 0x7FFF), 0x84: ("H", 0xFFFF),
+    0x85: ("i", 0x7FFFFFFF), 0x86: ("I", 0xFFFFFFFF),
+}
+
+# Nomes de coluna aceitos nos arquivos CSV
+_CSV_COLUMNS = {
+    "latitude": ("latitude", "lat"),
+    "longitude": ("longitude", "lon", "lng", "long"),
+    "altitude": ("altitude", "ele", "elevation", "elevacao"),
+    "timestamp": ("timestamp", "time", "data e hora", "datetime"),
+    "cidade": ("cidade", "city"),
+}
+
+
+def iter_gpx_points(fileobj):
+    """
+    Lê os pontos de um arquivo GPX (trkpt e rtept) como um gerador.
+
+    Cada ponto é descartado da árvore XML logo após ser lido, mantendo a memória constante
+    mesmo para arquivos grandes.
+
+    Parâmetros:
+        fileobj: Arquivo aberto em modo binário.
+
+    Retorna:
+        generator: Dicionários com "latitude", "longitude" e, quando presentes, "altitude" e "timestamp" (hora local).
+    """
+    parents = []
+    for event, elem in ET.iterparse(fileobj, events=("start", "end")):
+        if event == "start":
+            parents.append(elem)
+            continue
+
+        parents.pop()
+        tag = elem.tag
+        if tag.endswith("trkpt") or tag.endswith("rtept"):
+            point = {"latitude": elem.get("lat"), "longitude": elem.get("lon")}
+            for child in elem:
+                child_tag = child.tag
+                if child_tag.endswith("ele") and _local_name(child_tag) == "ele":
+                    point["altitude"] = child.text
+                elif child_tag.endswith("time") and _local_name(child_tag) == "time":
+                    point["timestamp"] = _parse_time(child.text)
+            yield point
+
+            # Remove o ponto já lido da árvore para não acumular memória
+            elem.clear()
+            if parents:
+                parents[-1].remove(elem)
+
+
+def iter_csv_points(fileobj):
+    """
+    Lê os pontos de um arquivo CSV com cabeçalho como um gerador.
+
+    Aceita colunas como "latitude"/"lat", "longitude"/"lon", "altitude"/"ele" e "timestamp"/"time".
+
+    Parâmetros:
+        fileobj: Arquivo aberto em modo binário.
+
+    Retorna:
+        generator: Dicionários com os campos reconhecidos.
+    """
+    reader = csv.DictReader(io.TextIOWrapper(fileobj, encoding="utf-8-sig", newline=""))
+    header = {name.strip().lower(): name for name in reader.fieldnames or []}
+    columns = {}
+    for field, aliases in _CSV_COLUMNS.items():
+        for alias in aliases:
+            if alias in header:
+                columns[field] = header[alias]
+                break
+
+    for row in reader:
+        point = {field: row.get(column) for field, column in columns.items()}
+        if point.get("timestamp"):
+            point["timestamp"] = _parse_time(point["timestamp"])
+        yield point
+
+
+def iter_fit_points(fileobj):
+    """
+    Lê as mensagens "record" (posição, altitude e horário) de um arquivo FIT como um gerador.
+
+    Implementa a leitura do protocolo FIT diretamente (definições, mensagens de dados e
+    cabeçalhos com timestamp comprimido), lendo o arquivo sequencialmente.
+
+    Parâmetros:
+        fileobj: Arquivo aberto em modo binário.
+
+    Retorna:
+        generator: Dicionários com "latitude", "longitude" e, quando presentes, "altitude" e "timestamp" (hora local).
+
+    Levanta:
+        ValueError: Se o arquivo não for um FIT válido.
+    """
+    header_size = _read_exact(fileobj, 1)[0]
+    header = _read_exact(fileobj, header_size - 1)
+    if header[7:11] != b".FIT":
+        raise ValueError("Arquivo FIT inválido.")
+    data_size = struct.unpack("<I", header[3:7])[0]
+
+    definitions = {}
+    last_timestamp = None
+    consumed = 0
+    while consumed < data_size:
+        record_header = _read_exact(fileobj, 1)[0]
+        consumed += 1
+
+        if record_header & 0x80:
+            # Cabeçalho comprimido: mensagem de dados com deslocamento de 5 bits no horário
+            local_type = (record_header >> 5) & 0x03
+            offset = record_header & 0x1F
+            if last_timestamp is not None:
+                last_timestamp += (offset - last_timestamp) & 0x1F
+            compressed_timestamp = last_timestamp
+        elif record_header & 0x40:
+            local_type = record_header & 0x0F
+            fixed = _read_exact(fileobj, 5)
+            endian = ">" if fixed[1] == 1 else "<"
+            global_number = struct.unpack(endian + "H", fixed[2:4])[0]
+            fields = []
+            for _ in range(fixed[4]):
+                number, size, base_type = _read_exact(fileobj, 3)
+                fields.append((number, size, base_type))
+            consumed += 5 + 3 * fixed[4]
+            developer_size = 0
+            if record_header & 0x20:
+                developer_count = _read_exact(fileobj, 1)[0]
+                developer_fields = _read_exact(fileobj, 3 * developer_count)
+                developer_size = sum(developer_fields[i + 1] for i in range(0, len(developer_fields), 3))
+                consumed += 1 + 3 * developer_count
+            definitions[local_type] = (endian, global_number, fields, developer_size)
+            continue
+        else:
+            local_type = record_header & 0x0F
+            compressed_timestamp = None
+
+        if local_type not in definitions:
+            raise ValueError("Arquivo FIT inválido: mensagem sem definição.")
+        endian, global_number, fields, developer_size = definitions[local_type]
+        values = {}
+        for number, size, base_type in fields:
+            raw = _read_exact(fileobj, size)
+            fmt = _FIT_BASE_TYPES.get(base_type)
+            if fmt and struct.calcsize(fmt[0]) == size:
+                value = struct.unpack(endian + fmt[0], raw)[0]
+                if value != fmt[1]:
+                    values[number] = value
+        _read_exact(fileobj, developer_size)
+        consumed += sum(size for _, size, _ in fields) + developer_size
+
+        if 253 in values:
+            last_timestamp = values[253]
+        if global_number != FIT_RECORD_MESSAGE or 0 not in values or 1 not in values:
+            continue
+
+        point = {
+            "latitude": values[0] * _SEMICIRCLE_TO_DEGREES,
+            "longitude": values[1] * _SEMICIRCLE_TO_DEGREES,
+        }
+        altitude = values.get(78, values.get(2))
+        if altitude is not None:
+            point["altitude"] = altitude / 5 - 500
+        timestamp = values.get(253, compressed_timestamp)
+        if timestamp is not None:
+            point["timestamp"] = datetime.fromtimestamp(FIT_EPOCH + timestamp).strftime(TIMESTAMP_FORMAT)
+        yield point
+
+
+def iter_points(fileobj, file_format: str = None, filename: str = None):
+    """
+    Lê os pontos de um arquivo de percurso, detectando o formato pela extensão ou pelo conteúdo.
+
+    Parâmetros:
+        fileobj: Arquivo aberto em modo binário.
+        file_format (str, opcional): "gpx", "fit" ou "csv".
+        filename (str, opcional): Nome do arquivo, usado para detectar o formato pela extensão.
+
+    Retorna:
+        generator: Pontos lidos do arquivo.
+    """
+    file_format = (file_format or detect_format(fileobj, filename)).lower()
+    readers = {"gpx": iter_gpx_points, "fit": iter_fit_points, "csv": iter_csv_points}
+    if file_format not in readers:
+        raise ValueError(f"Formato de arquivo não suportado: {file_format}")
+    return readers[file_format](fileobj)
+
+
+def detect_format(fileobj, filename: str = None):
+    """
+    Detecta o formato de um arquivo de percurso pela extensão ou, se necessário, pelos primeiros bytes.
+    """
+    extension = os.path.splitext(filename or "")[1].lower().lstrip(".")
+    if extension in ("gpx", "fit", "csv"):
+        return extension
+    if hasattr(fileobj, "peek"):
+        head = fileobj.peek(64)[:64]
+    elif fileobj.seekable():
+        position = fileobj.tell()
+        head = fileobj.read(64)
+        fileobj.seek(position)
+    else:
+        head = b""
+    if head[8:12] == b".FIT":
+        return "fit"
+    if head.lstrip().startswith(b"<"):
+        return "gpx"
+    return "csv"
+
+
+def validate_point(point: dict):
+    """
+    Valida e normaliza um ponto importado.
+
+    Parâmetros:
+        point (dict): Ponto lido do arquivo.
+
+    Retorna:
+        dict: O ponto no formato de `locations`, ou None se as coordenadas forem inválidas.
+    """
+    try:
+        latitude = float(point.get("latitude"))
+        longitude = float(point.get("longitude"))
+    except (TypeError, ValueError):
+        return None
+    if not (math.isfinite(latitude) and math.isfinite(longitude)):
+        return None
+    if not (-90 <= latitude <= 90 and -180 <= longitude <= 180) or (latitude == 0 and longitude == 0):
+        return None
+
+    record = {
+        "cidade": point.get("cidade") or "Desconhecida",
+        "latitude": latitude,
+        "longitude": longitude,
+    }
+    try:
+        altitude = float(point.get("altitude"))
+        if math.isfinite(altitude):
+            record["altitude"] = altitude
+    except (TypeError, ValueError):
+        pass
+    if point.get("timestamp"):
+        record["timestamp"] = point["timestamp"]
+    return record
+
+
+def point_fingerprint(record: dict):
+    """
+    Identifica um ponto pelo horário e pelas coordenadas (arredondadas a ~10 cm), para detectar duplicatas.
+    """
+    return hash((record.get("timestamp"), round(record["latitude"], 6), round(record["longitude"], 6)))
+
+
+def record_keys(records):
+    """
+    Gera os push keys de registros a partir dos seus horários (o horário atual, para os que não têm).
+
+    Parâmetros:
+        records (list): Registros no formato de `locations`.
+
+    Retorna:
+        list: Os push keys, na ordem dos registros.
+    """
+    now = time.time() * 1000
+    times = []
+    for record in records:
+        try:
+            times.append(datetime.strptime(record["timestamp"], TIMESTAMP_FORMAT).timestamp() * 1000)
+        except (KeyError, TypeError, ValueError):
+            times.append(now)
+    return push_keys_for_times(times)
+
+
+def import_points(points, chunk_size: int = DEFAULT_CHUNK_SIZE, existing=None, write_batch=None):
+    """
+    Valida, remove duplicatas e grava pontos em `locations` em lotes.
+
+    Parâmetros:
+        points (iterable): Pontos lidos do arquivo (ver `iter_points`).
+        chunk_size (int): Quantidade de pontos por lote gravado.
+        existing (dict, opcional): Registros já existentes em `locations`, para não importá-los de novo.
+        write_batch (callable, opcional): Função que grava uma lista de registros; padrão: `set_data_batch`
+            em "locations", com os push keys dos horários dos pontos (ver `record_keys`).
+
+    Retorna:
+        dict: Pontos lidos, importados, inválidos e duplicados, duração (s) e pontos por segundo.
+    """
+    write_batch = write_batch or (lambda records: set_data_batch("locations", records, record_keys(records)))
+    seen = {point_fingerprint(record) for record in (existing or {}).values()
+            if isinstance(record, dict) and validate_point(record)}
+
+    stats = {"lidos": 0, "importados": 0, "invalidos": 0, "duplicados": 0}
+    start = time.perf_counter()
+    chunk = []
+    for point in points:
+        stats["lidos"] += 1
+        record = validate_point(point)
+        if record is None:
+            stats["invalidos"] += 1
+            continue
+        fingerprint = point_fingerprint(record)
+        if fingerprint in seen:
+            stats["duplicados"] += 1
+            continue
+        seen.add(fingerprint)
+        chunk.append(record)
+        if len(chunk) >= chunk_size:
+            write_batch(chunk)
+            stats["importados"] += len(chunk)
+            chunk = []
+    if chunk:
+        write_batch(chunk)
+        stats["importados"] += len(chunk)
+
+    stats["segundos"] = time.perf_counter() - start
+    stats["pontos_por_segundo"] = stats["lidos"] / stats["segundos"] if stats["segundos"] else 0.0
+    return stats
+
+
+def import_track_file(fileobj, filename: str = None, file_format: str = None, chunk_size: int = DEFAULT_CHUNK_SIZE):
+    """
+    Importa um arquivo de percurso para `locations`, ignorando pontos já registrados.
+
+    Parâmetros:
+        fileobj: Arquivo aberto em modo binário (ou o arquivo enviado pelo `st.file_uploader`).
+        filename (str, opcional): Nome do arquivo, usado para detectar o formato.
+        file_format (str, opcional): "gpx", "fit" ou "csv".
+        chunk_size (int): Quantidade de pontos por lote gravado.
+
+    Retorna:
+        dict: Estatísticas da importação (ver `import_points`).
+    """
+    points = iter_points(fileobj, file_format, filename)
+    return import_points(points, chunk_size=chunk_size, existing=get_data("locations"))
+
+
+def _local_name(tag):
+    return tag.rsplit("}", 1)[-1]
+
+
+def _parse_time(value):
+    # Horários com fuso são convertidos para a hora local, a mesma de `set_data`; sem fuso, já são locais
+    try:
+        parsed = datetime.fromisoformat(value.strip())
+    except (AttributeError, ValueError):
+        return None
+    if parsed.tzinfo is not None:
+        parsed = parsed.astimezone().replace(tzinfo=None)
+    return parsed.strftime(TIMESTAMP_FORMAT)
+
+
+def _read_exact(fileobj, size: int):
+    data = fileobj.read(size)
+    if len(data) != size:
+        raise ValueError("Arquivo FIT truncado.")
+    return data
+
+
+def main(argv=None):
+    from firebase.firebase_utils import configure_outbox, initialize_firebase, get_outbox, outbox_path_for
+    from firebase.client import DATABASE_URL, load_credentials
+
+    parser = argparse.ArgumentParser(description="Importa um percurso GPX, FIT ou CSV para 'locations'.")
+    parser.add_argument("file")
+    parser.add_argument("--format", choices=["gpx", "fit", "csv"])
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE)
+    parser.add_argument("--credentials", help="Arquivo da conta de serviço (padrão: ver `firebase.client`).")
+    parser.add_argument("--database-url", default=DATABASE_URL)
+    args = parser.parse_args(argv)
+
+    initialize_firebase(load_credentials(args.credentials), args.database_url)
+    # Journal próprio: o do servidor do Streamlit fica travado enquanto ele estiver aberto
+    configure_outbox(outbox_path_for("track_import"))
+
+    with open(args.file, "rb") as f:
+        stats = import_track_file(f, filename=args.file, file_format=args.format, chunk_size=args.chunk_size)
+    print(
+        f"{stats['lidos']} pontos lidos, {stats['importados']} importados, "
+        f"{stats['invalidos']} inválidos, {stats['duplicados']} duplicados "
+        f"em {stats['segundos']:.1f}s ({stats['pontos_por_segundo']:.0f} pontos/s)"
+    )
+
+    # Aguarda o envio dos lotes pendentes antes de encerrar
+    outbox = get_outbox()
+    start = time.perf_counter()
+    while outbox.flush():
+        pass
+    print(f"Enviado ao Firebase em {time.perf_counter() - start:.1f}s")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
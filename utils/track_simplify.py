@@ -0,0 +1,132 @@
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+EARTH_RADIUS_M = 6371008.8
+
+# Níveis de detalhe do percurso: (zoom mínimo do mapa, tolerância em metros).
+# A tolerância acompanha aproximadamente o tamanho de um pixel no zoom; o último nível
+# mantém o detalhe da precisão do GPS.
+LOD_LEVELS = ((0, 1000.0), (9, 150.0), (12, 20.0), (15, 2.0))
+
+_CACHE_MAX_ENTRIES = 32
+_cache = OrderedDict()
+_cache_lock = threading.Lock()
+
+
+def project_to_meters(latitudes, longitudes):
+    """
+    Projeta coordenadas geográficas em um plano local (equiretangular), em metros.
+
+    Parâmetros:
+        latitudes (array): Latitudes em graus.
+        longitudes (array): Longitudes em graus.
+
+    Retorna:
+        np.ndarray: Matriz (n, 2) com as coordenadas x e y em metros.
+    """
+    lat = np.radians(np.asarray(latitudes, dtype=np.float64))
+    lon = np.radians(np.asarray(longitudes, dtype=np.float64))
+    if lat.size == 0:
+        return np.empty((0, 2))
+    cos_lat0 = np.cos(lat.mean())
+    return np.column_stack((lon * cos_lat0 * EARTH_RADIUS_M, lat * EARTH_RADIUS_M))
+
+
+def douglas_peucker(points, tolerance: float):
+    """
+    Simplifica uma linha com o algoritmo de Douglas–Peucker.
+
+    A implementação é iterativa (sem recursão) e calcula as distâncias de cada trecho de
+    forma vetorizada com NumPy.
+
+    Parâmetros:
+        points (np.ndarray): Matriz (n, 2) de coordenadas projetadas (ver `project_to_meters`).
+        tolerance (float): Distância máxima, nas unidades de `points`, entre a linha original e a simplificada.
+
+    Retorna:
+        np.ndarray: Índices (ordenados) dos pontos mantidos; o primeiro e o último sempre são mantidos.
+    """
+    n = len(points)
+    if n < 3 or tolerance <= 0:
+        return np.arange(n)
+
+    keep = np.zeros(n, dtype=bool)
+    keep[0] = keep[-1] = True
+    stack = [(0, n - 1)]
+    while stack:
+        start, end = stack.pop()
+        if end - start < 2:
+            continue
+
+        segment = points[end] - points[start]
+        offsets = points[start + 1:end] - points[start]
+        length = np.hypot(segment[0], segment[1])
+        if length == 0:
+            distances = np.hypot(offsets[:, 0], offsets[:, 1])
+        else:
+            # Distância perpendicular de cada ponto à reta que liga as extremidades do trecho
+            distances = np.abs(segment[0] * offsets[:, 1] - segment[1] * offsets[:, 0]) / length
+
+        index = int(np.argmax(distances))
+        if distances[index] > tolerance:
+            split = start + 1 + index
+            keep[split] = True
+            stack.append((start, split))
+            stack.append((split, end))
+
+    return np.flatnonzero(keep)
+
+
+def simplify_track(latitudes, longitudes, tolerance: float):
+    """
+    Simplifica um percurso geográfico com uma tolerância em metros.
+
+    Parâmetros:
+        latitudes (array): Latitudes em graus.
+        longitudes (array): Longitudes em graus.
+        tolerance (float): Tolerância em metros.
+
+    Retorna:
+        np.ndarray: Índices dos pontos mantidos.
+    """
+    return douglas_peucker(project_to_meters(latitudes, longitudes), tolerance)
+
+
+def track_levels(version: str, latitudes, longitudes, levels=LOD_LEVELS):
+    """
+    Retorna os índices simplificados do percurso para cada nível de detalhe, com cache por versão.
+
+    Os resultados ficam em cache por (versão dos dados, tolerância), de modo que cada nível só é
+    recalculado quando chegam novas localizações.
+
+    Parâmetros:
+        version (str): Versão do conjunto de localizações (ver `push_keys.dataset_version`);
+            se None, os níveis são calculados sem cache.
+        latitudes (array): Latitudes em graus.
+        longitudes (array): Longitudes em graus.
+        levels (tuple): Pares (zoom mínimo, tolerância em metros).
+
+    Retorna:
+        list: Pares (zoom mínimo, índices mantidos), na ordem de `levels`.
+    """
+    points = None
+    result = []
+    for min_zoom, tolerance in levels:
+        key = (version, tolerance)
+        with _cache_lock:
+            indices = _cache.get(key) if version is not None else None
+            if indices is not None:
+                _cache.move_to_end(key)
+        if indices is None:
+            if points is None:
+                points = project_to_meters(latitudes, longitudes)
+            indices = douglas_peucker(points, tolerance)
+        if version is not None:
+            with _cache_lock:
+                _cache[key] = indices
+                while len(_cache) > _CACHE_MAX_ENTRIES:
+                    _cache.popitem(last=False)
+        result.append((min_zoom, indices))
+    return result
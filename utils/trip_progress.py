@@ -1,23 +1,6 @@
 import streamlit as st
 from datetime import datetime
-from firebase_admin import db
-
-def set_data(path, data):
-    """
-    Envia dados para o banco de dados Firebase em um caminho específico.
-
-    Parâmetros:
-        path (str): O caminho no banco de dados Firebase onde os dados serão armazenados.
-        data (dict): Os dados a serem enviados.
-
-    Tratamento de Erros:
-        Exibe uma mensagem de erro no Streamlit caso ocorra uma exceção ao enviar os dados.
-    """
-    try:
-        ref = db.reference(path)
-        ref.push(data)
-    except Exception as e:
-        st.error(f"Erro ao enviar os dados: {e}")
+from firebase.firebase_utils import set_data
 
 def show_trip_progress():
     """
@@ -73,7 +56,11 @@ def show_trip_progress():
                         "data_envio": datetime.now().isoformat()  
                     }
 
-                    set_data("progresso_viagem", data)
-                    st.success("Dados enviados com sucesso para o Firebase!")
                 except ValueError:
                     st.error("Por favor, insira o tempo no formato correto (hh:mm).")
+                else:
+                    try:
+                        set_data("progresso_viagem", data)
+                        st.success("Dados enviados com sucesso para o Firebase!")
+                    except Exception as e:
+                        st.error(f"Erro ao enviar os dados: {e}")
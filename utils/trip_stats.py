@@ -0,0 +1,134 @@
+import numpy as np
+import pandas as pd
+
+from firebase.instrumentation import payload_size, timed
+from utils.columnar_store import MISSING_EPOCH, PROGRESS_SCHEMA, ColumnarStore
+from utils.downsampling import downsample
+
+TRIP_COLUMNS = ["Hora", "Distância (km)", "Altimetria (m)", "Data"]
+# Máximo de pontos de cada gráfico de progresso enviados ao navegador
+MAX_CHART_POINTS = 1000
+
+
+@timed(size=payload_size)
+def process_trip_data(data):
+    """
+    Processa os registros de progresso da viagem em um DataFrame com os totais acumulados.
+
+    Os registros são convertidos em colunas uma única vez e todo o processamento (leitura das
+    datas, conversão do tempo "hh:mm" para minutos e somas acumuladas) é feito de forma
+    vetorizada. As linhas são ordenadas cronologicamente pelo timestamp do registro.
+
+    Parâmetros:
+        data (dict): Registros de `progresso_viagem`, indexados pelo push key.
+
+    Retorna:
+        pd.DataFrame: Colunas "Hora" (tempo acumulado em HH:MM), "Distância (km)" e
+        "Altimetria (m)" acumuladas e "Data" (dd/mm/aaaa ou "Sem Data").
+    """
+    if not data:
+        return pd.DataFrame()
+
+    keys = sorted(key for key, values in data.items() if isinstance(values, dict))
+    if not keys:
+        return pd.DataFrame()
+    # Uma passada pelos registros para montar as colunas tipadas, sem listas intermediárias
+    store = ColumnarStore(PROGRESS_SCHEMA, capacity=len(keys))
+    store.extend((key, data[key]) for key in keys)
+
+    timestamps = pd.Series(store.times("timestamp"))
+    if (store.column("data_envio") != MISSING_EPOCH).any():
+        # Registros antigos só possuem "data_envio" (ISO); os atuais possuem "timestamp"
+        timestamps = timestamps.fillna(pd.Series(store.times("data_envio")))
+    minutes = _parse_minutes(store.column("tempo"), store.categories("tempo"))
+    distancia = store.column("distancia")
+    altimetria = store.column("altimetria")
+
+    # Ordenação estável: registros sem data mantêm a ordem das chaves e ficam no fim
+    order = np.argsort(timestamps.fillna(pd.Timestamp.max).to_numpy(), kind="stable")
+    timestamps = timestamps.iloc[order]
+    total_minutes = minutes[order].cumsum()
+
+    return pd.DataFrame({
+        "Hora": _format_hours(total_minutes),
+        "Distância (km)": np.nan_to_num(distancia[order]).cumsum(),
+        "Altimetria (m)": np.nan_to_num(altimetria[order]).cumsum(),
+        "Data": _format_dates(timestamps),
+    }, columns=TRIP_COLUMNS)
+
+
+def _parse_minutes(codes, tempos):
+    """
+    Converte valores "hh:mm" em minutos (0 para valores inválidos).
+
+    Há poucos valores distintos de tempo, então só os valores distintos são interpretados.
+
+    Parâmetros:
+        codes (np.ndarray): Código de cada registro (-1 se ausente).
+        tempos (list): Os valores distintos, na ordem dos códigos.
+    """
+    parsed = np.zeros(len(tempos), dtype="int64")
+    for i, value in enumerate(tempos):
+        try:
+            h, m = map(int, str(value).split(":"))
+            parsed[i] = h * 60 + m
+        except ValueError:
+            pass
+    # Valores ausentes recebem o código -1 e contam como zero
+    return np.where(codes >= 0, parsed[codes] if len(parsed) else 0, 0)
+
+
+def _format_hours(total_minutes):
+    """
+    Formata minutos acumulados como "HH:MM", formatando cada hora distinta uma única vez.
+    """
+    hours, inverse = np.unique(total_minutes // 60, return_inverse=True)
+    hour_labels = np.array([f"{h:02}:" for h in hours], dtype="object")
+    minute_labels = np.array([f"{m:02}" for m in range(60)], dtype="object")
+    return hour_labels[inverse] + minute_labels[total_minutes % 60]
+
+
+def _format_dates(timestamps):
+    """
+    Formata as datas como "dd/mm/aaaa" ("Sem Data" se ausente), formatando cada dia distinto uma única vez.
+    """
+    codes, days = pd.factorize(timestamps.dt.normalize())
+    labels = np.append(np.asarray(days.strftime("%d/%m/%Y"), dtype="object"), "Sem Data")
+    # O código -1 (data ausente) aponta para o último rótulo
+    return labels[codes]
+
+
+@timed(size=payload_size)
+def progress_chart_data(trip_df, mode: str = "registros", max_points: int = MAX_CHART_POINTS, method: str = "lttb"):
+    """
+    Prepara os dados de progresso para os gráficos, agregando e reduzindo a quantidade de pontos.
+
+    Parâmetros:
+        trip_df (pd.DataFrame): Resultado de `process_trip_data`.
+        mode (str): "registros" (um ponto por registro), "hora" (último registro de cada hora
+            de pedal acumulada) ou "dia" (último registro de cada dia).
+        max_points (int): Quantidade máxima de pontos enviados ao gráfico (ver `downsampling.downsample`).
+        method (str): "lttb" para gráficos de linha ou "minmax" para gráficos de barras.
+
+    Retorna:
+        pd.DataFrame: As linhas selecionadas, com as colunas de `process_trip_data`.
+
+    Levanta:
+        ValueError: Se o modo ou o método não forem reconhecidos.
+    """
+    if trip_df.empty:
+        return trip_df
+    # Os valores são acumulados: o último registro de cada período tem o total até ali
+    if mode == "dia":
+        frame = trip_df[~trip_df["Data"].duplicated(keep="last")]
+    elif mode == "hora":
+        frame = trip_df[~trip_df["Hora"].str[:-3].duplicated(keep="last")]
+    elif mode == "registros":
+        frame = trip_df
+    else:
+        raise ValueError(f"Modo de agregação desconhecido: {mode}")
+
+    # O eixo horizontal é categórico (rótulos igualmente espaçados): a posição serve de coordenada
+    series = [frame[column].to_numpy() for column in ("Distância (km)", "Altimetria (m)")]
+    positions = downsample(np.arange(len(frame)), series, max_points, method)
+    return frame.iloc[positions]